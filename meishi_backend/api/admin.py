@@ -9,7 +9,7 @@ from timezonefinder import TimezoneFinder
 from api.models.restaurant import Cuisine, Restaurant
 from api.models.dish import Category, Course, Dish
 from api.models.user import CustomUser
-from api.models.booking import Booking, GeneralTimeSlot, BookingSystem, TimeSlot, BookingTypes  
+from api.models.booking import ArchivedBooking, Booking, GeneralTimeSlot, BookingSystem, TimeSlot, BookingTypes  
 
 ### Cuisine Admin
 @admin.register(Cuisine)
@@ -39,7 +39,7 @@ class CustomUserAdminForm(forms.ModelForm):
 class CustomUserAdmin(UserAdmin):
     form = CustomUserAdminForm
     list_display = ('username', 'email', 'first_name', 'last_name', 'user_type', 'phone_number', 'is_active')
-    list_filter = ('user_type', 'is_active', 'is_staff')
+    list_filter = ('user_type', 'is_active', 'deletion_pending', 'is_staff')
     search_fields = ('username', 'email', 'first_name', 'last_name', 'phone_number')
     ordering = ('username',)
 
@@ -61,7 +61,7 @@ class RestaurantAdmin(admin.ModelAdmin):
     list_display = ("id", "name", "owner", "country", "city", "latitude", "longitude", "timezone", "created_at")
     search_fields = ("name", "owner__email", "country", "city")
     list_filter = ("country", "state", "cuisine")
-    readonly_fields = ("latitude", "longitude", "timezone", "favorites_count", "like_count", "dislike_count", "weekly_like_count", "created_at")
+    readonly_fields = ("latitude", "longitude", "timezone", "favorites_count", "like_count", "dislike_count", "daily_like_count", "weekly_like_count", "monthly_like_count", "trending_score", "wilson_score", "created_at")
 
     def save_model(self, request, obj, form, change):
         address = f"{obj.street}, {obj.city}, {obj.state}, {obj.postal}, {obj.country}"
@@ -96,7 +96,7 @@ class DishAdmin(admin.ModelAdmin):
     list_filter = ('course', 'restaurant', 'categories', 'created_at')
     search_fields = ('name', 'description', 'restaurant__name')
     ordering = ('-created_at',)
-    readonly_fields = ('favorites_count', 'like_count', 'dislike_count', 'weekly_like_count', 'created_at')
+    readonly_fields = ('favorites_count', 'like_count', 'dislike_count', 'daily_like_count', 'weekly_like_count', 'monthly_like_count', 'trending_score', 'wilson_score', 'created_at')
     filter_horizontal = ('categories',)
 
     def get_restaurant_info(self, obj):
@@ -119,8 +119,8 @@ class DishAdmin(admin.ModelAdmin):
 ### Booking System Admin
 @admin.register(BookingSystem)
 class BookingSystemAdmin(admin.ModelAdmin):
-    list_display = ('id', 'restaurant', 'meal_type', 'is_paused', 'created_at')
-    list_filter = ('meal_type', 'is_paused', 'created_at', 'restaurant')
+    list_display = ('id', 'restaurant', 'meal_type', 'is_paused', 'lazy_time_slots', 'created_at')
+    list_filter = ('meal_type', 'is_paused', 'lazy_time_slots', 'created_at', 'restaurant')
     search_fields = ('restaurant__name', 'meal_type')
     ordering = ('-created_at',)
     readonly_fields = ('created_at',)
@@ -137,11 +137,11 @@ class GeneralTimeSlotAdmin(admin.ModelAdmin):
 ### Time Slot Admin
 @admin.register(TimeSlot)
 class TimeSlotAdmin(admin.ModelAdmin):
-    list_display = ('id', 'booking_system', 'date', 'time', 'is_open', 'max_people', 'max_tables', 'min', 'max', 'created_at')
+    list_display = ('id', 'booking_system', 'date', 'time', 'is_open', 'max_people', 'max_tables', 'booked_people', 'booked_tables', 'min', 'max', 'created_at')
     list_filter = ('date', 'booking_system', 'is_open')
     search_fields = ('booking_system__restaurant__name', 'booking_system__meal_type')
     ordering = ('-created_at',)
-    readonly_fields = ('created_at',)
+    readonly_fields = ('booked_people', 'booked_tables', 'created_at')
 
 ### Booking Admin
 @admin.register(Booking)
@@ -172,6 +172,15 @@ class BookingAdmin(admin.ModelAdmin):
             return TimeSlotModelChoiceField(**kwargs)
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
+### Archived Booking Admin
+@admin.register(ArchivedBooking)
+class ArchivedBookingAdmin(admin.ModelAdmin):
+    list_display = ('booking_id', 'restaurant', 'meal_type', 'date', 'time', 'first_name', 'last_name', 'people', 'status', 'archived_at')
+    list_filter = ('status', 'date', 'meal_type', 'restaurant')
+    search_fields = ('booking_code', 'first_name', 'last_name', 'phone', 'email', 'restaurant__name')
+    ordering = ('-date', '-time')
+    readonly_fields = [field.name for field in ArchivedBooking._meta.fields]
+
 ### Booking Types Admin
 @admin.register(BookingTypes)
 class BookingTypesAdmin(admin.ModelAdmin):
@@ -0,0 +1,990 @@
+# api/counters.py
+
+"""
+Reaction counters (favorites_count, like_count, dislike_count) of restaurants
+and dishes.
+
+REACTION_COUNTER_BACKEND selects how deltas reach the database:
+
+- 'direct': every change is applied immediately with a single UPDATE.
+- 'buffered': deltas are collected per entity in the REACTION_COUNTER_CACHE
+  cache and written in one batch by the flush_reaction_counters task, so the
+  stored counts lag by at most REACTION_COUNTER_FLUSH_SECONDS.
+- 'sharded': deltas are added to one of REACTION_COUNTER_SHARDS shard rows
+  per entity and day, picked at random, instead of the entity's own row, so
+  concurrent reactions to a popular entity rarely wait on the same row lock.
+  The same task folds the shards into the entities' counters.
+
+Reactions are also counted per entity and day of the reaction in the daily
+bucket tables (RestaurantReactionDay, DishReactionDay), through the same
+backend. The counts of any recent window are a sum over its buckets; the
+windows listings order by are stored in LIKE_COUNT_WINDOWS columns, and
+the all-time counts are the counters themselves.
+
+The buckets also feed trending_score, a sum of likes minus weighted dislikes
+decayed exponentially by age (TRENDING_HALF_LIFE_DAYS). Every row stores its
+score as of trending_day (a date ordinal): each write first decays the score
+to today and then adds the new reaction's weight decayed by the age of its
+day, and renormalize_trending_scores decays the rows nobody wrote to, so the
+stored values stay bounded and comparable without recomputing anything.
+
+wilson_score, the lower bound of the Wilson score interval of the share of
+likes among likes and dislikes, is rewritten by every UPDATE that changes
+like_count or dislike_count, so rankings by quality can use its index.
+"""
+
+import logging
+import math
+import random
+import time
+from datetime import date, timedelta
+from functools import reduce
+from operator import or_
+from time import perf_counter
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    Case, Count, F, FloatField, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Cast, Coalesce, Greatest, Power, Sqrt, TruncDate
+from django.db.models.lookups import GreaterThan
+from django.utils.timezone import localdate
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = ('favorites_count', 'like_count', 'dislike_count')
+# Counter of each like/dislike reaction type
+REACTION_FIELDS = {
+    'like': 'like_count',
+    'dislike': 'dislike_count',
+}
+COUNTER_MODELS = {
+    'restaurant': 'Restaurant',
+    'dish': 'Dish',
+}
+# Like/dislike model of each counted model and its foreign key to it
+REACTION_MODELS = {
+    'restaurant': ('LikeDislike', 'restaurant'),
+    'dish': ('DishLikeDislike', 'dish'),
+}
+FAVORITE_MODELS = {
+    'restaurant': 'Favorite',
+    'dish': 'DishFavorite',
+}
+# Counter shard model of each counted model
+SHARD_MODELS = {
+    'restaurant': 'RestaurantCounterShard',
+    'dish': 'DishCounterShard',
+}
+# Daily reaction bucket model of each counted model
+DAY_MODELS = {
+    'restaurant': 'RestaurantReactionDay',
+    'dish': 'DishReactionDay',
+}
+# Like count columns refreshed from the daily buckets, and their window in days
+LIKE_COUNT_WINDOWS = {
+    'daily_like_count': 1,
+    'weekly_like_count': 7,
+    'monthly_like_count': 30,
+}
+
+# Stored counts recomputed from the reactions by reconcile_counters
+RECONCILED_FIELDS = COUNTER_FIELDS + tuple(LIKE_COUNT_WINDOWS)
+
+# z of the Wilson score interval (95% confidence)
+WILSON_Z = 1.96
+
+# Cache keys of the buffered backend
+KEY_PREFIX = 'reaction-counter'
+SEQUENCE_KEY = f'{KEY_PREFIX}:seq'
+FLUSHED_KEY = f'{KEY_PREFIX}:flushed'
+FLUSH_LOCK_KEY = f'{KEY_PREFIX}:flush-lock'
+
+def get_counter_model(model_name):
+    return apps.get_model('api', COUNTER_MODELS[model_name])
+
+def get_day_model(model_name):
+    return apps.get_model('api', DAY_MODELS[model_name])
+
+def get_shard_model(model_name):
+    return apps.get_model('api', SHARD_MODELS[model_name])
+
+def get_shard_count():
+    return getattr(settings, 'REACTION_COUNTER_SHARDS', 8)
+
+def get_reaction_model(model_name):
+    return apps.get_model('api', REACTION_MODELS[model_name][0])
+
+def get_related_field(model_name):
+    """
+    Name of the foreign key from reactions and buckets to the counted model.
+    """
+    return REACTION_MODELS[model_name][1]
+
+def get_model_name(instance):
+    return instance._meta.model_name
+
+def get_backend():
+    return getattr(settings, 'REACTION_COUNTER_BACKEND', 'direct')
+
+def get_cache():
+    return caches[getattr(settings, 'REACTION_COUNTER_CACHE', 'default')]
+
+def reaction_deltas(old_type=None, new_type=None):
+    """
+    Counter deltas for a like/dislike changing from old_type to new_type,
+    where None means no reaction.
+    """
+    deltas = {}
+    if old_type in REACTION_FIELDS:
+        deltas[REACTION_FIELDS[old_type]] = -1
+    if new_type in REACTION_FIELDS:
+        field = REACTION_FIELDS[new_type]
+        deltas[field] = deltas.get(field, 0) + 1
+    return deltas
+
+def wilson_lower_bound(likes, dislikes):
+    """
+    Lower bound of the Wilson score interval of the share of likes.
+    """
+    total = likes + dislikes
+    if not total:
+        return 0.0
+    z = WILSON_Z
+    return (likes + z * z / 2 - z * math.sqrt(likes * dislikes / total + z * z / 4)) / (total + z * z)
+
+def wilson_score(likes, dislikes):
+    """
+    SQL counterpart of wilson_lower_bound over like and dislike count expressions.
+    """
+    likes = Cast(likes, FloatField())
+    dislikes = Cast(dislikes, FloatField())
+    total = likes + dislikes
+    z = WILSON_Z
+    return Case(
+        When(GreaterThan(total, 0), then=(
+            likes + Value(z * z / 2) - Value(z) * Sqrt(likes * dislikes / total + Value(z * z / 4))
+        ) / (total + Value(z * z))),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+def get_trending_half_life():
+    """
+    Age in days at which a reaction counts half towards the trending score.
+    """
+    return getattr(settings, 'TRENDING_HALF_LIFE_DAYS', 3)
+
+def get_trending_dislike_weight():
+    return getattr(settings, 'TRENDING_DISLIKE_WEIGHT', 1.0)
+
+def trending_delta(deltas, day):
+    """
+    Change of a trending score as of today for like/dislike deltas made on `day`.
+    """
+    weight = deltas.get('like_count', 0) - get_trending_dislike_weight() * deltas.get('dislike_count', 0)
+    if not weight:
+        return 0.0
+    return weight * 2 ** ((day - localdate()).days / get_trending_half_life())
+
+def get_trending_horizon():
+    """
+    Age in days (20 half-lives) after which reactions weigh less than a
+    millionth and are no longer counted towards the trending score.
+    """
+    return 20 * get_trending_half_life()
+
+def decayed_trending_score():
+    """
+    Expression of a row's trending_score decayed to today. Negligible scores
+    become 0 and the decay is capped at the trending horizon, so repeated
+    decays never underflow.
+    """
+    today = localdate().toordinal()
+    decay = Power(
+        Value(2.0),
+        (Greatest(F('trending_day'), Value(today - get_trending_horizon())) - Value(today))
+        / Value(float(get_trending_half_life())),
+    )
+    return Case(
+        When(trending_score__gt=-1e-6, trending_score__lt=1e-6, then=Value(0.0)),
+        default=F('trending_score') * decay,
+        output_field=FloatField(),
+    )
+
+def reaction_day(reaction):
+    """
+    Day whose bucket counts a like/dislike or favorite: the day it was made.
+    """
+    return localdate(reaction.created_at)
+
+def adjust_counts(instance, day=None, **deltas):
+    """
+    Add deltas to the reaction counters of a Restaurant or Dish, e.g.
+    adjust_counts(dish, like_count=-1, dislike_count=1). With `day` (see
+    reaction_day) the deltas are added to that day's bucket and to the
+    trending score as well.
+
+    The instance's own attributes are adjusted as well, so responses built
+    from it reflect the change without reading the row back.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    adjust_many_counts(get_model_name(instance), {(instance.pk, day): deltas})
+
+    for field, delta in deltas.items():
+        setattr(instance, field, getattr(instance, field) + delta)
+    if 'like_count' in deltas or 'dislike_count' in deltas:
+        instance.wilson_score = wilson_lower_bound(instance.like_count, instance.dislike_count)
+
+def adjust_many_counts(model_name, deltas_by_key):
+    """
+    Add {(pk, day): {field: delta}} to the reaction counters of many rows of
+    one model, where day is None for deltas that skip the buckets and the
+    trending score. Directly applied deltas take one UPDATE of the counters.
+    """
+    deltas_by_key = {
+        key: {field: delta for field, delta in deltas.items() if delta}
+        for key, deltas in deltas_by_key.items()
+    }
+    deltas_by_key = {key: deltas for key, deltas in deltas_by_key.items() if deltas}
+    unknown = {field for deltas in deltas_by_key.values() for field in deltas} - set(COUNTER_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown reaction counters: {', '.join(sorted(unknown))}")
+    if not deltas_by_key:
+        return
+
+    backend = get_backend()
+    if backend == 'buffered':
+        for (pk, day), deltas in deltas_by_key.items():
+            buffer_deltas(model_name, pk, deltas, day)
+        return
+
+    with transaction.atomic():
+        if backend == 'sharded':
+            # Shards are per day; the rare deltas without one go to the row
+            apply_shard_deltas(model_name, {key: deltas for key, deltas in deltas_by_key.items() if key[1]})
+            deltas_by_key = {key: deltas for key, deltas in deltas_by_key.items() if not key[1]}
+        apply_keyed_deltas(model_name, deltas_by_key)
+
+def apply_keyed_deltas(model_name, deltas_by_key):
+    """
+    Apply {(pk, day): {field: delta}} to the counters and trending scores of
+    one model with a single UPDATE, and to the buckets of the given days.
+    """
+    deltas_by_pk = {}
+    trending_by_pk = {}
+    day_deltas = {}
+    for (pk, day), deltas in deltas_by_key.items():
+        counter_deltas = deltas_by_pk.setdefault(pk, dict.fromkeys(COUNTER_FIELDS, 0))
+        for field, delta in deltas.items():
+            counter_deltas[field] += delta
+        if day is not None:
+            trending_by_pk[pk] = trending_by_pk.get(pk, 0.0) + trending_delta(deltas, day)
+            day_deltas[(pk, day)] = deltas
+    apply_deltas(model_name, deltas_by_pk, trending_by_pk)
+    apply_day_deltas(model_name, day_deltas)
+
+def apply_deltas(model_name, deltas_by_pk, trending_by_pk=None):
+    """
+    Apply {pk: {field: delta}} and the {pk: delta} of the trending scores
+    to one model with a single UPDATE.
+    """
+    deltas_by_pk = {pk: deltas for pk, deltas in deltas_by_pk.items() if any(deltas.values())}
+    trending_by_pk = {pk: delta for pk, delta in (trending_by_pk or {}).items() if delta}
+    for pk in trending_by_pk:
+        deltas_by_pk.setdefault(pk, {})
+    if not deltas_by_pk:
+        return 0
+    model = get_counter_model(model_name)
+
+    updates = delta_updates(deltas_by_pk)
+    if 'like_count' in updates or 'dislike_count' in updates:
+        updates['wilson_score'] = wilson_score(
+            updates.get('like_count', F('like_count')),
+            updates.get('dislike_count', F('dislike_count')),
+        )
+    if trending_by_pk:
+        if len(deltas_by_pk) == 1:
+            trending = Value(trending_by_pk[next(iter(deltas_by_pk))])
+        else:
+            trending = Case(
+                *[When(pk=pk, then=Value(delta)) for pk, delta in trending_by_pk.items()],
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+        updates['trending_score'] = decayed_trending_score() + trending
+        updates['trending_day'] = Value(localdate().toordinal())
+    return model.objects.filter(pk__in=deltas_by_pk).update(**updates)
+
+def key_lookup(lookup, key):
+    """
+    Return the filter kwargs matching `key` on the field `lookup`, or on each
+    field of a tuple of fields when the keys are tuples.
+    """
+    if isinstance(lookup, tuple):
+        return dict(zip(lookup, key))
+    return {lookup: key}
+
+def delta_updates(deltas_by_pk, lookup='pk'):
+    """
+    Return the update() kwargs adding {pk: {field: delta}} to the rows whose
+    `lookup` is pk, with a CASE per field when there are several rows.
+    `lookup` may be a tuple of fields, keyed by tuples of their values.
+    """
+    updates = {}
+    for field in COUNTER_FIELDS:
+        whens = [
+            When(**key_lookup(lookup, pk), then=Value(deltas[field]))
+            for pk, deltas in deltas_by_pk.items()
+            if deltas.get(field)
+        ]
+        if not whens:
+            continue
+        if len(deltas_by_pk) == 1:
+            updates[field] = F(field) + whens[0].result
+        else:
+            updates[field] = F(field) + Case(*whens, default=Value(0), output_field=IntegerField())
+    return updates
+
+def apply_day_deltas(model_name, deltas_by_key):
+    """
+    Add {(pk, day): {field: delta}} to the daily buckets of one model: one
+    UPDATE for the buckets that exist, one INSERT for the others.
+    """
+    deltas_by_key = {key: deltas for key, deltas in deltas_by_key.items() if any(deltas.values())}
+    related_field = f'{get_related_field(model_name)}_id'
+    add_row_deltas(get_day_model(model_name), (related_field, 'day'), deltas_by_key)
+    return len(deltas_by_key)
+
+def get_row_chunk_size():
+    """
+    Number of bucket or shard rows changed per UPDATE/INSERT.
+    """
+    return getattr(settings, 'REACTION_ROW_CHUNK_SIZE', 500)
+
+def add_row_deltas(row_model, key_fields, deltas_by_key):
+    """
+    Add {key: {field: delta}} to the rows of a bucket or shard model whose
+    `key_fields` have the values of the key tuple, with one UPDATE for the
+    rows that exist and one INSERT for the others per chunk of keys.
+
+    A concurrent writer may create a missing row between the lookup and the
+    INSERT, or a fold may delete one before the UPDATE; either way the
+    savepoint is rolled back and the rows are looked up again.
+    """
+    keys = list(deltas_by_key)
+    chunk_size = get_row_chunk_size()
+    for start in range(0, len(keys), chunk_size):
+        chunk = {key: deltas_by_key[key] for key in keys[start:start + chunk_size]}
+        for attempt in range(3):
+            try:
+                with transaction.atomic():
+                    add_row_chunk_deltas(row_model, key_fields, chunk)
+                break
+            except IntegrityError:
+                if attempt == 2:
+                    raise
+
+def add_row_chunk_deltas(row_model, key_fields, deltas_by_key):
+    """
+    Apply one chunk of add_row_deltas(), inside its savepoint.
+    """
+    def rows_of(keys):
+        return row_model.objects.filter(
+            reduce(or_, (Q(**key_lookup(key_fields, key)) for key in keys))
+        )
+
+    existing = set(rows_of(deltas_by_key).values_list(*key_fields))
+    if existing:
+        updated = rows_of(existing).update(**delta_updates(
+            {key: deltas_by_key[key] for key in existing}, lookup=key_fields
+        ))
+        if updated != len(existing):
+            raise IntegrityError(f"{row_model.__name__} rows changed during the update.")
+    row_model.objects.bulk_create([
+        row_model(**key_lookup(key_fields, key), **deltas)
+        for key, deltas in deltas_by_key.items()
+        if key not in existing
+    ])
+
+def apply_shard_deltas(model_name, deltas_by_key):
+    """
+    Add {(pk, day): {field: delta}} to a randomly picked shard row of each
+    entity and day.
+    """
+    shards = get_shard_count()
+    related_field = f'{get_related_field(model_name)}_id'
+    add_row_deltas(get_shard_model(model_name), (related_field, 'day', 'shard'), {
+        (pk, day, random.randrange(shards)): deltas for (pk, day), deltas in deltas_by_key.items()
+    })
+
+def fold_counter_shards(batch_size=None):
+    """
+    Move the deltas collected in the shard rows into the counters, buckets
+    and trending scores, one transaction per batch of shard rows. Exactly
+    the folded values are subtracted from the shards, so deltas added
+    meanwhile stay for the next fold, and emptied shards are deleted.
+    Returns the number of shard rows folded.
+
+    The batch is locked while it is folded and rows locked by another fold
+    are skipped, so overlapping folds (the periodic task, the reconciliation
+    and the management command) never apply the same shard twice.
+    """
+    batch_size = batch_size or getattr(settings, 'REACTION_COUNTER_FLUSH_BATCH_SIZE', 1000)
+    folded = 0
+    for model_name in COUNTER_MODELS:
+        shard_model = get_shard_model(model_name)
+        related_field = f'{get_related_field(model_name)}_id'
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    shard_model.objects.select_for_update(skip_locked=True)
+                    .filter(pk__gt=last_id)
+                    .order_by('pk')
+                    .values('pk', related_field, 'day', *COUNTER_FIELDS)[:batch_size]
+                )
+                if not rows:
+                    break
+                deltas_by_key = {}
+                for row in rows:
+                    deltas = deltas_by_key.setdefault((row[related_field], row['day']), dict.fromkeys(COUNTER_FIELDS, 0))
+                    for field in COUNTER_FIELDS:
+                        deltas[field] += row[field]
+                apply_keyed_deltas(model_name, deltas_by_key)
+
+                folded_shards = shard_model.objects.filter(pk__in=[row['pk'] for row in rows])
+                updates = delta_updates({
+                    row['pk']: {field: -row[field] for field in COUNTER_FIELDS} for row in rows
+                })
+                if updates:
+                    folded_shards.update(**updates)
+                folded_shards.filter(**dict.fromkeys(COUNTER_FIELDS, 0)).delete()
+            folded += len(rows)
+            last_id = rows[-1]['pk']
+    return folded
+
+def counter_key(model_name, pk, day, field, sign):
+    return f'{KEY_PREFIX}:{model_name}:{pk}:{day or ""}:{field}:{sign}'
+
+def incr_key(cache, key, delta, initial=0):
+    """
+    Add delta to a counter key of the cache and return its value, creating
+    it at `initial` if it is missing, also when it is evicted between the
+    add and the increment.
+    """
+    cache.add(key, initial, timeout=None)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        if cache.add(key, initial + delta, timeout=None):
+            return initial + delta
+        return cache.incr(key, delta)
+
+def buffer_deltas(model_name, pk, deltas, day=None):
+    """
+    Record deltas in the cache. Increments and decrements are kept in two
+    monotonic counters, since not every cache backend decrements below zero.
+    Deltas with a day are buffered apart from those without one, as they
+    also go to that day's bucket.
+    """
+    cache = get_cache()
+    day = day.isoformat() if day else ''
+    for field, delta in deltas.items():
+        incr_key(cache, counter_key(model_name, pk, day, field, '+' if delta > 0 else '-'), abs(delta))
+
+    # Mark the entity dirty under a new sequence number, after the counters
+    # above, so a flush that sees the marker also sees the deltas. An evicted
+    # sequence restarts after the last flushed number rather than at 0, which
+    # the flushes would take as already flushed, and a number whose marker
+    # is still there is not reused.
+    while True:
+        sequence = incr_key(cache, SEQUENCE_KEY, 1, initial=cache.get(FLUSHED_KEY, 0))
+        if cache.add(f'{KEY_PREFIX}:dirty:{sequence}', f'{model_name}:{pk}:{day}', timeout=None):
+            return
+
+def get_marker_grace_seconds():
+    """
+    Time a flush waits for the dirty marker of a taken sequence number
+    before skipping it as left behind by a writer that died.
+    """
+    return getattr(settings, 'REACTION_COUNTER_MARKER_GRACE_SECONDS', 60)
+
+def marker_overdue(cache, number):
+    """
+    Return whether the dirty marker of sequence number `number` has been
+    missing for longer than the grace period, counted from the first flush
+    that found it missing.
+    """
+    cache.add(f'{KEY_PREFIX}:gap:{number}', time.time(), timeout=None)
+    missing_since = cache.get(f'{KEY_PREFIX}:gap:{number}', time.time())
+    return time.time() - missing_since >= get_marker_grace_seconds()
+
+def flush_counters(batch_size=None):
+    """
+    Write the buffered deltas to the database, one UPDATE per model and batch
+    of dirty entities. Returns the number of entities flushed.
+
+    A writer takes its sequence number before it sets the marker, so a flush
+    finding a number without a marker stops before it and the next flush
+    picks it up; a marker still missing after the grace period is skipped.
+    """
+    cache = get_cache()
+    batch_size = batch_size or getattr(settings, 'REACTION_COUNTER_FLUSH_BATCH_SIZE', 1000)
+    # Only one flush at a time; the lock expires if a worker dies mid-flush.
+    if not cache.add(FLUSH_LOCK_KEY, 1, timeout=300):
+        return 0
+
+    flushed_entities = 0
+    try:
+        flushed = cache.get(FLUSHED_KEY, 0)
+        sequence = cache.get(SEQUENCE_KEY, 0)
+        while flushed < sequence:
+            last = min(flushed + batch_size, sequence)
+            numbers = range(flushed + 1, last + 1)
+            markers = cache.get_many([f'{KEY_PREFIX}:dirty:{number}' for number in numbers])
+            pending = next((
+                number for number in numbers
+                if f'{KEY_PREFIX}:dirty:{number}' not in markers and not marker_overdue(cache, number)
+            ), None)
+            if pending is not None:
+                last = pending - 1
+                numbers = range(flushed + 1, last + 1)
+            entities = {
+                tuple(markers[f'{KEY_PREFIX}:dirty:{number}'].split(':'))
+                for number in numbers
+                if f'{KEY_PREFIX}:dirty:{number}' in markers
+            }
+            flushed_entities += flush_entities(cache, entities)
+            cache.delete_many([
+                f'{KEY_PREFIX}:{kind}:{number}' for number in numbers for kind in ('dirty', 'gap')
+            ])
+            cache.set(FLUSHED_KEY, last, timeout=None)
+            flushed = last
+            if pending is not None:
+                break
+    finally:
+        cache.delete(FLUSH_LOCK_KEY)
+    return flushed_entities
+
+def flush_entities(cache, entities):
+    """
+    Apply and then clear the buffered deltas of (model_name, pk, day)
+    entities, where day is '' for deltas without a bucket.
+    """
+    keys = [
+        counter_key(model_name, pk, day, field, sign)
+        for model_name, pk, day in entities
+        for field in COUNTER_FIELDS
+        for sign in '+-'
+    ]
+    values = cache.get_many(keys)
+
+    deltas_by_model = {}
+    for model_name, pk, day in entities:
+        deltas = {
+            field: values.get(counter_key(model_name, pk, day, field, '+'), 0)
+            - values.get(counter_key(model_name, pk, day, field, '-'), 0)
+            for field in COUNTER_FIELDS
+        }
+        key = (int(pk), date.fromisoformat(day) if day else None)
+        deltas_by_model.setdefault(model_name, {})[key] = deltas
+
+    with transaction.atomic():
+        for model_name, deltas_by_key in deltas_by_model.items():
+            apply_keyed_deltas(model_name, deltas_by_key)
+
+    # Subtract what was applied; increments that arrived meanwhile stay buffered
+    drained = [key for key, value in values.items() if not value]
+    for key, value in values.items():
+        if not value:
+            continue
+        try:
+            if cache.decr(key, value) == 0:
+                drained.append(key)
+        except ValueError:
+            # Evicted since it was read; its value was applied above
+            pass
+    delete_drained_keys(cache, drained)
+    return len(entities)
+
+# Deletes a counter key only while it is still 0, in one atomic step on Redis
+DELETE_DRAINED_SCRIPT = "if redis.call('get', KEYS[1]) == '0' then return redis.call('del', KEYS[1]) end return 0"
+
+def delete_drained_keys(cache, keys):
+    """
+    Delete the counter keys that a flush drained to 0, so the buffer only
+    holds the keys of pending deltas and the cache never has to evict them.
+
+    On Redis every key is checked and deleted by one script, so an increment
+    is never deleted with its key. Other caches have no compare-and-delete:
+    the keys are read again and those still at 0 deleted, under the flush
+    lock, and an increment landing between the two steps is lost, which is
+    one more reason to use Redis in production.
+    """
+    if not keys:
+        return
+    if isinstance(cache, RedisCache):
+        for key in keys:
+            key = cache.make_and_validate_key(key)
+            cache._cache.get_client(key, write=True).eval(DELETE_DRAINED_SCRIPT, 1, key)
+        return
+    values = cache.get_many(keys)
+    cache.delete_many([key for key in keys if values.get(key) == 0])
+
+def count_reactions_by_day(model_name, **filters):
+    """
+    Count the likes/dislikes and favorites of one model matching `filters`
+    per entity and day, as {(pk, day): {field: count}}.
+    """
+    reaction_model_name, related_field = REACTION_MODELS[model_name]
+    reaction_model = apps.get_model('api', reaction_model_name)
+    favorite_model = apps.get_model('api', FAVORITE_MODELS[model_name])
+
+    counts = {}
+    reactions = (
+        reaction_model.objects.filter(**filters)
+        .annotate(day=TruncDate('created_at'))
+        .order_by()
+        .values(related_field, 'day')
+        .annotate(
+            like_count=Count('pk', filter=Q(type='like')),
+            dislike_count=Count('pk', filter=Q(type='dislike')),
+        )
+    )
+    favorites = (
+        favorite_model.objects.filter(**filters)
+        .annotate(day=TruncDate('created_at'))
+        .order_by()
+        .values(related_field, 'day')
+        .annotate(favorites_count=Count('pk'))
+    )
+    for rows in (reactions, favorites):
+        for row in rows:
+            pk, day = row.pop(related_field), row.pop('day')
+            counts.setdefault((pk, day), dict.fromkeys(COUNTER_FIELDS, 0)).update(row)
+    return counts
+
+def count_user_reactions(user):
+    """
+    Return the number of likes/dislikes and favorites a user has given.
+    """
+    total = 0
+    for model_name in COUNTER_MODELS:
+        for reaction_model_name in (REACTION_MODELS[model_name][0], FAVORITE_MODELS[model_name]):
+            total += apps.get_model('api', reaction_model_name).objects.filter(user=user).count()
+    return total
+
+def remove_user_reactions(user):
+    """
+    Take the likes/dislikes and favorites of a user about to be deleted out
+    of the counters, buckets and trending scores of every counted model.
+
+    The reactions are counted with two grouped queries per model and the
+    negated counts go through adjust_many_counts(), so each model takes one
+    UPDATE of its counters per chunk of entities whatever the number of
+    reactions. Returns the number of (entity, day) keys adjusted.
+    """
+    chunk_size = get_row_chunk_size()
+    adjusted = 0
+    for model_name in COUNTER_MODELS:
+        deltas_by_key = {
+            key: {field: -count for field, count in fields.items()}
+            for key, fields in count_reactions_by_day(model_name, user=user).items()
+        }
+        keys = sorted(deltas_by_key)
+        for start in range(0, len(keys), chunk_size):
+            adjust_many_counts(model_name, {key: deltas_by_key[key] for key in keys[start:start + chunk_size]})
+        adjusted += len(keys)
+    return adjusted
+
+def rebuild_reaction_days(model_name, chunk_size=None):
+    """
+    Recount the daily buckets of one model from the reactions themselves,
+    one transaction per primary key range of `chunk_size` entities; used to
+    backfill the buckets or repair them. Returns the number of buckets.
+    """
+    model = get_counter_model(model_name)
+    related_field = get_related_field(model_name)
+    chunk_size = chunk_size or get_window_chunk_size()
+
+    max_pk = model.objects.aggregate(max_pk=Max('pk'))['max_pk'] or 0
+    buckets = 0
+    for start in range(0, max_pk, chunk_size):
+        pk_range = {f'{related_field}_id__gt': start, f'{related_field}_id__lte': start + chunk_size}
+        with transaction.atomic():
+            counts = count_reactions_by_day(model_name, **pk_range)
+            replace_reaction_days(model_name, counts, **pk_range)
+        buckets += len(counts)
+    return buckets
+
+def replace_reaction_days(model_name, counts_by_day, **filters):
+    """
+    Replace the daily buckets of one model matching `filters` with the
+    {(pk, day): {field: count}} of count_reactions_by_day().
+    """
+    day_model = get_day_model(model_name)
+    related_field = get_related_field(model_name)
+    day_model.objects.filter(**filters).delete()
+    day_model.objects.bulk_create([
+        day_model(**{f'{related_field}_id': pk, 'day': day}, **fields)
+        for (pk, day), fields in counts_by_day.items()
+    ], batch_size=1000)
+
+def rebuild_trending_scores(model_name, chunk_size=None):
+    """
+    Recompute the trending scores of one model from the daily buckets, one
+    bulk update per primary key range of `chunk_size` rows. Buckets beyond
+    the trending horizon are skipped. Returns the number of rows updated.
+    """
+    model = get_counter_model(model_name)
+    day_model = get_day_model(model_name)
+    related_field = f'{get_related_field(model_name)}_id'
+    chunk_size = chunk_size or get_window_chunk_size()
+    today = localdate()
+    since = today - timedelta(days=get_trending_horizon())
+
+    max_pk = model.objects.aggregate(max_pk=Max('pk'))['max_pk'] or 0
+    updated = 0
+    for start in range(0, max_pk, chunk_size):
+        pk_range = {'pk__gt': start, 'pk__lte': start + chunk_size}
+        scores = dict.fromkeys(model.objects.filter(**pk_range).values_list('pk', flat=True), 0.0)
+        buckets = day_model.objects.filter(
+            **{f'{related_field}__gt': start, f'{related_field}__lte': start + chunk_size},
+            day__gte=since,
+        ).values_list(related_field, 'day', 'like_count', 'dislike_count')
+        for pk, day, like_count, dislike_count in buckets:
+            scores[pk] += trending_delta({'like_count': like_count, 'dislike_count': dislike_count}, day)
+        rows = [
+            model(pk=pk, trending_score=score, trending_day=today.toordinal())
+            for pk, score in scores.items()
+        ]
+        updated += model.objects.bulk_update(rows, ['trending_score', 'trending_day'], batch_size=1000)
+    return updated
+
+def renormalize_trending_scores(model_name, chunk_size=None):
+    """
+    Decay the trending scores of one model that are not as of today yet,
+    with one UPDATE per primary key range of `chunk_size`. Returns the number
+    of rows updated.
+    """
+    model = get_counter_model(model_name)
+    chunk_size = chunk_size or get_window_chunk_size()
+    today = localdate().toordinal()
+
+    max_pk = model.objects.aggregate(max_pk=Max('pk'))['max_pk'] or 0
+    updated = 0
+    for start in range(0, max_pk, chunk_size):
+        updated += model.objects.filter(
+            pk__gt=start, pk__lte=start + chunk_size, trending_day__lt=today
+        ).update(trending_score=decayed_trending_score(), trending_day=Value(today))
+    return updated
+
+def refresh_wilson_scores(model_name, chunk_size=None):
+    """
+    Recompute wilson_score of every row of a counted model from its counters,
+    one UPDATE per primary key range of `chunk_size`. Returns the number of
+    rows updated.
+    """
+    model = get_counter_model(model_name)
+    chunk_size = chunk_size or get_window_chunk_size()
+    score = wilson_score(F('like_count'), F('dislike_count'))
+
+    max_pk = model.objects.aggregate(max_pk=Max('pk'))['max_pk'] or 0
+    updated = 0
+    for start in range(0, max_pk, chunk_size):
+        updated += model.objects.filter(pk__gt=start, pk__lte=start + chunk_size).update(wilson_score=score)
+    return updated
+
+def get_window_chunk_size():
+    """
+    Number of rows per primary key range of the window count UPDATEs.
+    """
+    return getattr(settings, 'WINDOW_COUNT_CHUNK_SIZE', 5000)
+
+def window_count(model_name, days, field='like_count'):
+    """
+    Expression summing `field` over the daily buckets of the outer row in
+    the last `days` days. Buckets are whole days, so the window is today
+    plus the `days` - 1 days before it: 'daily' is today alone, 'weekly'
+    the 7 days ending today.
+    """
+    day_model = get_day_model(model_name)
+    related_field = get_related_field(model_name)
+    return Coalesce(
+        Subquery(
+            day_model.objects.filter(
+                **{related_field: OuterRef('pk')},
+                day__gte=localdate() - timedelta(days=days - 1),
+            )
+            .order_by()
+            .values(related_field)
+            .annotate(total=Sum(field))
+            .values('total')
+        ),
+        0,
+    )
+
+def refresh_window_like_counts(model_name, chunk_size=None):
+    """
+    Recompute the LIKE_COUNT_WINDOWS columns of every row of a counted model
+    from the daily buckets, with one UPDATE per primary key range of
+    `chunk_size`, writing only the rows whose counts changed. Returns the
+    number of rows updated.
+    """
+    model = get_counter_model(model_name)
+    chunk_size = chunk_size or get_window_chunk_size()
+    counts = {
+        column: window_count(model_name, days)
+        for column, days in LIKE_COUNT_WINDOWS.items()
+    }
+
+    max_pk = model.objects.aggregate(max_pk=Max('pk'))['max_pk'] or 0
+    updated = 0
+    for start in range(0, max_pk, chunk_size):
+        started = perf_counter()
+        chunk_updated = (
+            model.objects.filter(pk__gt=start, pk__lte=start + chunk_size)
+            .exclude(**counts)
+            .update(**counts)
+        )
+        updated += chunk_updated
+        logger.debug(
+            f"Updated window like counts of {chunk_updated} {model_name} rows with ids "
+            f"{start + 1}-{start + chunk_size} in {perf_counter() - started:.2f}s."
+        )
+    return updated
+
+def get_reconcile_checkpoint_key(model_name):
+    return f'{KEY_PREFIX}:reconcile:{model_name}'
+
+def count_reactions(model_name, pks, counts_by_day=None):
+    """
+    Recount RECONCILED_FIELDS of the given rows of a counted model from their
+    daily counts (count_reactions_by_day() of the rows, loaded unless given):
+    the all-time counts are their sums, and each LIKE_COUNT_WINDOWS column
+    the likes of its window's days, as window_count() sums the buckets.
+    """
+    if counts_by_day is None:
+        related_field = get_related_field(model_name)
+        counts_by_day = count_reactions_by_day(model_name, **{f'{related_field}_id__in': pks})
+    today = localdate()
+
+    counts = {pk: dict.fromkeys(RECONCILED_FIELDS, 0) for pk in pks}
+    for (pk, day), fields in counts_by_day.items():
+        for field, count in fields.items():
+            counts[pk][field] += count
+        for column, days in LIKE_COUNT_WINDOWS.items():
+            if day >= today - timedelta(days=days - 1):
+                counts[pk][column] += fields['like_count']
+    return counts
+
+def reconcile_counter_chunk(model_name, pks, dry_run=False):
+    """
+    Compare the stored counts of the given rows with their reactions and,
+    unless `dry_run`, overwrite the drifted ones (and their wilson_score)
+    with one bulk update. The rows' daily buckets are rebuilt from the same
+    counts, so the next refresh_window_like_counts() keeps the repaired
+    windows. The rows are locked meanwhile, so with the direct backend
+    reactions written concurrently apply their deltas on top of the repaired
+    counts (see reconcile_counters for the other backends).
+    Returns {pk: {field: (stored, actual)}} of the drifted fields.
+    """
+    model = get_counter_model(model_name)
+    related_field = get_related_field(model_name)
+    with transaction.atomic():
+        rows = model.objects.filter(pk__in=pks)
+        if not dry_run:
+            rows = rows.select_for_update()
+        stored = {row.pop('pk'): row for row in rows.values('pk', *RECONCILED_FIELDS)}
+        chunk = {f'{related_field}_id__in': list(stored)}
+        counts_by_day = count_reactions_by_day(model_name, **chunk)
+        actual = count_reactions(model_name, list(stored), counts_by_day)
+
+        drift = {}
+        for pk, values in actual.items():
+            fields = {
+                field: (stored[pk][field], count)
+                for field, count in values.items()
+                if stored[pk][field] != count
+            }
+            if fields:
+                drift[pk] = fields
+        if not dry_run:
+            replace_reaction_days(model_name, counts_by_day, **chunk)
+        if drift and not dry_run:
+            model.objects.bulk_update(
+                [
+                    model(
+                        pk=pk,
+                        wilson_score=wilson_lower_bound(actual[pk]['like_count'], actual[pk]['dislike_count']),
+                        **actual[pk],
+                    )
+                    for pk in drift
+                ],
+                [*RECONCILED_FIELDS, 'wilson_score'],
+                batch_size=500,
+            )
+    return drift
+
+def reconcile_counters(model_name, batch_size=None, dry_run=False, start_after=None, resume=False, pause=0, report=None):
+    """
+    Recompute the counts of every row of a counted model from its reactions
+    in chunks of `batch_size` rows, paging by id; see reconcile_counter_chunk.
+
+    The last processed id is checkpointed in the REACTION_COUNTER_CACHE cache
+    after every chunk: with `resume` the run continues after it, and
+    `start_after` starts after a given id instead. `pause` seconds are slept
+    between chunks to limit the load. `report(drift)` is called per chunk.
+    Returns a dict of totals.
+
+    Counts are only repaired with the direct backend: with the buffered or
+    sharded one, the deltas of a reaction recounted before they reach the
+    counters would be applied on top of the repaired counts, counting it
+    twice. Deltas left from such a backend should be flushed first.
+    """
+    if not dry_run and get_backend() != 'direct':
+        raise ValueError(
+            f"Reaction counters can only be repaired with the 'direct' backend, not '{get_backend()}'."
+        )
+    model = get_counter_model(model_name)
+    batch_size = batch_size or get_window_chunk_size()
+    cache = get_cache()
+    checkpoint_key = get_reconcile_checkpoint_key(model_name)
+    if start_after is None:
+        start_after = cache.get(checkpoint_key, 0) if resume else 0
+
+    totals = {'checked': 0, 'drifted': 0, 'repaired': 0, 'last_id': start_after}
+    last_id = start_after
+    while True:
+        pks = list(
+            model.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not pks:
+            break
+        started = perf_counter()
+        drift = reconcile_counter_chunk(model_name, pks, dry_run=dry_run)
+        last_id = pks[-1]
+        totals['checked'] += len(pks)
+        totals['drifted'] += len(drift)
+        if not dry_run:
+            totals['repaired'] += len(drift)
+            cache.set(checkpoint_key, last_id, timeout=None)
+        totals['last_id'] = last_id
+        if report:
+            report(drift)
+        logger.debug(
+            f"Reconciled {len(pks)} {model_name} rows up to id {last_id} "
+            f"({len(drift)} drifted) in {perf_counter() - started:.2f}s."
+        )
+        if pause:
+            time.sleep(pause)
+
+    if not dry_run:
+        cache.delete(checkpoint_key)
+    return totals
@@ -0,0 +1,37 @@
+# api/management/commands/apply_booking_retention.py
+
+from django.core.management.base import BaseCommand
+from api.models.booking.retention import apply_retention
+
+class Command(BaseCommand):
+    help = (
+        "Move bookings older than the retention age into the archive and delete "
+        "past unbooked time slots. Safe to re-run; use it to backfill existing data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retention-days", type=int,
+            help="Archive bookings older than this many days (default: BOOKING_RETENTION_DAYS)."
+        )
+        parser.add_argument(
+            "--batch-size", type=int,
+            help="Number of time slots handled per transaction (default: RETENTION_BATCH_SIZE)."
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Only report what would be archived and deleted."
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        counts = apply_retention(
+            retention_days=options["retention_days"],
+            batch_size=options["batch_size"],
+            dry_run=dry_run,
+        )
+        action = "Would archive" if dry_run else "Archived"
+        self.stdout.write(
+            f"{action} {counts['archived_bookings']} bookings from {counts['archived_time_slots']} time slots "
+            f"and {'would delete' if dry_run else 'deleted'} {counts['deleted_time_slots']} past unbooked time slots."
+        )
@@ -0,0 +1,26 @@
+# api/management/commands/backfill_wilson_scores.py
+
+from django.core.management.base import BaseCommand
+from api.counters import COUNTER_MODELS, refresh_wilson_scores
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the Wilson score (lower bound of the share of likes) of every "
+        "restaurant and dish from its like and dislike counts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model", choices=sorted(COUNTER_MODELS),
+            help="Only backfill restaurants or dishes."
+        )
+        parser.add_argument(
+            "--chunk-size", type=int,
+            help="Number of rows updated per statement (default: WINDOW_COUNT_CHUNK_SIZE)."
+        )
+
+    def handle(self, *args, **options):
+        model_names = [options["model"]] if options["model"] else list(COUNTER_MODELS)
+        for model_name in model_names:
+            updated = refresh_wilson_scores(model_name, chunk_size=options["chunk_size"])
+            self.stdout.write(f"Updated the Wilson scores of {updated} {model_name} rows.")
@@ -0,0 +1,184 @@
+# api/management/commands/benchmark_booking_storm.py
+
+import math
+import queue
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Sum
+from rest_framework.test import APIClient
+from api.models.booking.booking import Booking
+from api.models.booking.booking_system import BookingSystem
+from api.models.booking.time_slot import TimeSlot
+from api.models.restaurant import Cuisine, Restaurant
+from api.models.user import CustomUser
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+class Command(BaseCommand):
+    help = (
+        "Fire N concurrent booking attempts at one TimeSlot through "
+        "/api/user/bookings/create/ and report latency, throughput, rejections "
+        "and whether the slot was overbooked."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--attempts", type=int, default=200, help="Total booking attempts (default: 200).")
+        parser.add_argument("--concurrency", type=int, default=20, help="Concurrent client threads (default: 20).")
+        parser.add_argument("--people", type=int, default=2, help="Party size of every attempt (default: 2).")
+        parser.add_argument("--max-people", type=int, default=40, help="max_people of the seeded slot (default: 40).")
+        parser.add_argument("--max-tables", type=int, default=10, help="max_tables of the seeded slot (default: 10).")
+        parser.add_argument(
+            "--time-slot", type=int,
+            help="Storm an existing TimeSlot without bookings instead of seeding a fixture."
+        )
+        parser.add_argument(
+            "--keep", action="store_true",
+            help="Keep the seeded fixture, or the storm bookings of --time-slot."
+        )
+
+    def handle(self, *args, **options):
+        owner = None
+        if options["time_slot"]:
+            try:
+                time_slot = TimeSlot.objects.get(pk=options["time_slot"])
+            except TimeSlot.DoesNotExist:
+                raise CommandError(f"TimeSlot {options['time_slot']} does not exist.")
+            # The storm fills the slot, so it must not compete with real guests
+            if Booking.objects.filter(time_slot=time_slot).exists():
+                raise CommandError(f"TimeSlot {time_slot.pk} already has bookings.")
+        else:
+            owner, time_slot = self.seed_fixture(options["max_people"], options["max_tables"])
+
+        try:
+            results, wall_time = self.storm(
+                time_slot, options["attempts"], options["concurrency"], options["people"]
+            )
+            overbooked = self.report(time_slot, results, wall_time)
+        finally:
+            if owner and not options["keep"]:
+                # Cascades to the restaurant, booking system, slot and bookings
+                owner.delete()
+            elif not owner and not options["keep"]:
+                # Give the existing slot its capacity back
+                Booking.objects.filter(time_slot=time_slot, user=None, first_name="Storm").delete()
+                TimeSlot.objects.filter(pk=time_slot.pk).sync_booked_counts()
+
+        if overbooked:
+            raise CommandError("The time slot was overbooked.")
+
+    def seed_fixture(self, max_people, max_tables):
+        suffix = uuid.uuid4().hex[:8]
+        owner = CustomUser.objects.create_user(
+            username=f"storm_{suffix}",
+            password=uuid.uuid4().hex,
+            email=f"storm_{suffix}@example.com",
+            first_name="Storm",
+            last_name="Benchmark",
+            country_code="1",
+            phone_number=f"202555{int(suffix, 16) % 10000:04d}",
+            user_type="restaurant",
+        )
+        cuisine, _ = Cuisine.objects.get_or_create(name="Benchmark")
+        restaurant = Restaurant.objects.create(
+            owner=owner,
+            name=f"Storm {suffix}",
+            description="Booking storm benchmark fixture",
+            country="España",
+            state="Madrid",
+            city="Madrid",
+            postal="28015",
+            street="Calle de Gaztambide, 11",
+            latitude=0,
+            longitude=0,
+            timezone="Europe/Madrid",
+            cuisine=cuisine,
+        )
+        booking_system = BookingSystem.objects.create(restaurant=restaurant, meal_type="dinner")
+        time_slot = TimeSlot.objects.create(
+            booking_system=booking_system,
+            date=date.today() + timedelta(days=1),
+            time="20:00:00",
+            max_people=max_people,
+            max_tables=max_tables,
+            max=max_people,
+        )
+        return owner, time_slot
+
+    def storm(self, time_slot, attempts, concurrency, people):
+        pending = queue.Queue()
+        for _ in range(attempts):
+            pending.put(None)
+        results = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(concurrency)
+
+        def worker():
+            client = APIClient()
+            try:
+                barrier.wait()
+                while True:
+                    try:
+                        pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    started = time.perf_counter()
+                    try:
+                        status_code = client.post("/api/user/bookings/create/", {
+                            "time_slot": time_slot.id,
+                            "first_name": "Storm",
+                            "people": people,
+                        }).status_code
+                    except Exception:
+                        status_code = None
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        results.append((status_code, elapsed))
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, time.perf_counter() - started
+
+    def report(self, time_slot, results, wall_time):
+        latencies = sorted(elapsed * 1000 for _, elapsed in results)
+        admitted = sum(1 for status_code, _ in results if status_code == 201)
+        rejected = sum(1 for status_code, _ in results if status_code == 400)
+        errors = len(results) - admitted - rejected
+
+        time_slot.refresh_from_db()
+        actual = Booking.objects.filter(time_slot=time_slot).exclude(status="canceled").aggregate(
+            people=Sum("people"), tables=Count("id")
+        )
+        actual_people = actual["people"] or 0
+        overbooked = actual_people > time_slot.max_people or actual["tables"] > time_slot.max_tables
+        drifted = (time_slot.booked_people, time_slot.booked_tables) != (actual_people, actual["tables"])
+
+        self.stdout.write(f"Attempts:    {len(results)} ({admitted} admitted, {rejected} rejected, {errors} errors)")
+        self.stdout.write(
+            f"Latency:     p50 {percentile(latencies, 50):.1f} ms, "
+            f"p95 {percentile(latencies, 95):.1f} ms, p99 {percentile(latencies, 99):.1f} ms"
+        )
+        self.stdout.write(
+            f"Throughput:  {len(results) / wall_time:.1f} req/s over {wall_time:.2f} s"
+        )
+        self.stdout.write(
+            f"Time slot:   {actual_people}/{time_slot.max_people} people, "
+            f"{actual['tables']}/{time_slot.max_tables} tables"
+        )
+        self.stdout.write(f"Counters:    {'drifted' if drifted else 'in sync'}")
+        self.stdout.write(f"Overbooked:  {'YES' if overbooked else 'no'}")
+        return overbooked
@@ -0,0 +1,37 @@
+# api/management/commands/rebuild_reaction_days.py
+
+from django.core.management.base import BaseCommand
+from api.counters import (
+    COUNTER_MODELS,
+    rebuild_reaction_days,
+    rebuild_trending_scores,
+    refresh_window_like_counts,
+)
+
+class Command(BaseCommand):
+    help = (
+        "Recount the daily reaction buckets of restaurants and dishes from their likes, "
+        "dislikes and favorites, then refresh the daily, weekly and monthly like counts "
+        "and the trending scores. "
+        "Use it to backfill the buckets of existing data or to repair them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model", choices=sorted(COUNTER_MODELS),
+            help="Only rebuild the buckets of restaurants or of dishes."
+        )
+        parser.add_argument(
+            "--chunk-size", type=int,
+            help="Number of restaurants or dishes handled per transaction (default: WINDOW_COUNT_CHUNK_SIZE)."
+        )
+
+    def handle(self, *args, **options):
+        model_names = [options["model"]] if options["model"] else list(COUNTER_MODELS)
+        for model_name in model_names:
+            buckets = rebuild_reaction_days(model_name, chunk_size=options["chunk_size"])
+            updated = refresh_window_like_counts(model_name, chunk_size=options["chunk_size"])
+            rebuild_trending_scores(model_name, chunk_size=options["chunk_size"])
+            self.stdout.write(
+                f"Rebuilt {buckets} daily {model_name} buckets and updated the like counts of {updated} rows and their trending scores."
+            )
@@ -0,0 +1,76 @@
+# api/management/commands/reconcile_reaction_counts.py
+
+from django.core.management.base import BaseCommand, CommandError
+from api.counters import COUNTER_MODELS, fold_counter_shards, flush_counters, get_backend, reconcile_counters
+
+class Command(BaseCommand):
+    help = (
+        "Detect and repair drift between the like, dislike, favorite and daily/weekly/monthly "
+        "like counts stored on restaurants and dishes and their reactions, in chunks of rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model", choices=sorted(COUNTER_MODELS),
+            help="Only reconcile restaurants or dishes."
+        )
+        parser.add_argument(
+            "--batch-size", type=int,
+            help="Number of rows checked per chunk (default: WINDOW_COUNT_CHUNK_SIZE)."
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Only report drifted rows and fields, do not repair them."
+        )
+        parser.add_argument(
+            "--sleep", type=float, default=0,
+            help="Seconds to pause between chunks, to limit the load (default: 0)."
+        )
+        parser.add_argument(
+            "--start-after", type=int,
+            help="Only reconcile rows with a greater id."
+        )
+        parser.add_argument(
+            "--resume", action="store_true",
+            help="Continue after the last id processed by an interrupted run."
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        if not dry_run:
+            if get_backend() != "direct":
+                raise CommandError(
+                    f"Counts can only be repaired with REACTION_COUNTER_BACKEND = 'direct', not "
+                    f"'{get_backend()}': deltas of reactions not flushed yet would be counted twice."
+                )
+            # Deltas left from a previous backend would otherwise be counted twice
+            flush_counters()
+            fold_counter_shards()
+
+        model_names = [options["model"]] if options["model"] else list(COUNTER_MODELS)
+        for model_name in model_names:
+            drifted_fields = {}
+
+            def report(drift):
+                for pk, fields in drift.items():
+                    for field, (stored, actual) in fields.items():
+                        drifted_fields[field] = drifted_fields.get(field, 0) + 1
+                        if dry_run and options["verbosity"] > 1:
+                            self.stdout.write(f"{model_name} {pk}: {field} is {stored}, counted {actual}")
+
+            totals = reconcile_counters(
+                model_name,
+                batch_size=options["batch_size"],
+                dry_run=dry_run,
+                start_after=options["start_after"],
+                resume=options["resume"],
+                pause=options["sleep"],
+                report=report,
+            )
+            action = "would repair" if dry_run else "repaired"
+            fields = ", ".join(f"{field}: {count}" for field, count in sorted(drifted_fields.items()))
+            self.stdout.write(
+                f"Checked {totals['checked']} {model_name} rows up to id {totals['last_id']}: "
+                f"{totals['drifted']} drifted{f' ({fields})' if fields else ''}, "
+                f"{action} {totals['drifted'] if dry_run else totals['repaired']}."
+            )
@@ -0,0 +1,51 @@
+# api/management/commands/reconcile_time_slot_counts.py
+
+from django.core.management.base import BaseCommand
+from api.models.booking.time_slot import TimeSlot
+
+class Command(BaseCommand):
+    help = (
+        "Detect and repair drift between the booked_people/booked_tables counters "
+        "stored on TimeSlots and their non-canceled bookings."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="Number of time slots checked per query (default: 1000)."
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Only report drifted time slots, do not repair them."
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        dry_run = options["dry_run"]
+        last_id = 0
+        checked = drifted = repaired = 0
+
+        while True:
+            ids = list(
+                TimeSlot.objects.filter(pk__gt=last_id)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            last_id = ids[-1]
+            checked += len(ids)
+
+            drifted_ids = list(
+                TimeSlot.objects.filter(pk__in=ids)
+                .with_drifted_counts()
+                .values_list("pk", flat=True)
+            )
+            drifted += len(drifted_ids)
+            if drifted_ids and not dry_run:
+                repaired += TimeSlot.objects.filter(pk__in=drifted_ids).sync_booked_counts()
+
+        action = "would repair" if dry_run else "repaired"
+        self.stdout.write(
+            f"Checked {checked} time slots: {drifted} drifted, {action} {drifted if dry_run else repaired}."
+        )
@@ -4,4 +4,4 @@ from .general_time_slot import GeneralTimeSlot
 from .booking_system import BookingSystem
 from .time_slot import TimeSlot
 from .booking import Booking, BookingTypes
-
+from .archived_booking import ArchivedBooking
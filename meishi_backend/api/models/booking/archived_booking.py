@@ -0,0 +1,54 @@
+# api/models/booking/archived_booking.py
+
+from django.db import models
+from api.models.booking.booking import Booking
+from api.models.restaurant import Restaurant
+from api.models.user import CustomUser
+
+class ArchivedBooking(models.Model):
+    """
+    A compact, denormalized copy of a Booking moved out of the hot tables by
+    the retention pipeline. It no longer references its TimeSlot, which is
+    deleted with it, so the slot's date, time and meal type are copied over.
+    """
+    booking_id = models.PositiveIntegerField(
+        unique=True,
+        help_text="ID of the archived Booking."
+    )
+    restaurant = models.ForeignKey(
+        Restaurant,
+        on_delete=models.CASCADE,
+        related_name='archived_bookings'
+    )
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='archived_bookings'
+    )
+    booking_system_id = models.PositiveIntegerField(null=True, blank=True)
+    meal_type = models.CharField(max_length=20)
+    date = models.DateField()
+    time = models.TimeField()
+    booking_code = models.UUIDField()
+    booking_type = models.CharField(max_length=50, null=True, blank=True)
+    first_name = models.CharField(max_length=20)
+    last_name = models.CharField(max_length=30, blank=True)
+    people = models.PositiveIntegerField()
+    phone = models.CharField(max_length=15, blank=True)
+    email = models.EmailField(blank=True)
+    notes = models.TextField(blank=True, max_length=50)
+    status = models.CharField(max_length=10, choices=Booking.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['restaurant', 'date']),
+            models.Index(fields=['user']),
+        ]
+
+    def __str__(self):
+        return f"Archived booking {self.booking_id} on {self.date} {self.time}"
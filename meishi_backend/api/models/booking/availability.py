@@ -0,0 +1,165 @@
+# api/models/booking/availability.py
+
+from datetime import timedelta
+from django.db.models import Count, Exists, F, OuterRef, Q, Sum
+from django.db.models.functions import Coalesce
+from api.models.booking.booking_system import BookingSystem
+from api.models.booking.schedule import get_virtual_time_slots
+from api.models.booking.time_slot import TimeSlot
+
+def is_bookable(timeslot, people):
+    """
+    Return whether a TimeSlot can take a party of `people`; the Python
+    counterpart of the availability filters, used for computed slots.
+    """
+    return (
+        not timeslot.booking_system.is_paused
+        and timeslot.is_open
+        and timeslot.min <= people <= timeslot.max
+        and timeslot.booked_people <= timeslot.max_people - people
+        and timeslot.booked_tables < timeslot.max_tables
+    )
+
+def annotate_lazy_booking_systems(restaurants):
+    """
+    Annotate restaurants with whether they have a lazy booking system, so the
+    availability lookups of the others skip computing slots from rules.
+    """
+    return restaurants.annotate(
+        has_lazy_booking_systems=Exists(
+            BookingSystem.objects.filter(restaurant=OuterRef('pk'), lazy_time_slots=True)
+        )
+    )
+
+def get_lazy_time_slots(restaurant, start_date, end_date):
+    """
+    Return the concrete and virtual TimeSlots of the restaurant's lazy
+    booking systems for a date range.
+    """
+    if not getattr(restaurant, 'has_lazy_booking_systems', True):
+        return []
+    booking_systems = BookingSystem.objects.filter(restaurant=restaurant, lazy_time_slots=True)
+    return get_virtual_time_slots(booking_systems, start_date, end_date)
+
+def get_available_time_slots(restaurant, date, people):
+    """
+    Return the bookable time slots of a restaurant for a date and party size.
+
+    The booking systems are joined and paused systems, closed slots, party size
+    limits and the maintained booked people/tables counters are all filtered in
+    SQL, so stored slots come from a single query. Slots of lazy booking
+    systems are computed from their rules and merged in.
+    """
+    time_slots = (
+        TimeSlot.objects.filter(
+            booking_system__restaurant=restaurant,
+            booking_system__is_paused=False,
+            booking_system__lazy_time_slots=False,
+            date=date,
+            is_open=True,
+            min__lte=people,
+            max__gte=people,
+            booked_people__lte=F('max_people') - people,
+            booked_tables__lt=F('max_tables'),
+        )
+        .select_related('booking_system')
+        .order_by('booking_system_id', 'time')
+    )
+    lazy_time_slots = [
+        ts for ts in get_lazy_time_slots(restaurant, date, date) if is_bookable(ts, people)
+    ]
+    if lazy_time_slots:
+        time_slots = sorted(
+            [*time_slots, *lazy_time_slots], key=lambda ts: (ts.booking_system_id, ts.time)
+        )
+
+    return [
+        {
+            "booking_system_id": ts.booking_system_id,
+            "meal_type": ts.booking_system.meal_type,
+            "time_slot_id": ts.id,
+            "time": str(ts.time),
+            "date": str(ts.date),
+            "available_people_capacity": ts.max_people - ts.booked_people,
+            "available_table_capacity": ts.max_tables - ts.booked_tables,
+        }
+        for ts in time_slots
+    ]
+
+def get_availability_calendar(restaurant, start_date, end_date, people):
+    """
+    Summarize availability per day and meal type for a date range.
+
+    The slots are grouped by (date, booking system) using their maintained
+    occupancy counters, so the whole range is answered by one grouped query
+    instead of one availability lookup per day. Lazy booking systems are
+    summarized from their computed slots.
+    """
+    bookable = Q(
+        booking_system__is_paused=False,
+        is_open=True,
+        min__lte=people,
+        max__gte=people,
+        booked_people__lte=F('max_people') - people,
+        booked_tables__lt=F('max_tables'),
+    )
+    rows = (
+        TimeSlot.objects.filter(
+            booking_system__restaurant=restaurant,
+            booking_system__lazy_time_slots=False,
+            date__range=(start_date, end_date),
+        )
+        .values('date', 'booking_system_id', 'booking_system__meal_type')
+        .annotate(
+            available_slots=Count('id', filter=bookable),
+            available_people_capacity=Coalesce(
+                Sum(F('max_people') - F('booked_people'), filter=bookable), 0
+            ),
+            available_table_capacity=Coalesce(
+                Sum(F('max_tables') - F('booked_tables'), filter=bookable), 0
+            ),
+        )
+        .order_by('date', 'booking_system_id')
+    )
+    rows = list(rows)
+
+    lazy_rows = {}
+    for ts in get_lazy_time_slots(restaurant, start_date, end_date):
+        row = lazy_rows.setdefault((ts.date, ts.booking_system_id), {
+            'date': ts.date,
+            'booking_system_id': ts.booking_system_id,
+            'booking_system__meal_type': ts.booking_system.meal_type,
+            'available_slots': 0,
+            'available_people_capacity': 0,
+            'available_table_capacity': 0,
+        })
+        if is_bookable(ts, people):
+            row['available_slots'] += 1
+            row['available_people_capacity'] += ts.max_people - ts.booked_people
+            row['available_table_capacity'] += ts.max_tables - ts.booked_tables
+    if lazy_rows:
+        rows = sorted(
+            [*rows, *lazy_rows.values()], key=lambda row: (row['date'], row['booking_system_id'])
+        )
+
+    meal_types_by_date = {}
+    for row in rows:
+        meal_types_by_date.setdefault(row['date'], []).append({
+            "booking_system_id": row['booking_system_id'],
+            "meal_type": row['booking_system__meal_type'],
+            "available": row['available_slots'] > 0,
+            "available_slots": row['available_slots'],
+            "available_people_capacity": row['available_people_capacity'],
+            "available_table_capacity": row['available_table_capacity'],
+        })
+
+    days = []
+    for offset in range((end_date - start_date).days + 1):
+        day = start_date + timedelta(days=offset)
+        meal_types = meal_types_by_date.get(day, [])
+        days.append({
+            "date": str(day),
+            "available": any(meal_type["available"] for meal_type in meal_types),
+            "meal_types": meal_types,
+        })
+    return days
@@ -1,6 +1,6 @@
 import uuid
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator
 from django.forms import ValidationError
 from api.models.booking.time_slot import TimeSlot
@@ -94,6 +94,63 @@ class Booking(models.Model):
             models.Index(fields=['first_name', 'last_name', 'booking_code']),
         ]
 
+    @property
+    def occupies_time_slot(self):
+        """Canceled bookings free their people and table in the time slot."""
+        return self.status != 'canceled'
+
+    def save(self, *args, **kwargs):
+        """
+        Save the booking and keep the booked_people/booked_tables counters of
+        the affected time slot(s) in sync within the same transaction.
+
+        Pass `time_slot_reserved=True` when inserting a booking whose capacity
+        was already taken with TimeSlot.objects.reserve(). With
+        `guard_capacity=True`, the seats and table a change adds to a time slot
+        (a larger party, another slot, a reactivated booking) are taken with
+        TimeSlot.objects.reserve() too, and a ValidationError is raised if
+        they no longer fit.
+        """
+        guard_capacity = kwargs.pop('guard_capacity', False)
+        if kwargs.pop('time_slot_reserved', False) and not self.pk:
+            return super().save(*args, **kwargs)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not {'people', 'status', 'time_slot'} & set(update_fields):
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = (
+                    Booking.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values('time_slot_id', 'people', 'status')
+                    .first()
+                )
+            super().save(*args, **kwargs)
+
+            # (people, tables) to add to each affected time slot
+            deltas = {}
+            if previous and previous['status'] != 'canceled':
+                people, tables = deltas.get(previous['time_slot_id'], (0, 0))
+                deltas[previous['time_slot_id']] = (people - previous['people'], tables - 1)
+            if self.occupies_time_slot:
+                people, tables = deltas.get(self.time_slot_id, (0, 0))
+                deltas[self.time_slot_id] = (people + self.people, tables + 1)
+
+            for time_slot_id, (people, tables) in deltas.items():
+                time_slots = TimeSlot.objects.filter(pk=time_slot_id)
+                if guard_capacity and (people > 0 or tables > 0):
+                    if not time_slots.reserve(max(people, 0), max(tables, 0), party_size=self.people):
+                        raise ValidationError({
+                            "time_slot": "This time slot no longer has capacity for this booking."
+                        })
+                    if people < 0 or tables < 0:
+                        time_slots.adjust_booked_counts(min(people, 0), min(tables, 0))
+                elif people or tables:
+                    time_slots.adjust_booked_counts(people, tables)
+
     def clean(self):
         """
         Basic model-level validation for data integrity.
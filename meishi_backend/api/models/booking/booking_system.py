@@ -30,6 +30,10 @@ class BookingSystem(models.Model):
         default=False, 
         help_text="If True, new bookings are disallowed for this system."
     )
+    lazy_time_slots = models.BooleanField(
+        default=False,
+        help_text="If True, TimeSlots are computed from GeneralTimeSlots on the fly and only stored once booked."
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -0,0 +1,126 @@
+# api/models/booking/retention.py
+
+import logging
+from datetime import datetime, timedelta
+from time import perf_counter
+from django.conf import settings
+from django.db import transaction
+from api.models.booking.archived_booking import ArchivedBooking
+from api.models.booking.booking import Booking
+from api.models.booking.time_slot import TimeSlot
+
+logger = logging.getLogger(__name__)
+
+# Booking values copied into ArchivedBooking, keyed by ArchivedBooking field
+ARCHIVED_BOOKING_VALUES = {
+    'booking_id': 'id',
+    'restaurant_id': 'time_slot__booking_system__restaurant_id',
+    'user_id': 'user_id',
+    'booking_system_id': 'time_slot__booking_system_id',
+    'meal_type': 'time_slot__booking_system__meal_type',
+    'date': 'time_slot__date',
+    'time': 'time_slot__time',
+    'booking_code': 'booking_code',
+    'booking_type': 'booking_type',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'people': 'people',
+    'phone': 'phone',
+    'email': 'email',
+    'notes': 'notes',
+    'status': 'status',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+
+def get_retention_days():
+    """
+    Age in days after which bookings are moved to the archive.
+    """
+    return getattr(settings, 'BOOKING_RETENTION_DAYS', 180)
+
+def get_retention_batch_size():
+    """
+    Number of TimeSlots handled per retention chunk (and transaction).
+    """
+    return getattr(settings, 'RETENTION_BATCH_SIZE', 1000)
+
+def iter_id_chunks(queryset, batch_size):
+    """
+    Yield sorted lists of at most `batch_size` ids of a queryset, paging by id.
+    """
+    last_id = 0
+    while True:
+        ids = list(
+            queryset.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+def archive_time_slots(time_slot_ids):
+    """
+    Copy the bookings of the given TimeSlots into ArchivedBooking and delete
+    the slots, whose bookings go with them. Re-running a chunk that was only
+    partly applied is safe, as already archived bookings are skipped.
+    Returns (archived bookings, deleted time slots).
+    """
+    with transaction.atomic():
+        rows = Booking.objects.filter(time_slot_id__in=time_slot_ids).values(
+            *ARCHIVED_BOOKING_VALUES.values()
+        )
+        archived_bookings = [
+            ArchivedBooking(**{field: row[value] for field, value in ARCHIVED_BOOKING_VALUES.items()})
+            for row in rows
+        ]
+        ArchivedBooking.objects.bulk_create(archived_bookings, batch_size=500, ignore_conflicts=True)
+        # Deleting through the TimeSlot skips giving capacity back booking by booking
+        _, deleted = TimeSlot.objects.filter(id__in=time_slot_ids).delete()
+    return len(archived_bookings), deleted.get(TimeSlot._meta.label, 0)
+
+def apply_retention(retention_days=None, batch_size=None, dry_run=False):
+    """
+    Run the retention pipeline in chunks of TimeSlots, one transaction each:
+
+    1. TimeSlots older than `retention_days` are deleted after their bookings
+       are copied into ArchivedBooking.
+    2. Past TimeSlots without bookings are deleted.
+
+    Returns a dict of counts; with `dry_run` nothing is changed and the counts
+    are what would be archived or deleted.
+    """
+    retention_days = get_retention_days() if retention_days is None else retention_days
+    batch_size = batch_size or get_retention_batch_size()
+    today = datetime.today().date()
+    archive_before = today - timedelta(days=retention_days)
+
+    expired_timeslots = TimeSlot.objects.filter(date__lt=archive_before)
+    unbooked_timeslots = TimeSlot.objects.filter(date__lt=today, bookings=None)
+    counts = {'archived_bookings': 0, 'archived_time_slots': 0, 'deleted_time_slots': 0}
+
+    if dry_run:
+        counts['archived_bookings'] = Booking.objects.filter(time_slot__date__lt=archive_before).count()
+        counts['archived_time_slots'] = expired_timeslots.count()
+        counts['deleted_time_slots'] = unbooked_timeslots.filter(date__gte=archive_before).count()
+        return counts
+
+    for time_slot_ids in iter_id_chunks(expired_timeslots, batch_size):
+        started = perf_counter()
+        archived, deleted = archive_time_slots(time_slot_ids)
+        counts['archived_bookings'] += archived
+        counts['archived_time_slots'] += deleted
+        logger.info(
+            f"Archived {archived} bookings and deleted {deleted} time slots before {archive_before} "
+            f"in {perf_counter() - started:.2f}s."
+        )
+
+    for time_slot_ids in iter_id_chunks(unbooked_timeslots, batch_size):
+        started = perf_counter()
+        # Re-checked in case a booking arrived since the chunk was read
+        _, deleted = TimeSlot.objects.filter(id__in=time_slot_ids, bookings=None).delete()
+        deleted = deleted.get(TimeSlot._meta.label, 0)
+        counts['deleted_time_slots'] += deleted
+        logger.info(f"Deleted {deleted} past unbooked time slots in {perf_counter() - started:.2f}s.")
+
+    return counts
@@ -0,0 +1,280 @@
+# api/models/booking/schedule.py
+
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db import transaction
+from api.models.booking.general_time_slot import GeneralTimeSlot
+from api.models.booking.time_slot import TimeSlot
+
+def get_time_slot_horizon_days():
+    """
+    Number of days ahead (starting today) for which TimeSlots are materialized.
+    """
+    return getattr(settings, 'TIME_SLOT_HORIZON_DAYS', 30)
+
+def get_horizon_window():
+    """
+    Return the (start_date, end_date) window covered by materialized TimeSlots.
+    """
+    today = datetime.today().date()
+    return today, today + timedelta(days=get_time_slot_horizon_days() - 1)
+
+def generate_slot_times(general_time_slot, single_date):
+    """
+    Return the times generated by a GeneralTimeSlot on a given date.
+    """
+    current_time = datetime.combine(single_date, general_time_slot.start_time)
+    end_time = datetime.combine(single_date, general_time_slot.end_time)
+    if not general_time_slot.interval_minutes:
+        return [current_time.time()]
+
+    times = []
+    while current_time <= end_time:
+        times.append(current_time.time())
+        current_time += timedelta(minutes=general_time_slot.interval_minutes)
+    return times
+
+def get_rule_dates(general_time_slot, start_date, end_date):
+    """
+    Return the dates of the window that fall on the GeneralTimeSlot's weekday.
+    """
+    offset = (general_time_slot.weekday - start_date.weekday()) % 7
+    single_date = start_date + timedelta(days=offset)
+    dates = []
+    while single_date <= end_date:
+        dates.append(single_date)
+        single_date += timedelta(days=7)
+    return dates
+
+def build_time_slot(general_time_slot, single_date, slot_time):
+    """
+    Return an unsaved TimeSlot generated by a GeneralTimeSlot.
+    """
+    return TimeSlot(
+        booking_system_id=general_time_slot.booking_system_id,
+        general_timeslot=general_time_slot,
+        date=single_date,
+        time=slot_time,
+        max_people=general_time_slot.max_people,
+        max_tables=general_time_slot.max_tables,
+        min=general_time_slot.min,
+        max=general_time_slot.max,
+    )
+
+def iter_booking_system_id_chunks(weekday, chunk_size):
+    """
+    Yield sorted lists of at most `chunk_size` ids of the (non-lazy) booking
+    systems that have a GeneralTimeSlot on `weekday`, paging by id so memory
+    stays bounded.
+    """
+    last_id = 0
+    while True:
+        booking_system_ids = list(
+            GeneralTimeSlot.objects.filter(
+                weekday=weekday,
+                booking_system_id__gt=last_id,
+                booking_system__lazy_time_slots=False,
+            )
+            .order_by('booking_system_id')
+            .values_list('booking_system_id', flat=True)
+            .distinct()[:chunk_size]
+        )
+        if not booking_system_ids:
+            return
+        yield booking_system_ids
+        last_id = booking_system_ids[-1]
+
+def materialize_time_slots(general_time_slots, start_date, end_date):
+    """
+    Bring the TimeSlots generated by the given GeneralTimeSlots up to date
+    for the window [start_date, end_date].
+
+    The existing slots of the involved booking systems are loaded with one
+    query and diffed in memory: missing times are bulk created, and slots that
+    already exist but are linked to another rule or closed are relinked and
+    reopened with one bulk update. Returns (created, updated).
+    """
+    general_time_slots = list(general_time_slots)
+    if not general_time_slots:
+        return 0, 0
+
+    booking_system_ids = {gts.booking_system_id for gts in general_time_slots}
+    existing = {
+        (ts.booking_system_id, ts.date, ts.time): ts
+        for ts in TimeSlot.objects.filter(
+            booking_system_id__in=booking_system_ids,
+            date__range=(start_date, end_date),
+        ).only('id', 'booking_system_id', 'date', 'time', 'general_timeslot_id', 'is_open')
+    }
+
+    timeslots_to_create = []
+    timeslots_to_update = []
+    for general_time_slot in general_time_slots:
+        for single_date in get_rule_dates(general_time_slot, start_date, end_date):
+            for slot_time in generate_slot_times(general_time_slot, single_date):
+                key = (general_time_slot.booking_system_id, single_date, slot_time)
+                timeslot = existing.get(key)
+
+                if timeslot is None:
+                    # Create a new TimeSlot
+                    timeslot = build_time_slot(general_time_slot, single_date, slot_time)
+                    existing[key] = timeslot
+                    timeslots_to_create.append(timeslot)
+                elif timeslot.pk and (
+                    timeslot.general_timeslot_id != general_time_slot.id or not timeslot.is_open
+                ):
+                    # Link existing TimeSlot to this GeneralTimeSlot and make sure it's open
+                    timeslot.general_timeslot_id = general_time_slot.id
+                    timeslot.is_open = True
+                    timeslots_to_update.append(timeslot)
+
+    with transaction.atomic():
+        if timeslots_to_create:
+            TimeSlot.objects.bulk_create(timeslots_to_create, batch_size=500, ignore_conflicts=True)
+        if timeslots_to_update:
+            TimeSlot.objects.bulk_update(timeslots_to_update, ['general_timeslot', 'is_open'], batch_size=500)
+
+    return len(timeslots_to_create), len(timeslots_to_update)
+
+def materialize_general_time_slot(general_time_slot):
+    """
+    Materialize the TimeSlots of a single GeneralTimeSlot over the horizon,
+    unless its booking system computes them lazily.
+    """
+    if general_time_slot.booking_system.lazy_time_slots:
+        return 0, 0
+    start_date, end_date = get_horizon_window()
+    return materialize_time_slots([general_time_slot], start_date, end_date)
+
+# Fields copied onto every generated TimeSlot and updated in place on edits
+RULE_CAPACITY_FIELDS = ('max_people', 'max_tables', 'min', 'max')
+# Fields that decide which dates and times a GeneralTimeSlot generates
+RULE_TIME_FIELDS = ('booking_system_id', 'weekday', 'start_time', 'end_time', 'interval_minutes')
+
+def reschedule_general_time_slot(general_time_slot, previous=None):
+    """
+    Apply an edited GeneralTimeSlot to its TimeSlots over the horizon with the
+    minimal change set, keeping untouched slots (and their IDs) in place.
+
+    Capacity fields are updated in place with one UPDATE. When `previous` (the
+    rule's RULE_TIME_FIELDS before the edit) shows the schedule itself did not
+    change, that is all; otherwise slots whose time is no longer generated are
+    deleted, or closed if they have bookings, and newly generated times are
+    materialized (unless the booking system is lazy). Returns
+    (updated, removed, created).
+    """
+    start_date, end_date = get_horizon_window()
+    linked_timeslots = TimeSlot.objects.filter(
+        general_timeslot=general_time_slot,
+        date__range=(start_date, end_date),
+    )
+
+    capacity = {field: getattr(general_time_slot, field) for field in RULE_CAPACITY_FIELDS}
+    updated = linked_timeslots.exclude(**capacity).update(**capacity)
+
+    if previous is not None and all(
+        previous[field] == getattr(general_time_slot, field) for field in RULE_TIME_FIELDS
+    ):
+        return updated, 0, 0
+
+    wanted = {
+        (general_time_slot.booking_system_id, single_date, slot_time)
+        for single_date in get_rule_dates(general_time_slot, start_date, end_date)
+        for slot_time in generate_slot_times(general_time_slot, single_date)
+    }
+    removed_ids = [
+        pk for pk, booking_system_id, single_date, slot_time in linked_timeslots.values_list(
+            'id', 'booking_system_id', 'date', 'time'
+        )
+        if (booking_system_id, single_date, slot_time) not in wanted
+    ]
+    if removed_ids:
+        removed_timeslots = TimeSlot.objects.filter(id__in=removed_ids)
+        # Delete timeslots without bookings
+        removed_timeslots.filter(bookings=None).delete()
+        # Set `is_open=False` for the remaining ones, which have bookings
+        removed_timeslots.filter(is_open=True).update(is_open=False)
+
+    created, _ = materialize_general_time_slot(general_time_slot)
+    return updated, len(removed_ids), created
+
+def get_virtual_time_slots(booking_systems, start_date, end_date):
+    """
+    Return the TimeSlots of lazy booking systems for [start_date, end_date],
+    ordered by booking system, date and time.
+
+    Stored TimeSlots (booked or edited by the owner) override the slots their
+    GeneralTimeSlots generate; the generated ones are returned as unsaved
+    TimeSlots with no id and nothing booked. Slots are only generated within
+    the horizon, where get_time_slot_at() can book them.
+    """
+    booking_systems = {booking_system.id: booking_system for booking_system in booking_systems}
+    if not booking_systems:
+        return []
+
+    timeslots = {
+        (ts.booking_system_id, ts.date, ts.time): ts
+        for ts in TimeSlot.objects.filter(
+            booking_system_id__in=booking_systems,
+            date__range=(start_date, end_date),
+        )
+    }
+    horizon_start, horizon_end = get_horizon_window()
+    rule_start, rule_end = max(start_date, horizon_start), min(end_date, horizon_end)
+    general_time_slots = GeneralTimeSlot.objects.filter(booking_system_id__in=booking_systems)
+    for general_time_slot in general_time_slots:
+        for single_date in get_rule_dates(general_time_slot, rule_start, rule_end):
+            for slot_time in generate_slot_times(general_time_slot, single_date):
+                key = (general_time_slot.booking_system_id, single_date, slot_time)
+                if key not in timeslots:
+                    timeslots[key] = build_time_slot(general_time_slot, single_date, slot_time)
+
+    for timeslot in timeslots.values():
+        timeslot.booking_system = booking_systems[timeslot.booking_system_id]
+    return sorted(timeslots.values(), key=lambda ts: (ts.booking_system_id, ts.date, ts.time))
+
+def get_time_slot_at(booking_system, single_date, slot_time):
+    """
+    Return the TimeSlot of a booking system at a date and time: the stored one
+    if it exists, otherwise (for lazy booking systems, within the horizon) the
+    unsaved one generated by its GeneralTimeSlots. Returns None if there is none.
+    """
+    timeslot = TimeSlot.objects.filter(
+        booking_system=booking_system, date=single_date, time=slot_time
+    ).select_related('booking_system').first()
+    if timeslot or not booking_system.lazy_time_slots:
+        return timeslot
+
+    start_date, end_date = get_horizon_window()
+    if not start_date <= single_date <= end_date:
+        return None
+    general_time_slots = GeneralTimeSlot.objects.filter(
+        booking_system=booking_system, weekday=single_date.weekday()
+    )
+    for general_time_slot in general_time_slots:
+        if slot_time in generate_slot_times(general_time_slot, single_date):
+            timeslot = build_time_slot(general_time_slot, single_date, slot_time)
+            timeslot.booking_system = booking_system
+            return timeslot
+    return None
+
+def materialize_time_slot(timeslot):
+    """
+    Store a virtual TimeSlot and return the stored row.
+
+    The (booking_system, date, time) unique constraint serializes concurrent
+    first bookings: the INSERT of a racing request waits for the winner and
+    then picks up its row instead of creating a duplicate.
+    """
+    if timeslot.pk:
+        return timeslot
+    timeslot, _ = TimeSlot.objects.get_or_create(
+        booking_system_id=timeslot.booking_system_id,
+        date=timeslot.date,
+        time=timeslot.time,
+        defaults={
+            field: getattr(timeslot, field)
+            for field in ('general_timeslot', 'max_people', 'max_tables', 'min', 'max')
+        },
+    )
+    return timeslot
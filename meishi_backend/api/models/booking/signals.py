@@ -1,29 +1,39 @@
-from django.db.models.signals import post_save, pre_delete
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from datetime import datetime, timedelta
+from api.models.booking.booking import Booking
+from api.models.booking.booking_system import BookingSystem
 from api.models.booking.general_time_slot import GeneralTimeSlot
+from api.models.booking.schedule import (
+    RULE_TIME_FIELDS,
+    get_horizon_window,
+    materialize_general_time_slot,
+    materialize_time_slots,
+    reschedule_general_time_slot,
+)
 from api.models.booking.time_slot import TimeSlot
 from django.db import transaction
 
+@receiver(pre_save, sender=GeneralTimeSlot)
+def remember_general_time_slot_rule(sender, instance, **kwargs):
+    """
+    Signal to keep the schedule of a GeneralTimeSlot as it was before an update.
+    """
+    instance._previous_rule = None
+    if instance.pk:
+        instance._previous_rule = sender.objects.filter(pk=instance.pk).values(*RULE_TIME_FIELDS).first()
+
 @receiver(post_save, sender=GeneralTimeSlot)
 def handle_general_time_slot_save(sender, instance, created, **kwargs):
     """
     Signal to handle creation or update of TimeSlots when a GeneralTimeSlot is saved.
     """
     if created:
-        # New GeneralTimeSlot: Create TimeSlots for the next 30 days
-        create_timeslots_for_next_30_days(instance)
+        # New GeneralTimeSlot: Create TimeSlots over the horizon
+        materialize_general_time_slot(instance)
     else:
-        # Updated GeneralTimeSlot: Recreate TimeSlots for the next 30 days
+        # Updated GeneralTimeSlot: Apply only what changed to its TimeSlots
         with transaction.atomic():
-            existing_timeslots = TimeSlot.objects.filter(general_timeslot=instance)
-            # Delete timeslots without bookings
-            existing_timeslots.filter(bookings=None).delete()
-            # Set `is_open=False` for timeslots with bookings
-            existing_timeslots.exclude(bookings=None).update(is_open=False)
-
-            # Recreate TimeSlots for the next 30 days
-            create_timeslots_for_next_30_days(instance)
+            reschedule_general_time_slot(instance, getattr(instance, '_previous_rule', None))
 
 @receiver(pre_delete, sender=GeneralTimeSlot)
 def handle_general_time_slot_delete(sender, instance, **kwargs):
@@ -37,46 +47,34 @@ def handle_general_time_slot_delete(sender, instance, **kwargs):
         # Set `is_open=False` for timeslots with bookings
         timeslots.exclude(bookings=None).update(is_open=False)
 
-def create_timeslots_for_next_30_days(general_time_slot):
+@receiver(pre_save, sender=BookingSystem)
+def remember_booking_system_mode(sender, instance, **kwargs):
     """
-    Helper function to create TimeSlots for the next 30 days based on a GeneralTimeSlot.
+    Signal to keep whether a BookingSystem computed its TimeSlots lazily before an update.
     """
-    today = datetime.today().date()
-    timeslots_to_create = []
-
-    with transaction.atomic():
-        for single_date in (today + timedelta(days=n) for n in range(30)):
-            if single_date.weekday() == general_time_slot.weekday:
-                current_time = datetime.combine(single_date, general_time_slot.start_time)
-                end_time = datetime.combine(single_date, general_time_slot.end_time)
+    instance._was_lazy = False
+    if instance.pk:
+        instance._was_lazy = bool(
+            sender.objects.filter(pk=instance.pk).values_list('lazy_time_slots', flat=True).first()
+        )
 
-                while current_time <= end_time:
-                    existing_timeslot = TimeSlot.objects.filter(
-                        booking_system=general_time_slot.booking_system,
-                        date=single_date,
-                        time=current_time.time()
-                    ).first()
-
-                    if existing_timeslot:
-                        # Link existing TimeSlot to this GeneralTimeSlot
-                        existing_timeslot.general_timeslot = general_time_slot
-                        existing_timeslot.is_open = True  # Ensure it's open
-                        existing_timeslot.save()
-                    else:
-                        # Create a new TimeSlot
-                        timeslots_to_create.append(TimeSlot(
-                            booking_system=general_time_slot.booking_system,
-                            general_timeslot=general_time_slot,
-                            date=single_date,
-                            time=current_time.time(),
-                            max_people=general_time_slot.max_people,
-                            max_tables=general_time_slot.max_tables,
-                            min=general_time_slot.min,
-                            max=general_time_slot.max
-                        ))
-
-                    current_time += timedelta(minutes=general_time_slot.interval_minutes)
+@receiver(post_save, sender=BookingSystem)
+def handle_booking_system_mode_change(sender, instance, created, **kwargs):
+    """
+    Signal to materialize the TimeSlots of a BookingSystem that stops being lazy.
+    """
+    if not created and getattr(instance, '_was_lazy', False) and not instance.lazy_time_slots:
+        start_date, end_date = get_horizon_window()
+        materialize_time_slots(instance.general_time_slots.all(), start_date, end_date)
 
-    # Bulk create new TimeSlots
-    if timeslots_to_create:
-        TimeSlot.objects.bulk_create(timeslots_to_create)
+@receiver(post_delete, sender=Booking)
+def release_booking_capacity(sender, instance, origin=None, **kwargs):
+    """
+    Signal to give back the people and table of a deleted booking to its TimeSlot.
+    """
+    if not instance.occupies_time_slot:
+        return
+    # Nothing to give back when the TimeSlot itself is being deleted
+    if getattr(origin, 'model', type(origin)) is TimeSlot:
+        return
+    TimeSlot.objects.filter(pk=instance.time_slot_id).adjust_booked_counts(-instance.people, -1)
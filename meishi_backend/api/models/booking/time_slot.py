@@ -1,8 +1,79 @@
 # api/models/booking/time_slot.py
+from django.apps import apps
 from django.db import models
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.forms import ValidationError
 from api.models.booking.booking_system import BookingSystem
 
+class TimeSlotQuerySet(models.QuerySet):
+    def with_occupancy(self):
+        """
+        Annotate each time slot with the people and tables taken by its
+        non-canceled bookings, computed in SQL in the same query.
+        """
+        active_bookings = Q(bookings__isnull=False) & ~Q(bookings__status='canceled')
+        return self.annotate(
+            current_booked_people=Coalesce(Sum('bookings__people', filter=active_bookings), 0),
+            current_number_of_tables=Count('bookings', filter=active_bookings),
+        )
+
+    def with_drifted_counts(self):
+        """
+        Restrict to time slots whose stored booked_people/booked_tables no
+        longer match their non-canceled bookings.
+        """
+        return self.with_occupancy().exclude(
+            booked_people=F('current_booked_people'),
+            booked_tables=F('current_number_of_tables'),
+        )
+
+    def adjust_booked_counts(self, people, tables):
+        """
+        Atomically add `people` and `tables` (which may be negative) to the
+        stored counters of every time slot in the queryset.
+        """
+        return self.update(
+            booked_people=F('booked_people') + people,
+            booked_tables=F('booked_tables') + tables,
+        )
+
+    def reserve(self, people, tables=1, party_size=None):
+        """
+        Take `tables` tables and `people` seats in a single guarded UPDATE,
+        only if the slot is open, accepts the party size (`people` unless a
+        grown booking passes its new size) and still has capacity.
+        Returns True when the reservation was applied.
+
+        The guard only references the slot's own columns so that concurrent
+        reservations re-check it against the latest row version.
+        """
+        party_size = people if party_size is None else party_size
+        return self.filter(
+            is_open=True,
+            min__lte=party_size,
+            max__gte=party_size,
+            booked_people__lte=F('max_people') - people,
+            booked_tables__lte=F('max_tables') - tables,
+        ).adjust_booked_counts(people, tables) > 0
+
+    def sync_booked_counts(self):
+        """
+        Recompute the stored counters from the bookings table in a single
+        UPDATE. Returns the number of time slots updated.
+        """
+        Booking = apps.get_model('api', 'Booking')
+        active_bookings = (
+            Booking.objects.filter(time_slot=OuterRef('pk'))
+            .exclude(status='canceled')
+            .order_by()
+            .values('time_slot')
+        )
+        return self.update(
+            booked_people=Coalesce(Subquery(active_bookings.annotate(total=Sum('people')).values('total')), 0),
+            booked_tables=Coalesce(Subquery(active_bookings.annotate(total=Count('id')).values('total')), 0),
+        )
+
 class TimeSlot(models.Model):
     """
     Represents a specific time slot for bookings.
@@ -49,8 +120,18 @@ class TimeSlot(models.Model):
         default=20,
         help_text="Maximum number of people allowed in this timeslot."
     )
+    booked_people = models.PositiveIntegerField(
+        default=0,
+        help_text="People in the non-canceled bookings of this timeslot (maintained by Booking)."
+    )
+    booked_tables = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of non-canceled bookings of this timeslot (maintained by Booking)."
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = TimeSlotQuerySet.as_manager()
+
     class Meta:
         unique_together = ('booking_system', 'date', 'time')
         indexes = [
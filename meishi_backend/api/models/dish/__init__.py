@@ -4,4 +4,6 @@ from .dish import Dish
 from .category import Category
 from .course import Course
 from .favorite import DishFavorite
-from .like_dislike import DishLikeDislike
\ No newline at end of file
+from .like_dislike import DishLikeDislike
+from .reaction_day import DishReactionDay
+from .counter_shard import DishCounterShard
\ No newline at end of file
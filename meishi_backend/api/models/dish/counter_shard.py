@@ -0,0 +1,25 @@
+# api/models/dish/counter_shard.py
+
+from django.db import models
+from api.models.dish import Dish
+
+class DishCounterShard(models.Model):
+    """
+    Reaction counter deltas of a dish collected in one of
+    REACTION_COUNTER_SHARDS rows per day, until they are folded into the
+    dish's counters (see api.counters).
+    """
+    dish = models.ForeignKey(Dish, on_delete=models.CASCADE, related_name="counter_shards")
+    day = models.DateField()
+    shard = models.PositiveSmallIntegerField()
+    favorites_count = models.IntegerField(default=0)
+    like_count = models.IntegerField(default=0)
+    dislike_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dish', 'day', 'shard'], name='unique_dish_counter_shard')
+        ]
+
+    def __str__(self):
+        return f"{self.dish} - {self.day} - {self.shard}"
@@ -6,7 +6,7 @@ from api.models.dish.course import Course
 from api.models.dish.category import Category
 from datetime import timedelta
 from django.utils.timezone import now
-from django.db.models import F
+from api.counters import adjust_counts, wilson_lower_bound
 
 # Function to define the upload path for dish images
 def dish_image_upload_path(instance, filename):
@@ -32,14 +32,32 @@ class Dish(models.Model):
     favorites_count = models.PositiveIntegerField(default=0)
     like_count = models.PositiveIntegerField(default=0)
     dislike_count = models.PositiveIntegerField(default=0)
+    # Likes of recent days, summed from the daily reaction buckets
+    daily_like_count = models.PositiveIntegerField(default=0)
     weekly_like_count = models.PositiveIntegerField(default=0)
+    monthly_like_count = models.PositiveIntegerField(default=0)
+    # Decayed likes minus dislikes as of trending_day (see api.counters)
+    trending_score = models.FloatField(default=0)
+    trending_day = models.IntegerField(default=0)
+    # Lower bound of the Wilson interval of the share of likes (see api.counters)
+    wilson_score = models.FloatField(default=0)
 
     class Meta:
         ordering = ['-created_at']
         
         indexes = [
             models.Index(fields=['restaurant']),
-            models.Index(fields=['like_count']),
+            # The id ends each index as the tie-breaker of keyset pagination
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['like_count', 'id']),
+            models.Index(fields=['favorites_count', 'id']),
+            models.Index(fields=['daily_like_count', 'id']),
+            models.Index(fields=['weekly_like_count', 'id']),
+            models.Index(fields=['monthly_like_count', 'id']),
+            models.Index(fields=['trending_score', 'id']),
+            models.Index(fields=['wilson_score', 'id']),
+            # Keyset pagination of a restaurant's dishes (see api.pagination)
+            models.Index(fields=['restaurant', 'name', 'id']),
             models.Index(fields=['type']),
         ]
 
@@ -60,44 +78,26 @@ class Dish(models.Model):
             self.image.delete(save=False)
         super().delete(*args, **kwargs)
     
+    # Reaction counters go through api.counters, which applies them directly
+    # or buffers them for a batched flush (REACTION_COUNTER_BACKEND).
     def increment_favorites_count(self):
-        # Increase favorites_count by 1 atomically
-        Dish.objects.filter(pk=self.pk).update(
-            favorites_count=F('favorites_count') + 1
-        )
-        self.refresh_from_db()
+        adjust_counts(self, favorites_count=1)
 
     def decrement_favorites_count(self):
-        # Decrease favorites_count by 1 atomically
-        Dish.objects.filter(pk=self.pk).update(
-            favorites_count=F('favorites_count') - 1
-        )
-        self.refresh_from_db()
+        adjust_counts(self, favorites_count=-1)
     
     def increment_like_count(self):
-        Dish.objects.filter(pk=self.pk).update(
-            like_count=F('like_count') + 1
-        )
-        self.refresh_from_db()
+        adjust_counts(self, like_count=1)
 
     def increment_dislike_count(self):
-        Dish.objects.filter(pk=self.pk).update(
-            dislike_count=F('dislike_count') + 1
-        )
-        self.refresh_from_db()
+        adjust_counts(self, dislike_count=1)
     
     def decrement_like_count(self):
-        Dish.objects.filter(pk=self.pk).update(
-            like_count=F('like_count') - 1
-        )
-        self.refresh_from_db()
+        adjust_counts(self, like_count=-1)
 
     def decrement_dislike_count(self):
-        Dish.objects.filter(pk=self.pk).update(
-            dislike_count=F('dislike_count') - 1
-        )
-        self.refresh_from_db()
-
+        adjust_counts(self, dislike_count=-1)
+    
     def update_favorites_count(self):
         self.favorites_count = self.dish_favorites.count()
         self.save()
@@ -105,6 +105,7 @@ class Dish(models.Model):
     def update_like_dislike_counts(self):
         self.like_count = self.dish_likes_dislikes.filter(type='like').count()
         self.dislike_count = self.dish_likes_dislikes.filter(type='dislike').count()
+        self.wilson_score = wilson_lower_bound(self.like_count, self.dislike_count)
         self.save()
         
     def update_weekly_like_count(self):
@@ -21,6 +21,9 @@ class DishLikeDislike(models.Model):
         constraints = [
             models.UniqueConstraint(fields=['user', 'dish'], name='unique_user_dish_like_dislike')
         ]
+        indexes = [
+            models.Index(fields=['dish', 'type', 'created_at']),
+        ]
     
     def __str__(self):
         return f"{self.user} - {self.type} - {self.dish}"
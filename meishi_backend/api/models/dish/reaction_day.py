@@ -0,0 +1,27 @@
+# api/models/dish/reaction_day.py
+
+from django.db import models
+from api.models.dish import Dish
+
+class DishReactionDay(models.Model):
+    """
+    Reactions to a dish made on one day, kept up to date as they are
+    added, changed or removed (see api.counters), so the counts of any window
+    are a sum over a few rows.
+    """
+    dish = models.ForeignKey(Dish, on_delete=models.CASCADE, related_name="reaction_days")
+    day = models.DateField()
+    favorites_count = models.IntegerField(default=0)
+    like_count = models.IntegerField(default=0)
+    dislike_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dish', 'day'], name='unique_dish_reaction_day')
+        ]
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+
+    def __str__(self):
+        return f"{self.dish} - {self.day}"
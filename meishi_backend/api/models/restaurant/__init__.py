@@ -5,3 +5,5 @@ from .cuisine import Cuisine
 from .favorite import Favorite
 from .like_dislike import LikeDislike
 from .restaurant_photo import RestaurantPhoto
+from .reaction_day import RestaurantReactionDay
+from .counter_shard import RestaurantCounterShard
@@ -0,0 +1,25 @@
+# api/models/restaurant/counter_shard.py
+
+from django.db import models
+from api.models.restaurant import Restaurant
+
+class RestaurantCounterShard(models.Model):
+    """
+    Reaction counter deltas of a restaurant collected in one of
+    REACTION_COUNTER_SHARDS rows per day, until they are folded into the
+    restaurant's counters (see api.counters).
+    """
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name="counter_shards")
+    day = models.DateField()
+    shard = models.PositiveSmallIntegerField()
+    favorites_count = models.IntegerField(default=0)
+    like_count = models.IntegerField(default=0)
+    dislike_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant', 'day', 'shard'], name='unique_restaurant_counter_shard')
+        ]
+
+    def __str__(self):
+        return f"{self.restaurant} - {self.day} - {self.shard}"
@@ -21,6 +21,9 @@ class LikeDislike(models.Model):
         constraints = [
             models.UniqueConstraint(fields=['user', 'restaurant'], name='unique_user_like_dislike')
         ]
+        indexes = [
+            models.Index(fields=['restaurant', 'type', 'created_at']),
+        ]
         
     def __str__(self):
         return f"{self.user} - {self.type} - {self.restaurant}"
\ No newline at end of file
@@ -7,7 +7,7 @@ from api.models.user.user import CustomUser
 from api.models.restaurant.cuisine import Cuisine
 from datetime import timedelta
 from django.utils.timezone import now
-from django.db.models import F
+from api.counters import adjust_counts, wilson_lower_bound
 
 def restaurant_logo_upload_path(instance, filename):
     # Extract the file extension
@@ -49,7 +49,15 @@ class Restaurant(models.Model):
     favorites_count = models.PositiveIntegerField(default=0)
     like_count = models.PositiveIntegerField(default=0)
     dislike_count = models.PositiveIntegerField(default=0)
+    # Likes of recent days, summed from the daily reaction buckets
+    daily_like_count = models.PositiveIntegerField(default=0)
     weekly_like_count = models.PositiveIntegerField(default=0)
+    monthly_like_count = models.PositiveIntegerField(default=0)
+    # Decayed likes minus dislikes as of trending_day (see api.counters)
+    trending_score = models.FloatField(default=0)
+    trending_day = models.IntegerField(default=0)
+    # Lower bound of the Wilson interval of the share of likes (see api.counters)
+    wilson_score = models.FloatField(default=0)
     currency = models.CharField(max_length=3, default="€")
     
     class Meta:
@@ -57,7 +65,15 @@ class Restaurant(models.Model):
         
         indexes = [
             models.Index(fields=['owner']),
-            models.Index(fields=['like_count']),
+            # The id ends each index as the tie-breaker of keyset pagination
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['like_count', 'id']),
+            models.Index(fields=['favorites_count', 'id']),
+            models.Index(fields=['daily_like_count', 'id']),
+            models.Index(fields=['weekly_like_count', 'id']),
+            models.Index(fields=['monthly_like_count', 'id']),
+            models.Index(fields=['trending_score', 'id']),
+            models.Index(fields=['wilson_score', 'id']),
         ]
 
     def __str__(self):
@@ -77,43 +93,25 @@ class Restaurant(models.Model):
             self.logo.delete(save=False)
         super().delete(*args, **kwargs)
     
+    # Reaction counters go through api.counters, which applies them directly
+    # or buffers them for a batched flush (REACTION_COUNTER_BACKEND).
     def increment_favorites_count(self):
-        # Increase favorites_count by 1 atomically
-        Restaurant.objects.filter(pk=self.pk).update(
-            favorites_count=F('favorites_count') + 1
-        )
-        self.refresh_from_db()
+        adjust_counts(self, favorites_count=1)
 
     def decrement_favorites_count(self):
-        # Decrease favorites_count by 1 atomically
-        Restaurant.objects.filter(pk=self.pk).update(
-            favorites_count=F('favorites_count') - 1
-        )
-        self.refresh_from_db()
+        adjust_counts(self, favorites_count=-1)
     
     def increment_like_count(self):
-        Restaurant.objects.filter(pk=self.pk).update(
-            like_count=F('like_count') + 1
-        )
-        self.refresh_from_db()
+        adjust_counts(self, like_count=1)
 
     def increment_dislike_count(self):
-        Restaurant.objects.filter(pk=self.pk).update(
-            dislike_count=F('dislike_count') + 1
-        )
-        self.refresh_from_db()
+        adjust_counts(self, dislike_count=1)
     
     def decrement_like_count(self):
-        Restaurant.objects.filter(pk=self.pk).update(
-            like_count=F('like_count') - 1
-        )
-        self.refresh_from_db()
+        adjust_counts(self, like_count=-1)
 
     def decrement_dislike_count(self):
-        Restaurant.objects.filter(pk=self.pk).update(
-            dislike_count=F('dislike_count') - 1
-        )
-        self.refresh_from_db()
+        adjust_counts(self, dislike_count=-1)
     
     def update_favorites_count(self):
         self.favorites_count = self.favorites.count()
@@ -122,6 +120,7 @@ class Restaurant(models.Model):
     def update_like_dislike_counts(self):
         self.like_count = self.likes_dislikes.filter(type='like').count()
         self.dislike_count = self.likes_dislikes.filter(type='dislike').count()
+        self.wilson_score = wilson_lower_bound(self.like_count, self.dislike_count)
         self.save()
 
     def update_weekly_like_count(self):
@@ -32,6 +32,9 @@ class CustomUser(AbstractUser):
     email = models.EmailField()
     first_name = models.CharField(max_length=20)
     last_name = models.CharField(max_length=40)
+    # Set (with is_active=False) while a large account waits for the
+    # background deletion job
+    deletion_pending = models.BooleanField(default=False)
 
     REQUIRED_FIELDS = ['email', 'first_name', 'last_name', 'phone_number', 'country_code', 'user_type']
 
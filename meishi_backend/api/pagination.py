@@ -1,7 +1,160 @@
 # api/pagination.py
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+from django.conf import settings
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 class DefaultPagination(PageNumberPagination):
     page_size = 18  # Default number of items per page
     page_size_query_param = 'page_size'  # Allow the client to set the page size
     max_page_size = 100  # Maximum number of items per page
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only cursor pagination for infinite scrolling.
+
+    Rows are ordered by the view's ordering (e.g. -weekly_like_count) with the
+    id as tie-breaker, and the cursor holds the ordering values of the last
+    row served. The next page is a WHERE (score, id) < (last score, last id)
+    range read from the composite (score, id) index, so page N costs the
+    same as page 1. No COUNT(*) is run. A row whose score changes between
+    requests may still be served twice or skipped, as it moves across the
+    cursor.
+    """
+    page_size = DefaultPagination.page_size
+    page_size_query_param = DefaultPagination.page_size_query_param
+    max_page_size = DefaultPagination.max_page_size
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        return DefaultPagination.get_page_size(self, request)
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Return the ordering of the view's OrderingFilter (or its default),
+        ended by the id in the direction of the last field.
+        """
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        ordering = list(ordering or getattr(view, 'ordering', None) or self.ordering)
+        if ordering[-1].lstrip('-') not in ('id', 'pk'):
+            ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+        return ordering
+
+    def encode_cursor(self, values):
+        # str() keeps the microseconds of datetimes, which DjangoJSONEncoder drops
+        position = json.dumps({'o': self.ordering, 'v': values}, default=str)
+        return b64encode(position.encode(), altchars=b'-_').decode()
+
+    def decode_cursor(self, request):
+        """
+        Return the ordering values of the cursor's row, or None on the first
+        page. Cursors of another ordering are rejected.
+        """
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            position = json.loads(b64decode(cursor.encode(), altchars=b'-_', validate=True).decode())
+            values = position['v']
+            valid = position['o'] == self.ordering and len(values) == len(self.ordering)
+        except (BinasciiError, UnicodeDecodeError, ValueError, KeyError, TypeError):
+            valid = False
+        if not valid:
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def after(self, values):
+        """
+        Return the filter of the rows that come after `values` in the ordering:
+        (a, b) > (x, y) as a >= x AND (a > x OR (a = x AND b > y)), per field
+        direction. The leading a >= x is the bound the database can seek the
+        (a, b) index to; the OR alone would make it scan from the start.
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        first = self.ordering[0]
+        bound = 'lte' if first.startswith('-') else 'gte'
+        return Q(**{f'{first.lstrip("-")}__{bound}': values[0]}) & condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        # The ordering values are selected as aliases, so a cursor can be
+        # built even when ?fields= deferred the columns
+        aliases = {f'cursor_{index}': F(field.lstrip('-')) for index, field in enumerate(self.ordering)}
+        queryset = queryset.annotate(**aliases).order_by(*self.ordering)
+        values = self.decode_cursor(request)
+        if values is not None:
+            queryset = queryset.filter(self.after(values))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_values = [getattr(rows[-1], alias) for alias in aliases] if self.has_next else None
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_values))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+class ListingPagination(BasePagination):
+    """
+    Pagination of the dish and restaurant listings: page numbers by default,
+    keyset cursors with ?pagination=cursor or for the clients whose
+    X-Client-Platform header is in CURSOR_PAGINATION_PLATFORMS (the mobile
+    apps' infinite scroll). ?pagination=page forces page numbers.
+    """
+    pagination_query_param = 'pagination'
+
+    def uses_cursor(self, request):
+        mode = request.query_params.get(self.pagination_query_param)
+        if mode in ('cursor', 'page'):
+            return mode == 'cursor'
+        platform = request.headers.get('X-Client-Platform', '').lower()
+        return platform in getattr(settings, 'CURSOR_PAGINATION_PLATFORMS', ())
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.paginator = KeysetPagination() if self.uses_cursor(request) else DefaultPagination()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return DefaultPagination().get_paginated_response_schema(schema)
@@ -0,0 +1,152 @@
+# api/reactions.py
+
+"""
+Setting a user's like/dislike of restaurants and dishes, for one target or a
+batch of them, in one short transaction, and reading a user's reactions to
+a page of targets at once.
+
+The user's row is locked first (lock_user_reactions, also taken by the
+create/update/delete reaction endpoints), so the writes of one user (double
+taps, retried requests) run one after the other and the reactions and
+counts read in the transaction stay current until it commits; other users
+are not blocked.
+The new reactions are written with one INSERT ... ON CONFLICT DO UPDATE,
+removed ones with one DELETE, and the counter deltas of all targets go
+through api.counters in one UPDATE.
+"""
+
+from django.apps import apps
+from django.db import transaction
+from django.utils.timezone import localdate
+from api.counters import (
+    COUNTER_FIELDS,
+    FAVORITE_MODELS,
+    adjust_many_counts,
+    get_counter_model,
+    get_reaction_model,
+    get_related_field,
+    reaction_day,
+    reaction_deltas,
+)
+from api.models.user import CustomUser
+
+CREATED = 'created'
+UPDATED = 'updated'
+DELETED = 'deleted'
+UNCHANGED = 'unchanged'
+NOT_FOUND = 'not_found'
+
+def get_reaction_status(old_type, new_type):
+    if old_type == new_type:
+        return UNCHANGED
+    if old_type is None:
+        return CREATED
+    if new_type is None:
+        return DELETED
+    return UPDATED
+
+def lock_user_reactions(user):
+    """
+    Lock the user's row until the end of the transaction, so the user's
+    reaction writes run one at a time and each reads the reactions it
+    changes after the previous one committed.
+    """
+    list(CustomUser.objects.select_for_update().filter(pk=user.pk).values_list('pk', flat=True))
+
+def set_reactions(user, model_name, types_by_pk):
+    """
+    Set the user's reaction to each {pk: type} target of a counted model,
+    where type is 'like', 'dislike' or None to remove the reaction. Setting
+    the current reaction again changes nothing.
+
+    Returns a result per target, in the given order: its id, the reaction
+    type, the status (created, updated, deleted, unchanged or not_found) and
+    the target's like/dislike counts after the change.
+    """
+    model = get_counter_model(model_name)
+    reaction_model = get_reaction_model(model_name)
+    related_field = get_related_field(model_name)
+
+    deltas_by_key = {}
+    statuses = {}
+    with transaction.atomic():
+        lock_user_reactions(user)
+        targets = model.objects.only('id', *COUNTER_FIELDS).in_bulk(list(types_by_pk))
+        existing = {
+            getattr(reaction, f'{related_field}_id'): reaction
+            for reaction in reaction_model.objects.filter(
+                user=user, **{f'{related_field}_id__in': targets}
+            ).only('id', f'{related_field}_id', 'type', 'created_at')
+        }
+
+        to_write = []
+        to_delete = []
+        for pk, new_type in types_by_pk.items():
+            if pk not in targets:
+                continue
+            reaction = existing.get(pk)
+            old_type = reaction.type if reaction else None
+            statuses[pk] = get_reaction_status(old_type, new_type)
+            if statuses[pk] == UNCHANGED:
+                continue
+            if new_type is None:
+                to_delete.append(reaction.pk)
+            else:
+                to_write.append(reaction_model(user=user, **{f'{related_field}_id': pk}, type=new_type))
+            # A changed reaction keeps its creation day; a new one is made today
+            day = reaction_day(reaction) if reaction else localdate()
+            deltas_by_key[(pk, day)] = reaction_deltas(old_type, new_type)
+
+        if to_write:
+            reaction_model.objects.bulk_create(
+                to_write,
+                update_conflicts=True,
+                unique_fields=['user', related_field],
+                update_fields=['type'],
+            )
+        if to_delete:
+            reaction_model.objects.filter(pk__in=to_delete).delete()
+        adjust_many_counts(model_name, deltas_by_key)
+
+    for (pk, _), deltas in deltas_by_key.items():
+        for field, delta in deltas.items():
+            setattr(targets[pk], field, getattr(targets[pk], field) + delta)
+
+    results = []
+    for pk, new_type in types_by_pk.items():
+        target = targets.get(pk)
+        if target is None:
+            results.append({related_field: pk, 'type': new_type, 'status': NOT_FOUND})
+            continue
+        results.append({
+            related_field: pk,
+            'type': new_type,
+            'status': statuses[pk],
+            'like_count': target.like_count,
+            'dislike_count': target.dislike_count,
+        })
+    return results
+
+def get_reaction_state(user, model_name, pks):
+    """
+    Return the user's favorite and like/dislike of each target of a counted
+    model as {pk: {'favorite_id', 'like_dislike_id', 'type'}}, with None for
+    what the user has not given, in one query per reaction type. Anonymous
+    users have given nothing and take no query.
+    """
+    state = {
+        pk: {'favorite_id': None, 'like_dislike_id': None, 'type': None}
+        for pk in pks
+    }
+    if not state or not user.is_authenticated:
+        return state
+    related_field = f'{get_related_field(model_name)}_id'
+    favorite_model = apps.get_model('api', FAVORITE_MODELS[model_name])
+    favorites = favorite_model.objects.filter(user=user, **{f'{related_field}__in': state})
+    for pk, favorite_id in favorites.values_list(related_field, 'id'):
+        state[pk]['favorite_id'] = favorite_id
+    reactions = get_reaction_model(model_name).objects.filter(user=user, **{f'{related_field}__in': state})
+    for pk, like_dislike_id, type in reactions.values_list(related_field, 'id', 'type'):
+        state[pk]['like_dislike_id'] = like_dislike_id
+        state[pk]['type'] = type
+    return state
@@ -3,4 +3,5 @@
 from .booking_system_serializer import BookingSystemSerializer
 from .general_time_slot_serializer import GeneralTimeSlotSerializer
 from .time_slot_serializer import TimeSlotSerializer
-from .booking_serializer import BookingSerializer, BookingTypeSerializer, UserBookingSerializer
\ No newline at end of file
+from .booking_serializer import BookingSerializer, BookingTypeSerializer, UserBookingSerializer
+from .archived_booking_serializer import ArchivedBookingSerializer
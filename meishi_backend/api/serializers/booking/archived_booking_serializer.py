@@ -0,0 +1,34 @@
+# api/serializers/booking/archived_booking_serializer.py
+
+from rest_framework import serializers
+from api.models.booking.archived_booking import ArchivedBooking
+
+class ArchivedBookingSerializer(serializers.ModelSerializer):
+    """
+    Read-only serializer for bookings moved to the archive.
+    """
+    class Meta:
+        model = ArchivedBooking
+        fields = [
+            'id',
+            'booking_id',
+            'restaurant',
+            'user',
+            'booking_system_id',
+            'meal_type',
+            'date',
+            'time',
+            'booking_code',
+            'booking_type',
+            'first_name',
+            'last_name',
+            'people',
+            'phone',
+            'email',
+            'notes',
+            'status',
+            'created_at',
+            'updated_at',
+            'archived_at',
+        ]
+        read_only_fields = fields
@@ -3,8 +3,34 @@ from django.core.exceptions import ValidationError as DjangoValidationError
 from api.serializers.booking.time_slot_serializer import CustomerTimeSlotSerializer
 from django.db import transaction
 from api.models.booking.booking import Booking, BookingTypes
+from api.models.booking.booking_system import BookingSystem
+from api.models.booking.schedule import get_time_slot_at, materialize_time_slot
+from api.models.booking.time_slot import TimeSlot
 import uuid
 
+def resolve_time_slot(attrs):
+    """
+    Resolve a booking_system/date/time triple, accepted instead of a time_slot
+    id, to its TimeSlot. For lazy booking systems this may be a virtual slot,
+    which is only stored when the booking is saved.
+    """
+    booking_system = attrs.pop('booking_system', None)
+    slot_date = attrs.pop('date', None)
+    slot_time = attrs.pop('time', None)
+    if attrs.get('time_slot') or not any([booking_system, slot_date, slot_time]):
+        return
+
+    if not all([booking_system, slot_date, slot_time]):
+        raise serializers.ValidationError({
+            "time_slot": "Provide either time_slot or booking_system, date and time."
+        })
+    time_slot = get_time_slot_at(booking_system, slot_date, slot_time)
+    if time_slot is None:
+        raise serializers.ValidationError({
+            "time_slot": "There is no time slot at this date and time."
+        })
+    attrs['time_slot'] = time_slot
+
 class BookingTypeSerializer(serializers.ModelSerializer):
     """
     A serializer for the BookingTypes model.
@@ -20,6 +46,12 @@ class UserBookingSerializer(serializers.ModelSerializer):
     A serializer for the Booking model with comprehensive validation logic.
     """
     time_slot_details = CustomerTimeSlotSerializer(read_only=True, source='time_slot')
+    # Alternative to time_slot, needed to book the virtual slots of lazy booking systems
+    booking_system = serializers.PrimaryKeyRelatedField(
+        queryset=BookingSystem.objects.all(), write_only=True, required=False
+    )
+    date = serializers.DateField(write_only=True, required=False)
+    time = serializers.TimeField(write_only=True, required=False)
     
     class Meta:
         model = Booking
@@ -29,6 +61,9 @@ class UserBookingSerializer(serializers.ModelSerializer):
             'booking_code',
             'time_slot',
             'time_slot_details',
+            'booking_system',
+            'date',
+            'time',
             'booking_type',
             'first_name',
             'last_name',
@@ -48,6 +83,7 @@ class UserBookingSerializer(serializers.ModelSerializer):
             'updated_at',
             'user'
         ]
+        extra_kwargs = {'time_slot': {'required': False}}
 
     def validate_booking_code(self, value):
         """Validate booking_code format if provided"""
@@ -62,6 +98,8 @@ class UserBookingSerializer(serializers.ModelSerializer):
         """
         Comprehensive validation of booking data.
         """
+        resolve_time_slot(attrs)
+
         # Get instance for update operations
         instance = self.instance
         people = attrs.get('people', instance.people if instance else None)
@@ -96,22 +134,20 @@ class UserBookingSerializer(serializers.ModelSerializer):
                 "time_slot": "Bookings are paused for this booking system."
             })
 
+        # Counters maintained on the time slot, minus this booking's own share
+        current_booked_people = time_slot.booked_people
+        current_number_of_tables = time_slot.booked_tables
+        if instance and instance.time_slot_id == time_slot.id and instance.occupies_time_slot:
+            current_booked_people -= instance.people
+            current_number_of_tables -= 1
+
         # 4. Check total capacity (max_people) for the time slot
-        current_booked_people = sum(
-            b.people for b in time_slot.bookings.exclude(status="canceled")
-            if not instance or b.id != instance.id
-        )
         if current_booked_people + people > time_slot.max_people:
             raise serializers.ValidationError({
                 "people": "This time slot has reached its maximum capacity of people."
             })
 
         # 5. Check table capacity (max_tables)
-        current_number_of_tables = (
-            time_slot.bookings.exclude(status="canceled")
-            .exclude(id=instance.id if instance else None)
-            .count()
-        )
         if current_number_of_tables >= time_slot.max_tables:
             raise serializers.ValidationError({
                 "time_slot": "No more tables are available in this time slot."
@@ -121,15 +157,36 @@ class UserBookingSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         with transaction.atomic():
+            # Virtual time slots are stored when their first booking arrives
+            validated_data['time_slot'] = materialize_time_slot(validated_data['time_slot'])
             instance = Booking(**validated_data)
-            instance.save()
+            if not instance.occupies_time_slot:
+                instance.save()
+                return instance
+
+            # The checks above ran without a lock; the guarded UPDATE is what
+            # actually admits the booking, so concurrent requests can never
+            # overbook the time slot.
+            reserved = TimeSlot.objects.filter(pk=instance.time_slot_id).reserve(instance.people)
+            if not reserved:
+                raise serializers.ValidationError({
+                    "time_slot": "This time slot no longer has capacity for this booking."
+                })
+            instance.save(time_slot_reserved=True)
             return instance
 
     def update(self, instance, validated_data):
         with transaction.atomic():
+            if 'time_slot' in validated_data:
+                validated_data['time_slot'] = materialize_time_slot(validated_data['time_slot'])
             for attr, value in validated_data.items():
                 setattr(instance, attr, value)
-            instance.save()
+            # A larger party or a move to another slot is admitted by the same
+            # guarded UPDATE as a new booking
+            try:
+                instance.save(guard_capacity=True)
+            except DjangoValidationError as e:
+                raise serializers.ValidationError(e.message_dict)
             return instance
         
 
@@ -138,6 +195,12 @@ class BookingSerializer(serializers.ModelSerializer):
     A serializer for the Booking model with comprehensive validation logic.
     """
     time_slot_details = CustomerTimeSlotSerializer(read_only=True, source='time_slot')
+    # Alternative to time_slot, needed to book the virtual slots of lazy booking systems
+    booking_system = serializers.PrimaryKeyRelatedField(
+        queryset=BookingSystem.objects.all(), write_only=True, required=False
+    )
+    date = serializers.DateField(write_only=True, required=False)
+    time = serializers.TimeField(write_only=True, required=False)
     
     class Meta:
         model = Booking
@@ -147,6 +210,9 @@ class BookingSerializer(serializers.ModelSerializer):
             'booking_code',
             'time_slot',
             'time_slot_details',
+            'booking_system',
+            'date',
+            'time',
             'booking_type',
             'first_name',
             'last_name',
@@ -166,6 +232,7 @@ class BookingSerializer(serializers.ModelSerializer):
             'updated_at',
             'user'
         ]
+        extra_kwargs = {'time_slot': {'required': False}}
 
     def validate_booking_code(self, value):
         """Validate booking_code format if provided"""
@@ -180,6 +247,8 @@ class BookingSerializer(serializers.ModelSerializer):
         """
         Comprehensive validation of booking data.
         """
+        resolve_time_slot(attrs)
+
         # Get instance for update operations
         instance = self.instance
         people = attrs.get('people', instance.people if instance else None)
@@ -195,13 +264,22 @@ class BookingSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         with transaction.atomic():
+            validated_data['time_slot'] = materialize_time_slot(validated_data['time_slot'])
             instance = Booking(**validated_data)
             instance.save()
             return instance
 
     def update(self, instance, validated_data):
         with transaction.atomic():
+            if 'time_slot' in validated_data:
+                validated_data['time_slot'] = materialize_time_slot(validated_data['time_slot'])
             for attr, value in validated_data.items():
                 setattr(instance, attr, value)
-            instance.save()
+            # Customers' changes pass guard_capacity in the context, so a
+            # larger party or another slot is admitted like a new booking;
+            # restaurant owners may still overbook their own slots.
+            try:
+                instance.save(guard_capacity=self.context.get('guard_capacity', False))
+            except DjangoValidationError as e:
+                raise serializers.ValidationError(e.message_dict)
             return instance
\ No newline at end of file
@@ -11,6 +11,7 @@ class BookingSystemSerializer(serializers.ModelSerializer):
             'restaurant',
             'meal_type',
             'is_paused',
+            'lazy_time_slots',
             'created_at',
         ]
         read_only_fields = ['id', 'created_at']
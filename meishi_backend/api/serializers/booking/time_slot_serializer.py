@@ -4,8 +4,8 @@ from api.models.booking.time_slot import TimeSlot
 from django.db import transaction
 
 class TimeSlotSerializer(serializers.ModelSerializer):
-    current_booked_people = serializers.SerializerMethodField()
-    current_number_of_tables = serializers.SerializerMethodField()
+    current_booked_people = serializers.IntegerField(source='booked_people', read_only=True)
+    current_number_of_tables = serializers.IntegerField(source='booked_tables', read_only=True)
 
     class Meta:
         model = TimeSlot
@@ -70,21 +70,6 @@ class TimeSlotSerializer(serializers.ModelSerializer):
 
         return attrs
 
-    def get_current_booked_people(self, obj):
-        """
-        Calculate the total number of booked people for this time slot,
-        excluding canceled bookings.
-        """
-        return sum(booking.people for booking in obj.bookings.exclude(status="canceled"))
-
-    def get_current_number_of_tables(self, obj):
-        """
-        Calculate the total number of booked tables for this time slot,
-        excluding canceled bookings.
-        For simplicity, each booking is assumed to occupy one table.
-        """
-        return obj.bookings.exclude(status="canceled").count()
-
     def create(self, validated_data):
         with transaction.atomic():
             instance = TimeSlot.objects.create(**validated_data)
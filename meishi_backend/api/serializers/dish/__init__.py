@@ -2,6 +2,11 @@
 
 from .category_serializer import CategorySerializer
 from .course_serializer import CourseSerializer
-from .dish_serializer import DishSerializer
+from .dish_serializer import DishSerializer, DishSummarySerializer
 from .favorite_serializer import DishFavoriteSerializer
-from .like_dislike_serializer import DishLikeDislikeSerializer, SpecificDishLikeDislikeSerializer
+from .like_dislike_serializer import (
+    DishLikeDislikeSerializer,
+    DishReactionBatchSerializer,
+    SetDishLikeDislikeSerializer,
+    SpecificDishLikeDislikeSerializer,
+)
@@ -1,13 +1,17 @@
 # api/serializers/dish/dish_serializer.py
 
 from rest_framework import serializers
-from api.models.dish import Dish, DishFavorite, DishLikeDislike
+from api.models.dish import Dish
+from api.serializers.dynamic_fields import DynamicFieldsMixin
+from api.serializers.reaction_state import ReactionStateListSerializer, ReactionStateMixin
 from api.serializers.dish import CourseSerializer
 from api.serializers.dish import CategorySerializer
 from api.models.dish import Course
 from api.models.dish import Category
 
-class DishSerializer(serializers.ModelSerializer):
+class DishSerializer(DynamicFieldsMixin, ReactionStateMixin, serializers.ModelSerializer):
+    reaction_model_name = "dish"
+
     course = CourseSerializer(read_only=True)
     course_id = serializers.PrimaryKeyRelatedField(
         queryset=Course.objects.all(), source="course", write_only=True, required=False
@@ -31,44 +35,38 @@ class DishSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Dish
+        list_serializer_class = ReactionStateListSerializer
         fields = [
             "id", "name", "description", "price", "created_at", "restaurant", "course", "course_id",
             "categories", "category_ids", "type", "image", "favorites_count", "like_count", 
-            "dislike_count", "favorite_details", "like_dislike_details", "weekly_like_count", "currency", "city", "country", "restaurant_name"
+            "dislike_count", "favorite_details", "like_dislike_details", "daily_like_count", "weekly_like_count", "monthly_like_count", "trending_score", "wilson_score", "currency", "city", "country", "restaurant_name"
         ]
+        # Rendered as ids with ?fields= unless named in ?expand=
+        expandable_fields = ["course", "categories"]
+        # Relation each field reads, loaded with the dishes only when the field is rendered
+        related_fields = {
+            "course": ("select", "course"),
+            "categories": ("prefetch", "categories"),
+            "currency": ("select", "restaurant"),
+            "restaurant_name": ("select", "restaurant"),
+            "city": ("select", "restaurant"),
+            "country": ("select", "restaurant"),
+        }
         extra_kwargs = {
             "restaurant": {"read_only": True},  # Set automatically in view
             "favorites_count": {"read_only": True},
             "like_count": {"read_only": True},
             "dislike_count": {"read_only": True},
+            "daily_like_count": {"read_only": True},
             "weekly_like_count": {"read_only": True},
+            "monthly_like_count": {"read_only": True},
+            "trending_score": {"read_only": True},
+            "wilson_score": {"read_only": True},
             "is_favorite": {"read_only": True},
             "is_like": {"read_only": True},
             "is_dislike": {"read_only": True},
         }
     
-    def get_favorite_details(self, obj):
-        user = self.context.get('request').user
-        if user.is_authenticated:
-            favorite = DishFavorite.objects.filter(user=user, dish=obj).first()
-            return {
-                "is_favorite": bool(favorite),
-                "favorite_id": favorite.id if favorite else None
-            }
-        return {"is_favorite": False, "favorite_id": None}
-
-    def get_like_dislike_details(self, obj):
-        user = self.context.get('request').user
-        if user.is_authenticated:
-            like_dislike = DishLikeDislike.objects.filter(user=user, dish=obj).first()
-            if like_dislike:
-                return {
-                    "is_like": like_dislike.type == "like",
-                    "is_dislike": like_dislike.type == "dislike",
-                    "like_dislike_id": like_dislike.id
-                }
-        return {"is_like": False, "is_dislike": False, "like_dislike_id": None}
-    
     def get_currency(self, obj):
         """
         Fetch the currency from the related restaurant.
@@ -99,3 +97,19 @@ class DishSerializer(serializers.ModelSerializer):
             if not data.get("name"):
                 raise serializers.ValidationError({"name": "Dish name is required."})
         return data
+
+class DishSummarySerializer(serializers.ModelSerializer):
+    """
+    Compact read-only representation of a dish embedded in history lists,
+    built from the dish's row joined with its restaurant.
+    """
+    restaurant_name = serializers.CharField(source="restaurant.name", read_only=True)
+    city = serializers.CharField(source="restaurant.city", read_only=True)
+
+    class Meta:
+        model = Dish
+        fields = [
+            "id", "name", "image", "restaurant", "restaurant_name", "city",
+            "favorites_count", "like_count", "dislike_count",
+        ]
+        read_only_fields = fields
@@ -1,14 +1,18 @@
 # api/serializers/dish/favorite_serializer.py
 
 from rest_framework import serializers
+from api.serializers.dynamic_fields import CompactEmbedMixin
+from api.serializers.reaction_state import ReactionStateListSerializer
 from api.models.dish import DishFavorite
-from api.serializers.dish import DishSerializer
+from api.serializers.dish import DishSerializer, DishSummarySerializer
 
-class DishFavoriteSerializer(serializers.ModelSerializer):
+class DishFavoriteSerializer(CompactEmbedMixin, serializers.ModelSerializer):
     dish_details = DishSerializer(read_only=True, source='dish')
     
     class Meta:
         model = DishFavorite
+        list_serializer_class = ReactionStateListSerializer
+        compact_fields = {"dish_details": DishSummarySerializer}
         fields = ["id", "user", "dish", "dish_details", "created_at"]
         read_only_fields = ["user", "created_at"]
 
@@ -1,15 +1,19 @@
 # api/serializers/dish/like_dislike_serializer.py
 
 from rest_framework import serializers
+from api.serializers.dynamic_fields import CompactEmbedMixin
+from api.serializers.reaction_state import ReactionStateListSerializer
 from api.models.dish import DishLikeDislike
-from api.serializers.dish import DishSerializer
+from api.serializers.dish import DishSerializer, DishSummarySerializer
 from api.serializers.user import UserPublicSerializer
 
-class DishLikeDislikeSerializer(serializers.ModelSerializer):
+class DishLikeDislikeSerializer(CompactEmbedMixin, serializers.ModelSerializer):
     dish_details = DishSerializer(read_only=True, source='dish')
     
     class Meta:
         model = DishLikeDislike
+        list_serializer_class = ReactionStateListSerializer
+        compact_fields = {"dish_details": DishSummarySerializer}
         fields = ["id", "user", "dish", "dish_details", "type", "created_at"]
         read_only_fields = ["user", "created_at"]
 
@@ -33,6 +37,22 @@ class DishLikeDislikeSerializer(serializers.ModelSerializer):
 
         return attrs
 
+class SetDishLikeDislikeSerializer(serializers.Serializer):
+    # null removes the reaction
+    type = serializers.ChoiceField(choices=DishLikeDislike.CHOICES, allow_null=True)
+
+class DishReactionItemSerializer(SetDishLikeDislikeSerializer):
+    dish = serializers.IntegerField()
+
+class DishReactionBatchSerializer(serializers.Serializer):
+    reactions = DishReactionItemSerializer(many=True, allow_empty=False, max_length=50)
+
+    def validate_reactions(self, reactions):
+        dish_ids = [reaction["dish"] for reaction in reactions]
+        if len(set(dish_ids)) != len(dish_ids):
+            raise serializers.ValidationError("Each dish can only appear once.")
+        return reactions
+
 class SpecificDishLikeDislikeSerializer(serializers.ModelSerializer):
     user = UserPublicSerializer(read_only=True)
     is_like = serializers.SerializerMethodField()
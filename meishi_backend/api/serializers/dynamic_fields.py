@@ -0,0 +1,147 @@
+# api/serializers/dynamic_fields.py
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+EMBED_PARAM = 'embed'
+COMPACT = 'compact'
+
+def parse_field_list(request, param):
+    """
+    Return the set of comma separated names of a query parameter, or None if
+    it is not given.
+    """
+    value = request.query_params.get(param) if request is not None else None
+    if not value:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+def get_field_selection(request):
+    """
+    Return the (fields, expand) sets requested with ?fields= and ?expand=,
+    where fields is None when every field is wanted. Expanded fields are
+    returned whether or not they are also listed in ?fields=. Only reads
+    (GET) are shaped, so writes always see every field.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None, set()
+    fields = parse_field_list(request, FIELDS_PARAM)
+    expand = parse_field_list(request, EXPAND_PARAM) or set()
+    if fields is not None:
+        fields |= expand
+    return fields, expand
+
+def is_compact(request):
+    """
+    Return whether a read asks for compact embedded objects (?embed=compact).
+    """
+    return (
+        request is not None
+        and request.method in SAFE_METHODS
+        and request.query_params.get(EMBED_PARAM) == COMPACT
+    )
+
+def is_root_serializer(serializer):
+    """
+    Return whether a serializer renders the request's response itself, or
+    the rows of its list, rather than an object nested in them.
+    """
+    parent = serializer.parent
+    if isinstance(parent, serializers.ListSerializer):
+        parent = parent.parent
+    return parent is None
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets for a model serializer: ?fields=id,name keeps only the
+    listed fields in the response. With ?fields=, the nested fields named in
+    Meta.expandable_fields are rendered as ids unless they are listed in
+    ?expand=; without it every field is rendered in full as before.
+
+    Only the serializer of the request (or the child of its list) is
+    shaped; nested uses keep all their fields. shape_queryset() loads only
+    the columns and relations (Meta.related_fields) the response needs.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not is_root_serializer(self):
+            return fields
+        requested, expand = get_field_selection(self.context.get('request'))
+        if requested is None:
+            return fields
+
+        for name in list(fields):
+            if name not in requested:
+                del fields[name]
+            elif name in getattr(self.Meta, 'expandable_fields', ()) and name not in expand:
+                field = fields[name]
+                fields[name] = serializers.PrimaryKeyRelatedField(
+                    read_only=True,
+                    many=isinstance(field, serializers.ListSerializer),
+                    source=field.source if field.source != name else None,
+                )
+        return fields
+
+    @classmethod
+    def get_related_lookups(cls, fields, expand):
+        """
+        Return the (select_related, prefetch_related) lookups needed to
+        render `fields` (None for all) with `expand`. Collapsed nested fields
+        only need their foreign key column, so they skip the join.
+        """
+        select, prefetch = set(), set()
+        expandable = getattr(cls.Meta, 'expandable_fields', ())
+        for name, (kind, lookup) in getattr(cls.Meta, 'related_fields', {}).items():
+            if fields is not None and name not in fields:
+                continue
+            if kind == 'select':
+                if fields is None or name not in expandable or name in expand:
+                    select.add(lookup)
+            else:
+                prefetch.add(lookup)
+        return sorted(select), sorted(prefetch)
+
+    @classmethod
+    def shape_queryset(cls, queryset, request):
+        """
+        Load the relations the requested fields need, and with ?fields= only
+        the columns they read.
+        """
+        fields, expand = get_field_selection(request)
+        select, prefetch = cls.get_related_lookups(fields, expand)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        if fields is None:
+            return queryset
+
+        model = cls.Meta.model
+        columns = {model._meta.pk.name, *select}
+        for name in fields:
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.concrete and not field.many_to_many:
+                columns.add(name)
+        return queryset.only(*columns)
+
+class CompactEmbedMixin:
+    """
+    ?embed=compact renders the nested objects named in Meta.compact_fields
+    with the given summary serializer instead of their full serializer, so
+    history lists need a join instead of the nested object's relations and
+    per-user lookups.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if is_root_serializer(self) and is_compact(self.context.get('request')):
+            for name, summary_serializer in self.Meta.compact_fields.items():
+                fields[name] = summary_serializer(read_only=True, source=fields[name].source)
+        return fields
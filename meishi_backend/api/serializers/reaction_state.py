@@ -0,0 +1,62 @@
+# api/serializers/reaction_state.py
+
+from django.db import models
+from rest_framework import serializers
+from api.reactions import get_reaction_state
+
+class ReactionStateListSerializer(serializers.ListSerializer):
+    """
+    List serializer loading the requesting user's favorites and likes/dislikes
+    of all the rows with one query per type before serializing them, so the
+    child's favorite_details and like_dislike_details take no query per row
+    (and none at all when the response leaves them out).
+    The same is done for the restaurants or dishes nested in the rows (e.g.
+    the restaurant_details of a list of favorites).
+    """
+    def to_representation(self, data):
+        rows = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        if isinstance(self.child, ReactionStateMixin) and self.child.needs_reaction_state():
+            self.child.load_reaction_state(rows)
+        for field in self.child.fields.values():
+            if isinstance(field, ReactionStateMixin) and not field.write_only and field.needs_reaction_state():
+                field.load_reaction_state([field.get_attribute(row) for row in rows])
+        return super().to_representation(rows)
+
+class ReactionStateMixin:
+    """
+    favorite_details and like_dislike_details of a restaurant or dish for the
+    requesting user, read from the state loaded for the whole list when the
+    serializer is the child of a ReactionStateListSerializer, and loaded for
+    the single row otherwise. Serializers using it set ReactionStateListSerializer
+    as their Meta.list_serializer_class.
+    """
+    reaction_model_name = None
+
+    def needs_reaction_state(self):
+        # Sparse fieldsets may leave both details out
+        return 'favorite_details' in self.fields or 'like_dislike_details' in self.fields
+
+    def load_reaction_state(self, rows):
+        self._reaction_state = get_reaction_state(
+            self.context.get('request').user, self.reaction_model_name, [row.pk for row in rows]
+        )
+
+    def reaction_state_of(self, obj):
+        if obj.pk not in getattr(self, '_reaction_state', {}):
+            self.load_reaction_state([obj])
+        return self._reaction_state[obj.pk]
+
+    def get_favorite_details(self, obj):
+        state = self.reaction_state_of(obj)
+        return {
+            "is_favorite": state['favorite_id'] is not None,
+            "favorite_id": state['favorite_id']
+        }
+
+    def get_like_dislike_details(self, obj):
+        state = self.reaction_state_of(obj)
+        return {
+            "is_like": state['type'] == "like",
+            "is_dislike": state['type'] == "dislike",
+            "like_dislike_id": state['like_dislike_id']
+        }
@@ -1,7 +1,7 @@
 # serializers/restaurant/__init__.py
 
-from .restaurant_serializer import RestaurantSerializer
+from .restaurant_serializer import RestaurantSerializer, RestaurantSummarySerializer
 from .cuisine_serializer import CuisineSerializer
-from .like_dislike_serializer import LikeDislikeSerializer, SpecificLikeDislikeSerializer
+from .like_dislike_serializer import LikeDislikeSerializer, SetLikeDislikeSerializer, SpecificLikeDislikeSerializer
 from .favorite_serializer import FavoriteSerializer
 from .restaurant_photo_serializer import RestaurantPhotoSerializer
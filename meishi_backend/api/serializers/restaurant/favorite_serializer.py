@@ -1,14 +1,18 @@
 # api/serializers/restaurant/favorite_serializer.py
 
 from rest_framework import serializers
+from api.serializers.dynamic_fields import CompactEmbedMixin
+from api.serializers.reaction_state import ReactionStateListSerializer
 from api.models.restaurant import Favorite
-from api.serializers.restaurant import RestaurantSerializer
+from api.serializers.restaurant import RestaurantSerializer, RestaurantSummarySerializer
 
-class FavoriteSerializer(serializers.ModelSerializer):
+class FavoriteSerializer(CompactEmbedMixin, serializers.ModelSerializer):
     restaurant_details = RestaurantSerializer(read_only=True, source='restaurant')
     
     class Meta:
         model = Favorite
+        list_serializer_class = ReactionStateListSerializer
+        compact_fields = {"restaurant_details": RestaurantSummarySerializer}
         fields = ['id', 'user', 'restaurant', 'restaurant_details', 'created_at']
         read_only_fields = ['user', 'created_at']
         
@@ -1,15 +1,19 @@
 # api/serializers/restaurant/like_dislike_serializer.py
 
 from rest_framework import serializers
+from api.serializers.dynamic_fields import CompactEmbedMixin
+from api.serializers.reaction_state import ReactionStateListSerializer
 from api.models.restaurant import LikeDislike
-from api.serializers.restaurant import RestaurantSerializer
+from api.serializers.restaurant import RestaurantSerializer, RestaurantSummarySerializer
 from api.serializers.user import UserPublicSerializer
 
-class LikeDislikeSerializer(serializers.ModelSerializer):
+class LikeDislikeSerializer(CompactEmbedMixin, serializers.ModelSerializer):
     restaurant_details = RestaurantSerializer(read_only=True, source='restaurant')
     
     class Meta:
         model = LikeDislike
+        list_serializer_class = ReactionStateListSerializer
+        compact_fields = {"restaurant_details": RestaurantSummarySerializer}
         fields = ['id', 'user', 'restaurant', 'restaurant_details', 'type', 'created_at']
         read_only_fields = ['user', 'created_at']
 
@@ -34,6 +38,11 @@ class LikeDislikeSerializer(serializers.ModelSerializer):
         return attrs
 
 
+class SetLikeDislikeSerializer(serializers.Serializer):
+    # null removes the reaction
+    type = serializers.ChoiceField(choices=LikeDislike.CHOICES, allow_null=True)
+
+
 class SpecificLikeDislikeSerializer(serializers.ModelSerializer):
     user = UserPublicSerializer(read_only=True)
     is_like = serializers.SerializerMethodField()
@@ -2,14 +2,18 @@
 
 from rest_framework import serializers
 from api.models.restaurant import Restaurant
+from api.serializers.dynamic_fields import DynamicFieldsMixin
+from api.serializers.reaction_state import ReactionStateListSerializer, ReactionStateMixin
 from api.serializers.restaurant.cuisine_serializer import CuisineSerializer
-from api.models.restaurant import Cuisine, Favorite, LikeDislike
+from api.models.restaurant import Cuisine
 from api.serializers.restaurant.restaurant_photo_serializer import RestaurantPhotoSerializer
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut, GeocoderServiceError
 from timezonefinder import TimezoneFinder
 
-class RestaurantSerializer(serializers.ModelSerializer):
+class RestaurantSerializer(DynamicFieldsMixin, ReactionStateMixin, serializers.ModelSerializer):
+    reaction_model_name = "restaurant"
+
     cuisine = CuisineSerializer(read_only=True)  # Show cuisine details
     cuisine_id = serializers.PrimaryKeyRelatedField(
         queryset=Cuisine.objects.all(), source="cuisine", write_only=True
@@ -21,6 +25,7 @@ class RestaurantSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Restaurant
+        list_serializer_class = ReactionStateListSerializer
         fields = [
             # Identification and Basic Info
             "id", "name", "description", "created_at", "owner",
@@ -38,15 +43,23 @@ class RestaurantSerializer(serializers.ModelSerializer):
             "latitude", "longitude", "timezone",
 
             # Engagement Metrics
-            "favorites_count", "like_count", "dislike_count", "weekly_like_count", "favorite_details", "like_dislike_details",
+            "favorites_count", "like_count", "dislike_count", "daily_like_count", "weekly_like_count", "monthly_like_count",
+            "trending_score", "wilson_score", "favorite_details", "like_dislike_details",
 
             # Miscellaneous
             "currency"
         ]
         read_only_fields = [
             "owner", "created_at", "timezone", "latitude", "longitude", "favorites_count", "like_count",
-            "dislike_count", "weekly_like_count", "is_favorite", "is_like", "is_dislike"
+            "dislike_count", "daily_like_count", "weekly_like_count", "monthly_like_count", "trending_score", "wilson_score", "is_favorite", "is_like", "is_dislike"
         ]
+        # Rendered as ids with ?fields= unless named in ?expand=
+        expandable_fields = ["cuisine", "photos"]
+        # Relation each field reads, loaded with the restaurants only when the field is rendered
+        related_fields = {
+            "cuisine": ("select", "cuisine"),
+            "photos": ("prefetch", "photos"),
+        }
 
         extra_kwargs = {
             "contact_number": {"allow_blank": True},
@@ -58,28 +71,6 @@ class RestaurantSerializer(serializers.ModelSerializer):
             "cuisine": {"required": False}
         }
     
-    def get_favorite_details(self, obj):
-        user = self.context.get('request').user
-        if user.is_authenticated:
-            favorite = Favorite.objects.filter(user=user, restaurant=obj).first()
-            return {
-                "is_favorite": bool(favorite),
-                "favorite_id": favorite.id if favorite else None
-            }
-        return {"is_favorite": False, "favorite_id": None}
-
-    def get_like_dislike_details(self, obj):
-        user = self.context.get('request').user
-        if user.is_authenticated:
-            like_dislike = LikeDislike.objects.filter(user=user, restaurant=obj).first()
-            if like_dislike:
-                return {
-                    "is_like": like_dislike.type == "like",
-                    "is_dislike": like_dislike.type == "dislike",
-                    "like_dislike_id": like_dislike.id
-                }
-        return {"is_like": False, "is_dislike": False, "like_dislike_id": None}
-
     def validate(self, data):
         request = self.context.get('request')
         if request and request.method == "POST":
@@ -129,3 +120,13 @@ class RestaurantSerializer(serializers.ModelSerializer):
         return data
     
 
+
+class RestaurantSummarySerializer(serializers.ModelSerializer):
+    """
+    Compact read-only representation of a restaurant embedded in history
+    lists, built from the restaurant's own row.
+    """
+    class Meta:
+        model = Restaurant
+        fields = ["id", "name", "logo", "city", "favorites_count", "like_count", "dislike_count"]
+        read_only_fields = fields
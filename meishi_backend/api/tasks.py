@@ -1,98 +1,208 @@
 from celery import shared_task
-from datetime import datetime, timedelta
-from django.db import transaction
+from datetime import date, datetime, timedelta
+from time import perf_counter
+from django.conf import settings
 from api.models.booking.general_time_slot import GeneralTimeSlot
-from api.models.booking.time_slot import TimeSlot
+from api.models.booking.schedule import (
+    get_time_slot_horizon_days,
+    iter_booking_system_id_chunks,
+    materialize_time_slots,
+)
+from api.models.booking.retention import apply_retention
+from api.models.user.user import CustomUser
+from api.counters import (
+    COUNTER_MODELS,
+    flush_counters,
+    fold_counter_shards,
+    get_backend,
+    reconcile_counters,
+    refresh_window_like_counts,
+    renormalize_trending_scores,
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
 @shared_task
-def create_timeslots_for_one_day():
+def create_timeslots_for_one_day(target_date=None):
     """
-    Create TimeSlots for one specific day based on all GeneralTimeSlot entries.
-    """
-    today = datetime.today().date()
-    target_date = today + timedelta(days=30)
-    timeslots_to_create = []
+    Roll the TimeSlot horizon forward by one day.
 
-    try:
-        # Use a transaction to ensure atomicity
-        with transaction.atomic():
-            # Fetch all GeneralTimeSlot entries for the target weekday
-            general_time_slots = GeneralTimeSlot.objects.filter(weekday=target_date.weekday()).values(
-                'id', 'booking_system', 'start_time', 'end_time', 'interval_minutes',
-                'max_people', 'max_tables', 'min', 'max'
-            )
-            logger.info(f"Fetched {len(general_time_slots)} GeneralTimeSlot entries for weekday {target_date.weekday()}.")
+    The booking systems with a GeneralTimeSlot on the target weekday are split
+    into chunks of TIME_SLOT_GENERATION_CHUNK_SIZE and every chunk is handed to
+    create_timeslots_for_booking_systems, so the work fans out across workers.
+    """
+    if target_date is None:
+        target_date = datetime.today().date() + timedelta(days=get_time_slot_horizon_days())
+    elif isinstance(target_date, str):
+        target_date = date.fromisoformat(target_date)
+    chunk_size = getattr(settings, 'TIME_SLOT_GENERATION_CHUNK_SIZE', 500)
 
-            # Pre-fetch existing TimeSlot entries for the target date
-            existing_timeslots = set(
-                TimeSlot.objects.filter(date=target_date).values_list('time', flat=True)
-            )
-            logger.info(f"Pre-fetched {len(existing_timeslots)} existing TimeSlot entries for {target_date}.")
+    chunks = 0
+    for booking_system_ids in iter_booking_system_id_chunks(target_date.weekday(), chunk_size):
+        create_timeslots_for_booking_systems.delay(booking_system_ids, target_date.isoformat())
+        chunks += 1
+    logger.info(f"Dispatched {chunks} TimeSlot generation chunks for {target_date}.")
+    return chunks
 
-            for general_time_slot in general_time_slots:
-                current_time = datetime.combine(target_date, general_time_slot['start_time'])
-                end_time = datetime.combine(target_date, general_time_slot['end_time'])
+@shared_task
+def create_timeslots_for_booking_systems(booking_system_ids, target_date):
+    """
+    Create the TimeSlots of one day for a chunk of booking systems.
 
-                while current_time.time() <= end_time.time():
-                    # Check if the time already exists
-                    if current_time.time() not in existing_timeslots:
-                        # Append a new TimeSlot for bulk creation
-                        timeslots_to_create.append(TimeSlot(
-                            booking_system_id=general_time_slot['booking_system'],
-                            general_timeslot_id=general_time_slot['id'],
-                            date=target_date,
-                            time=current_time.time(),
-                            max_people=general_time_slot['max_people'],
-                            max_tables=general_time_slot['max_tables'],
-                            min=general_time_slot['min'],
-                            max=general_time_slot['max'],
-                        ))
+    Existing slots are diffed per booking system, so re-running a chunk
+    creates nothing new and never lets one restaurant's slots suppress another's.
+    """
+    target_date = date.fromisoformat(target_date) if isinstance(target_date, str) else target_date
+    started = perf_counter()
+    try:
+        general_time_slots = GeneralTimeSlot.objects.filter(
+            booking_system_id__in=booking_system_ids,
+            weekday=target_date.weekday(),
+        )
+        created, updated = materialize_time_slots(general_time_slots, target_date, target_date)
+        logger.info(
+            f"Generated TimeSlots for {len(booking_system_ids)} booking systems on {target_date}: "
+            f"{created} created, {updated} relinked in {perf_counter() - started:.2f}s."
+        )
+        return created, updated
+    except Exception as e:
+        logger.error(
+            f"Error creating TimeSlots for booking systems {booking_system_ids[0]}-{booking_system_ids[-1]} "
+            f"on {target_date}: {str(e)}", exc_info=True
+        )
+        raise
 
-                    # Increment by interval
-                    current_time += timedelta(minutes=general_time_slot['interval_minutes'])
+@shared_task
+def apply_booking_retention():
+    """
+    Archive old bookings and delete past unbooked TimeSlots, in chunks.
+    """
+    try:
+        counts = apply_retention()
+        logger.info(
+            f"Retention archived {counts['archived_bookings']} bookings with "
+            f"{counts['archived_time_slots']} time slots and deleted "
+            f"{counts['deleted_time_slots']} past unbooked time slots."
+        )
+        return counts
+    except Exception as e:
+        logger.error(f"Error applying booking retention: {str(e)}", exc_info=True)
+        raise
 
-            # Bulk create new TimeSlots
-            if timeslots_to_create:
-                TimeSlot.objects.bulk_create(timeslots_to_create)
-                logger.info(f"Successfully created {len(timeslots_to_create)} TimeSlots for {target_date}.")
-            else:
-                logger.info(f"No new TimeSlots needed for {target_date}.")
+@shared_task
+def update_restaurant_weekly_counts():
+    """
+    Update the daily, weekly and monthly like counts of all restaurants.
+    """
+    try:
+        started = perf_counter()
+        updated = refresh_window_like_counts('restaurant')
+        logger.info(
+            f"Successfully updated window like counts of {updated} restaurants "
+            f"in {perf_counter() - started:.2f}s."
+        )
+    except Exception as e:
+        logger.error(f"Error updating restaurant window like counts: {str(e)}", exc_info=True)
 
+@shared_task
+def update_dish_weekly_counts():
+    """
+    Update the daily, weekly and monthly like counts of all dishes.
+    """
+    try:
+        started = perf_counter()
+        updated = refresh_window_like_counts('dish')
+        logger.info(
+            f"Successfully updated window like counts of {updated} dishes "
+            f"in {perf_counter() - started:.2f}s."
+        )
     except Exception as e:
-        logger.error(f"Error creating TimeSlots for {target_date}: {str(e)}", exc_info=True)
+        logger.error(f"Error updating dish window like counts: {str(e)}", exc_info=True)
 
-from celery import shared_task
-from datetime import timedelta
-from django.utils.timezone import now
-from api.models.restaurant import Restaurant
-from api.models.dish import Dish
-import logging
+@shared_task
+def flush_reaction_counters():
+    """
+    Write the like/dislike/favorite deltas buffered in the cache or collected
+    in counter shards to the counters.
+    """
+    try:
+        flushed = flush_counters()
+        if flushed:
+            logger.info(f"Flushed buffered reaction counters of {flushed} entities.")
+        folded = fold_counter_shards()
+        if folded:
+            logger.info(f"Folded {folded} reaction counter shards.")
+        return flushed + folded
+    except Exception as e:
+        logger.error(f"Error flushing reaction counters: {str(e)}", exc_info=True)
+        raise
 
-logger = logging.getLogger(__name__)
+@shared_task
+def renormalize_trending():
+    """
+    Decay the trending scores of restaurants and dishes to the current day.
+    """
+    try:
+        for model_name in COUNTER_MODELS:
+            started = perf_counter()
+            updated = renormalize_trending_scores(model_name)
+            if updated:
+                logger.info(
+                    f"Renormalized trending scores of {updated} {model_name} rows "
+                    f"in {perf_counter() - started:.2f}s."
+                )
+    except Exception as e:
+        logger.error(f"Error renormalizing trending scores: {str(e)}", exc_info=True)
+        raise
 
 @shared_task
-def update_restaurant_weekly_counts():
+def reconcile_reaction_counters():
     """
-    Update weekly like counts for all restaurants.
+    Repair drifted reaction counts of all restaurants and dishes, resuming
+    after the last chunk of an interrupted run. Skipped unless the counters
+    use the direct backend (see reconcile_counters).
     """
+    if get_backend() != 'direct':
+        logger.warning(f"Skipped reconciling reaction counters with the '{get_backend()}' backend.")
+        return
     try:
-        for restaurant in Restaurant.objects.all():
-            restaurant.update_weekly_like_count()
-        logger.info("Successfully updated weekly like counts for all restaurants.")
+        flush_counters()
+        fold_counter_shards()
+        for model_name in COUNTER_MODELS:
+            started = perf_counter()
+            totals = reconcile_counters(model_name, resume=True)
+            logger.info(
+                f"Reconciled reaction counts of {totals['checked']} {model_name} rows, "
+                f"repaired {totals['repaired']}, in {perf_counter() - started:.2f}s."
+            )
     except Exception as e:
-        logger.error(f"Error updating restaurant weekly like counts: {str(e)}", exc_info=True)
+        logger.error(f"Error reconciling reaction counters: {str(e)}", exc_info=True)
+        raise
 
 @shared_task
-def update_dish_weekly_counts():
+def delete_user(user_id):
     """
-    Update weekly like counts for all dishes.
+    Delete an account whose deletion was deferred to the background.
     """
     try:
-        for dish in Dish.objects.all():
-            dish.update_weekly_like_count()
-        logger.info("Successfully updated weekly like counts for all dishes.")
+        started = perf_counter()
+        deleted, _ = CustomUser.objects.filter(pk=user_id, deletion_pending=True).delete()
+        if deleted:
+            logger.info(f"Deleted user {user_id} in {perf_counter() - started:.2f}s.")
     except Exception as e:
-        logger.error(f"Error updating dish weekly like counts: {str(e)}", exc_info=True)
+        logger.error(f"Error deleting user {user_id}: {str(e)}", exc_info=True)
+        raise
+
+@shared_task
+def delete_pending_users():
+    """
+    Queue the deletion of the accounts still marked deletion_pending, whose
+    delete_user task was lost or failed. Deleting an account twice is a no-op.
+    """
+    user_ids = list(CustomUser.objects.filter(deletion_pending=True).values_list('pk', flat=True))
+    for user_id in user_ids:
+        delete_user.delay(user_id)
+    if user_ids:
+        logger.info(f"Queued the deletion of {len(user_ids)} pending users.")
+    return len(user_ids)
@@ -1797,6 +1797,13 @@ class BookingSystemTests(APITestCase):
         self.assertFalse(booking_system.is_paused)
 
 
+from datetime import date, timedelta
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from api.models.booking.schedule import iter_booking_system_id_chunks
+from api.tasks import create_timeslots_for_booking_systems
+
 ###############################################################################
 #                                GeneralTimeSlotTests
 ###############################################################################
@@ -1886,6 +1893,135 @@ class GeneralTimeSlotTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn("overlap", str(response.data).lower())
 
+    def create_quarter_hour_rule(self, weekday):
+        """Helper creating a full-day GeneralTimeSlot with 15-minute intervals."""
+        return GeneralTimeSlot.objects.create(
+            booking_system=self.booking_system,
+            weekday=weekday,
+            start_time=datetime.strptime("08:00:00", "%H:%M:%S").time(),
+            end_time=datetime.strptime("23:45:00", "%H:%M:%S").time(),
+            interval_minutes=15,
+            max_people=20,
+            max_tables=5,
+        )
+
+    def test_general_time_slot_materializes_in_bulk(self):
+        """Saving a GeneralTimeSlot creates its TimeSlots with a constant number of queries."""
+        with CaptureQueriesContext(connection) as queries:
+            general_time_slot = self.create_quarter_hour_rule(date.today().weekday())
+        self.assertLessEqual(len(queries), 8)
+        # 64 quarter hours on each of the 5 matching days of a 30-day horizon
+        self.assertEqual(TimeSlot.objects.filter(general_timeslot=general_time_slot).count(), 64 * 5)
+
+    @override_settings(TIME_SLOT_HORIZON_DAYS=7)
+    def test_general_time_slot_horizon_is_configurable(self):
+        """Only the dates inside TIME_SLOT_HORIZON_DAYS are materialized."""
+        general_time_slot = self.create_quarter_hour_rule(date.today().weekday())
+        self.assertEqual(
+            set(TimeSlot.objects.filter(general_timeslot=general_time_slot).values_list("date", flat=True)),
+            {date.today()},
+        )
+
+    def test_general_time_slot_relinks_and_reopens_existing_slots(self):
+        """Existing closed slots at generated times are relinked and reopened, not duplicated."""
+        closed = TimeSlot.objects.create(
+            booking_system=self.booking_system,
+            date=date.today() + timedelta(days=7),
+            time="12:00:00",
+            max_people=4,
+            max_tables=1,
+            is_open=False,
+        )
+        general_time_slot = self.create_quarter_hour_rule(date.today().weekday())
+        closed.refresh_from_db()
+        self.assertTrue(closed.is_open)
+        self.assertEqual(closed.general_timeslot, general_time_slot)
+        self.assertEqual(
+            TimeSlot.objects.filter(booking_system=self.booking_system, date=closed.date, time="12:00:00").count(), 1
+        )
+
+    def test_capacity_edit_updates_time_slots_in_place(self):
+        """Editing only capacity keeps every TimeSlot and updates them with a single UPDATE."""
+        general_time_slot = self.create_quarter_hour_rule(date.today().weekday())
+        slot_ids = set(TimeSlot.objects.filter(general_timeslot=general_time_slot).values_list("id", flat=True))
+
+        general_time_slot.max_tables = 9
+        with CaptureQueriesContext(connection) as queries:
+            general_time_slot.save()
+        timeslot_updates = [
+            query for query in queries.captured_queries
+            if query["sql"].startswith('UPDATE "api_timeslot"')
+        ]
+        self.assertEqual(len(timeslot_updates), 1)
+        self.assertFalse(any(query["sql"].startswith("DELETE") for query in queries.captured_queries))
+
+        timeslots = TimeSlot.objects.filter(general_timeslot=general_time_slot)
+        self.assertEqual(set(timeslots.values_list("id", flat=True)), slot_ids)
+        self.assertEqual(set(timeslots.values_list("max_tables", flat=True)), {9})
+
+    def test_schedule_edit_only_adds_and_removes_changed_times(self):
+        """Shifting the end time removes dropped times, closes booked ones and keeps the rest."""
+        general_time_slot = self.create_quarter_hour_rule(date.today().weekday())
+        kept = TimeSlot.objects.get(general_timeslot=general_time_slot, date=date.today() + timedelta(days=7), time="12:00:00")
+        booked = TimeSlot.objects.get(general_timeslot=general_time_slot, date=date.today() + timedelta(days=7), time="23:00:00")
+        Booking.objects.create(time_slot=booked, first_name="Guest", people=2)
+
+        general_time_slot.end_time = datetime.strptime("22:00:00", "%H:%M:%S").time()
+        general_time_slot.save()
+
+        self.assertTrue(TimeSlot.objects.filter(pk=kept.pk, is_open=True).exists())
+        booked.refresh_from_db()
+        self.assertFalse(booked.is_open)
+        open_times = TimeSlot.objects.filter(general_timeslot=general_time_slot, is_open=True)
+        # 57 quarter hours from 08:00 to 22:00 on each of the 5 matching days
+        self.assertEqual(open_times.count(), 57 * 5)
+        self.assertFalse(open_times.filter(time__gt="22:00:00").exists())
+
+        general_time_slot.end_time = datetime.strptime("23:45:00", "%H:%M:%S").time()
+        general_time_slot.save()
+        booked.refresh_from_db()
+        self.assertTrue(booked.is_open)
+        self.assertEqual(TimeSlot.objects.filter(general_timeslot=general_time_slot, is_open=True).count(), 64 * 5)
+
+    def test_daily_generation_chunks_booking_systems(self):
+        """Booking systems with a rule on the target weekday are paged into bounded chunks."""
+        weekday = date.today().weekday()
+        systems = [self.booking_system] + [
+            BookingSystem.objects.create(restaurant=self.restaurant, meal_type=meal_type)
+            for meal_type in ("lunch", "dinner")
+        ]
+        for system in systems:
+            GeneralTimeSlot.objects.create(
+                booking_system=system, weekday=weekday,
+                start_time=datetime.strptime("12:00:00", "%H:%M:%S").time(),
+                end_time=datetime.strptime("13:00:00", "%H:%M:%S").time(),
+                interval_minutes=30,
+            )
+        ids = sorted(system.id for system in systems)
+        self.assertEqual(list(iter_booking_system_id_chunks(weekday, 2)), [ids[:2], ids[2:]])
+        self.assertEqual(list(iter_booking_system_id_chunks((weekday + 1) % 7, 2)), [])
+
+    def test_daily_generation_chunk_is_scoped_and_idempotent(self):
+        """Every booking system gets its own slots and re-running a chunk creates nothing."""
+        target_date = date.today() + timedelta(days=35)
+        dinner = BookingSystem.objects.create(restaurant=self.restaurant, meal_type="dinner")
+        for system in (self.booking_system, dinner):
+            GeneralTimeSlot.objects.create(
+                booking_system=system, weekday=target_date.weekday(),
+                start_time=datetime.strptime("20:00:00", "%H:%M:%S").time(),
+                end_time=datetime.strptime("21:00:00", "%H:%M:%S").time(),
+                interval_minutes=30,
+            )
+        booking_system_ids = [self.booking_system.id, dinner.id]
+
+        created, _ = create_timeslots_for_booking_systems(booking_system_ids, target_date.isoformat())
+        self.assertEqual(created, 6)
+        self.assertEqual(TimeSlot.objects.filter(date=target_date, booking_system=dinner).count(), 3)
+
+        created, updated = create_timeslots_for_booking_systems(booking_system_ids, target_date.isoformat())
+        self.assertEqual((created, updated), (0, 0))
+        self.assertEqual(TimeSlot.objects.filter(date=target_date).count(), 6)
+
 
 ###############################################################################
 #                                BookingTests
@@ -2073,3 +2209,2129 @@ class BookingTests(APITestCase):
         response = self.client.delete(f"/api/bookings/{booking.id}/")
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(Booking.objects.count(), 0)
+
+
+###############################################################################
+#                                AvailableTablesTests
+###############################################################################
+class AvailableTablesTests(APITestCase):
+    """
+    Tests for the availability engine behind /api/available-tables/.
+    """
+
+    def setUp(self):
+        self.restaurant_user = CustomUser.objects.create_user(
+            username="availabilityowner",
+            password="Password123",
+            email="availabilityowner@example.com",
+            first_name="Availability",
+            last_name="Owner",
+            country_code="1",
+            phone_number="2025550206",
+            user_type="restaurant",
+        )
+        self.restaurant = Restaurant.objects.create(
+            owner=self.restaurant_user,
+            name="Availability Restaurant",
+            description="Restaurant for availability testing",
+            country="España",
+            state="Madrid",
+            city="Madrid",
+            postal="28015",
+            street="Calle de Gaztambide, 11",
+            latitude=0,
+            longitude=0,
+            timezone="Europe/Madrid",
+            contact_number="456-789-0124",
+            contact_email="availability@restaurant.com",
+            cuisine=Cuisine.objects.create(name="Availability Cuisine"),
+        )
+        self.lunch = BookingSystem.objects.create(restaurant=self.restaurant, meal_type="lunch")
+        self.dinner = BookingSystem.objects.create(restaurant=self.restaurant, meal_type="dinner")
+        self.paused = BookingSystem.objects.create(restaurant=self.restaurant, meal_type="brunch", is_paused=True)
+        self.date = "2025-01-01"
+
+        def slot(system, time, **kwargs):
+            return TimeSlot.objects.create(
+                booking_system=system, date=self.date, time=time,
+                max_people=kwargs.pop("max_people", 10), max_tables=kwargs.pop("max_tables", 3), **kwargs
+            )
+
+        def book(time_slot, people, status="confirmed"):
+            return Booking.objects.create(time_slot=time_slot, first_name="Guest", people=people, status=status)
+
+        # Partially booked, with a canceled booking that must not count
+        self.lunch_open = slot(self.lunch, "13:00:00")
+        book(self.lunch_open, 4)
+        book(self.lunch_open, 5, status="canceled")
+        # Not enough people capacity left for a party of 4
+        self.lunch_full_people = slot(self.lunch, "13:30:00")
+        book(self.lunch_full_people, 7)
+        # No tables left
+        self.lunch_full_tables = slot(self.lunch, "14:00:00", max_tables=2)
+        book(self.lunch_full_tables, 1)
+        book(self.lunch_full_tables, 1)
+        # Closed, party-size and paused exclusions
+        slot(self.lunch, "14:30:00", is_open=False)
+        slot(self.dinner, "20:00:00", min=6)
+        slot(self.paused, "11:00:00")
+        self.dinner_open = slot(self.dinner, "21:00:00")
+        self.dinner_early = slot(self.dinner, "19:00:00")
+        book(self.dinner_early, 2, status="noshow")
+
+    def get_available(self, people=4):
+        return self.client.get("/api/available-tables/", {
+            "restaurant_id": self.restaurant.id,
+            "date": self.date,
+            "people": people,
+        })
+
+    def test_available_tables_matches_slot_rules(self):
+        """Only open, non-paused slots with people and table capacity are returned."""
+        response = self.get_available()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["available_times"], [
+            {
+                "booking_system_id": self.lunch.id,
+                "meal_type": "lunch",
+                "time_slot_id": self.lunch_open.id,
+                "time": "13:00:00",
+                "date": self.date,
+                "available_people_capacity": 6,
+                "available_table_capacity": 2,
+            },
+            {
+                "booking_system_id": self.dinner.id,
+                "meal_type": "dinner",
+                "time_slot_id": self.dinner_early.id,
+                "time": "19:00:00",
+                "date": self.date,
+                "available_people_capacity": 8,
+                "available_table_capacity": 2,
+            },
+            {
+                "booking_system_id": self.dinner.id,
+                "meal_type": "dinner",
+                "time_slot_id": self.dinner_open.id,
+                "time": "21:00:00",
+                "date": self.date,
+                "available_people_capacity": 10,
+                "available_table_capacity": 3,
+            },
+        ])
+
+    def test_available_tables_query_count_is_constant(self):
+        """The number of queries does not grow with slots or bookings."""
+        with self.assertNumQueries(2):
+            self.get_available()
+
+        for hour in range(15, 23):
+            time_slot = TimeSlot.objects.create(
+                booking_system=self.lunch, date=self.date, time=f"{hour}:15:00",
+                max_people=10, max_tables=3,
+            )
+            Booking.objects.create(time_slot=time_slot, first_name="Guest", people=2)
+
+        with self.assertNumQueries(2):
+            response = self.get_available()
+        self.assertEqual(len(response.data["available_times"]), 11)
+
+    def test_availability_calendar(self):
+        """The calendar summarizes every day of the range per meal type."""
+        full = TimeSlot.objects.create(
+            booking_system=self.dinner, date="2025-01-02", time="20:00:00", max_people=4, max_tables=3,
+        )
+        Booking.objects.create(time_slot=full, first_name="Guest", people=2)
+
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/available-tables/calendar/", {
+                "restaurant_id": self.restaurant.id,
+                "start_date": "2025-01-01",
+                "end_date": "2025-01-03",
+                "people": 4,
+            })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first_day, second_day, third_day = response.data["days"]
+
+        self.assertTrue(first_day["available"])
+        lunch, dinner, brunch = first_day["meal_types"]
+        self.assertEqual((lunch["meal_type"], lunch["available_slots"]), ("lunch", 1))
+        self.assertEqual(lunch["available_people_capacity"], 6)
+        self.assertEqual(lunch["available_table_capacity"], 2)
+        self.assertEqual((dinner["meal_type"], dinner["available_slots"]), ("dinner", 2))
+        self.assertEqual(dinner["available_people_capacity"], 18)
+        self.assertEqual(dinner["available_table_capacity"], 5)
+        self.assertFalse(brunch["available"])
+
+        self.assertEqual(second_day["date"], "2025-01-02")
+        self.assertFalse(second_day["available"])
+        self.assertEqual(len(second_day["meal_types"]), 1)
+        self.assertEqual(third_day, {"date": "2025-01-03", "available": False, "meal_types": []})
+
+    def test_availability_calendar_rejects_long_ranges(self):
+        """The calendar only accepts bounded date ranges."""
+        response = self.client.get("/api/available-tables/calendar/", {
+            "restaurant_id": self.restaurant.id,
+            "start_date": "2025-01-01",
+            "end_date": "2025-06-01",
+            "people": 2,
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+###############################################################################
+#                                TimeSlotCounterTests
+###############################################################################
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+
+class TimeSlotCounterTests(APITestCase):
+    """
+    Tests for the booked_people/booked_tables counters maintained on TimeSlot.
+    """
+
+    def setUp(self):
+        self.restaurant_user = CustomUser.objects.create_user(
+            username="counterowner",
+            password="Password123",
+            email="counterowner@example.com",
+            first_name="Counter",
+            last_name="Owner",
+            country_code="1",
+            phone_number="2025550207",
+            user_type="restaurant",
+        )
+        self.restaurant = Restaurant.objects.create(
+            owner=self.restaurant_user,
+            name="Counter Restaurant",
+            description="Restaurant for counter testing",
+            country="España",
+            state="Madrid",
+            city="Madrid",
+            postal="28015",
+            street="Calle de Gaztambide, 11",
+            latitude=0,
+            longitude=0,
+            timezone="Europe/Madrid",
+            cuisine=Cuisine.objects.create(name="Counter Cuisine"),
+        )
+        self.booking_system = BookingSystem.objects.create(restaurant=self.restaurant, meal_type="dinner")
+        self.time_slot = TimeSlot.objects.create(
+            booking_system=self.booking_system, date="2025-01-01", time="20:00:00",
+        )
+        self.other_time_slot = TimeSlot.objects.create(
+            booking_system=self.booking_system, date="2025-01-01", time="21:00:00",
+        )
+
+    def assertCounts(self, time_slot, people, tables):
+        time_slot.refresh_from_db()
+        self.assertEqual((time_slot.booked_people, time_slot.booked_tables), (people, tables))
+
+    def test_counters_follow_booking_lifecycle(self):
+        """Create, update, cancel, reopen, move and delete keep the counters exact."""
+        booking = Booking.objects.create(time_slot=self.time_slot, first_name="Guest", people=4)
+        Booking.objects.create(time_slot=self.time_slot, first_name="Guest", people=2)
+        self.assertCounts(self.time_slot, 6, 2)
+
+        booking.people = 5
+        booking.save()
+        self.assertCounts(self.time_slot, 7, 2)
+
+        booking.status = "canceled"
+        booking.save()
+        self.assertCounts(self.time_slot, 2, 1)
+
+        booking.status = "confirmed"
+        booking.save()
+        self.assertCounts(self.time_slot, 7, 2)
+
+        booking.time_slot = self.other_time_slot
+        booking.save()
+        self.assertCounts(self.time_slot, 2, 1)
+        self.assertCounts(self.other_time_slot, 5, 1)
+
+        booking.delete()
+        Booking.objects.filter(time_slot=self.time_slot).delete()
+        self.assertCounts(self.time_slot, 0, 0)
+        self.assertCounts(self.other_time_slot, 0, 0)
+
+    def test_time_slot_serializer_reads_counters(self):
+        """The owner time slot listing reports the maintained counters."""
+        Booking.objects.create(time_slot=self.time_slot, first_name="Guest", people=3)
+        authenticate(self.client, "counterowner")
+        response = self.client.get("/api/time-slots/", {"date": "2025-01-01"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]["current_booked_people"], 3)
+        self.assertEqual(response.data[0]["current_number_of_tables"], 1)
+
+    def test_reconcile_time_slot_counts(self):
+        """The reconciliation command reports and repairs drifted counters."""
+        Booking.objects.create(time_slot=self.time_slot, first_name="Guest", people=3)
+        Booking.objects.create(time_slot=self.time_slot, first_name="Guest", people=2, status="canceled")
+        TimeSlot.objects.filter(pk=self.time_slot.pk).update(booked_people=10, booked_tables=4)
+        TimeSlot.objects.filter(pk=self.other_time_slot.pk).update(booked_tables=1)
+
+        out = StringIO()
+        call_command("reconcile_time_slot_counts", "--dry-run", stdout=out)
+        self.assertIn("2 drifted", out.getvalue())
+        self.assertCounts(self.time_slot, 10, 4)
+
+        call_command("reconcile_time_slot_counts", "--batch-size", "1", stdout=StringIO())
+        self.assertCounts(self.time_slot, 3, 1)
+        self.assertCounts(self.other_time_slot, 0, 0)
+
+
+###############################################################################
+#                                BookingAdmissionTests
+###############################################################################
+import threading
+import unittest
+from django.db import connection
+from rest_framework.test import APIClient, APITransactionTestCase
+
+
+def create_admission_fixture(suffix, max_people=20, max_tables=5):
+    """
+    Helper to create a restaurant with a single open dinner time slot.
+    """
+    owner = CustomUser.objects.create_user(
+        username=f"admissionowner{suffix}",
+        password="Password123",
+        email=f"admissionowner{suffix}@example.com",
+        first_name="Admission",
+        last_name="Owner",
+        country_code="1",
+        phone_number=f"20255503{suffix:02d}",
+        user_type="restaurant",
+    )
+    restaurant = Restaurant.objects.create(
+        owner=owner,
+        name="Admission Restaurant",
+        description="Restaurant for admission testing",
+        country="España",
+        state="Madrid",
+        city="Madrid",
+        postal="28015",
+        street="Calle de Gaztambide, 11",
+        latitude=0,
+        longitude=0,
+        timezone="Europe/Madrid",
+        cuisine=Cuisine.objects.create(name=f"Admission Cuisine {suffix}"),
+    )
+    booking_system = BookingSystem.objects.create(restaurant=restaurant, meal_type="dinner")
+    return TimeSlot.objects.create(
+        booking_system=booking_system, date="2025-01-01", time="20:00:00",
+        max_people=max_people, max_tables=max_tables, max=8,
+    )
+
+
+class BookingAdmissionTests(APITestCase):
+    """
+    Tests for the guarded-UPDATE admission of /api/user/bookings/create/.
+    """
+
+    def setUp(self):
+        self.time_slot = create_admission_fixture(1, max_people=6, max_tables=2)
+
+    def book(self, people):
+        return self.client.post("/api/user/bookings/create/", {
+            "time_slot": self.time_slot.id,
+            "first_name": "Guest",
+            "people": people,
+        })
+
+    def test_booking_reserves_capacity(self):
+        """A successful booking takes its people and one table from the slot."""
+        response = self.book(4)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.time_slot.refresh_from_db()
+        self.assertEqual((self.time_slot.booked_people, self.time_slot.booked_tables), (4, 1))
+
+    def test_booking_rejected_when_full(self):
+        """People and table capacity are still enforced."""
+        self.assertEqual(self.book(4).status_code, status.HTTP_201_CREATED)
+        response = self.book(3)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("maximum capacity", str(response.data))
+        self.assertEqual(self.book(2).status_code, status.HTTP_201_CREATED)
+        response = self.book(1)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_reserve_rejects_when_counters_are_full(self):
+        """The guarded UPDATE refuses a reservation that would overbook."""
+        TimeSlot.objects.filter(pk=self.time_slot.pk).update(booked_people=5, booked_tables=1)
+        self.assertFalse(TimeSlot.objects.filter(pk=self.time_slot.pk).reserve(2))
+        self.assertTrue(TimeSlot.objects.filter(pk=self.time_slot.pk).reserve(1))
+        self.assertFalse(TimeSlot.objects.filter(pk=self.time_slot.pk).reserve(1))
+
+    def book_as_customer(self, people):
+        """Book as an authenticated customer, who can then edit the booking."""
+        customer = CustomUser.objects.create_user(
+            username="admissioncustomer",
+            password="Password123",
+            email="admissioncustomer@example.com",
+            first_name="Admission",
+            last_name="Customer",
+            country_code="1",
+            phone_number="2025557001",
+            user_type="normal",
+        )
+        self.client.force_authenticate(user=customer)
+        response = self.book(people)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Booking.objects.get(user=customer)
+
+    def assertCounts(self, time_slot, people, tables):
+        time_slot.refresh_from_db()
+        self.assertEqual((time_slot.booked_people, time_slot.booked_tables), (people, tables))
+
+    def test_larger_party_rejected_when_full(self):
+        """Growing a booking takes the extra seats with the guarded UPDATE."""
+        booking = self.book_as_customer(4)
+        self.assertEqual(self.book(2).status_code, status.HTTP_201_CREATED)
+        response = self.client.patch(f"/api/user/bookings/{booking.pk}/", {"people": 5})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("no longer has capacity", str(response.data))
+        booking.refresh_from_db()
+        self.assertEqual(booking.people, 4)
+        self.assertCounts(self.time_slot, 6, 2)
+
+        # Shrinking never needs capacity
+        response = self.client.patch(f"/api/user/bookings/{booking.pk}/", {"people": 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCounts(self.time_slot, 5, 2)
+
+    def test_larger_party_by_booking_code_rejected_when_full(self):
+        """Guests editing by booking code are guarded the same way."""
+        self.assertEqual(self.book(4).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.book(1).status_code, status.HTTP_201_CREATED)
+        booking = Booking.objects.get(people=4)
+        data = {"booking_code": str(booking.booking_code), "time_slot": self.time_slot.id}
+        response = self.client.patch("/api/retrieve-booking/", {**data, "people": 6})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertCounts(self.time_slot, 5, 2)
+        response = self.client.patch("/api/retrieve-booking/", {**data, "people": 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCounts(self.time_slot, 6, 2)
+
+    def test_move_to_full_time_slot_rejected(self):
+        """Moving a booking reserves it in the new slot before releasing the old one."""
+        booking = self.book_as_customer(3)
+        other = TimeSlot.objects.create(
+            booking_system=self.time_slot.booking_system, date="2025-01-01", time="21:00:00",
+            max_people=6, max_tables=1, max=8, booked_people=2, booked_tables=1,
+        )
+        response = self.client.patch(f"/api/user/bookings/{booking.pk}/", {"time_slot": other.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        booking.refresh_from_db()
+        self.assertEqual(booking.time_slot_id, self.time_slot.id)
+        self.assertCounts(self.time_slot, 3, 1)
+        self.assertCounts(other, 2, 1)
+
+        TimeSlot.objects.filter(pk=other.pk).update(booked_people=0, booked_tables=0)
+        response = self.client.patch(f"/api/user/bookings/{booking.pk}/", {"time_slot": other.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCounts(self.time_slot, 0, 0)
+        self.assertCounts(other, 3, 1)
+
+
+class BookingAdmissionConcurrencyTests(APITransactionTestCase):
+    """
+    Stress test: many threads booking the same time slot at once.
+    """
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "needs row locks across concurrent connections")
+    def test_concurrent_bookings_never_overbook(self):
+        """Concurrent requests admit exactly as many bookings as the slot allows."""
+        time_slot = create_admission_fixture(2, max_people=20, max_tables=5)
+        results = []
+        barrier = threading.Barrier(20)
+
+        def attempt():
+            client = APIClient()
+            try:
+                barrier.wait()
+                response = client.post("/api/user/bookings/create/", {
+                    "time_slot": time_slot.id,
+                    "first_name": "Guest",
+                    "people": 3,
+                })
+                results.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attempt) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        time_slot.refresh_from_db()
+        bookings = Booking.objects.filter(time_slot=time_slot).exclude(status="canceled")
+        self.assertEqual(results.count(status.HTTP_201_CREATED), 5)
+        self.assertEqual(results.count(status.HTTP_400_BAD_REQUEST), 15)
+        self.assertEqual(bookings.count(), 5)
+        self.assertEqual(time_slot.booked_tables, 5)
+        self.assertEqual(time_slot.booked_people, sum(b.people for b in bookings))
+        self.assertLessEqual(time_slot.booked_people, time_slot.max_people)
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "needs row locks across concurrent connections")
+    def test_benchmark_booking_storm_command(self):
+        """The storm benchmark reports results and cleans up its fixture."""
+        out = StringIO()
+        call_command(
+            "benchmark_booking_storm", "--attempts", "12", "--concurrency", "4",
+            "--max-people", "6", "--max-tables", "10", stdout=out,
+        )
+        output = out.getvalue()
+        self.assertIn("Attempts:    12 (3 admitted, 9 rejected, 0 errors)", output)
+        self.assertIn("Overbooked:  no", output)
+        self.assertFalse(Restaurant.objects.filter(name__startswith="Storm ").exists())
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "needs row locks across concurrent connections")
+    def test_benchmark_booking_storm_existing_time_slot(self):
+        """Storming an existing slot deletes its storm bookings afterwards."""
+        time_slot = create_admission_fixture(5, max_people=6, max_tables=10)
+        call_command(
+            "benchmark_booking_storm", "--attempts", "8", "--concurrency", "4",
+            "--time-slot", str(time_slot.pk), stdout=StringIO(),
+        )
+        self.assertFalse(Booking.objects.filter(time_slot=time_slot).exists())
+        time_slot.refresh_from_db()
+        self.assertEqual((time_slot.booked_people, time_slot.booked_tables), (0, 0))
+
+    def test_benchmark_booking_storm_refuses_booked_time_slot(self):
+        """A slot that already has bookings is never stormed."""
+        time_slot = create_admission_fixture(6)
+        Booking.objects.create(time_slot=time_slot, first_name="Guest", people=2)
+        with self.assertRaisesMessage(CommandError, "already has bookings"):
+            call_command("benchmark_booking_storm", "--time-slot", str(time_slot.pk), stdout=StringIO())
+        self.assertEqual(Booking.objects.filter(time_slot=time_slot).count(), 1)
+
+
+###############################################################################
+#                                LazyTimeSlotTests
+###############################################################################
+class LazyTimeSlotTests(APITestCase):
+    """
+    Tests for booking systems whose TimeSlots are computed from their rules
+    and only stored once booked.
+    """
+
+    def setUp(self):
+        self.restaurant_user = CustomUser.objects.create_user(
+            username="lazyslotowner",
+            password="Password123",
+            email="lazyslotowner@example.com",
+            first_name="Lazy",
+            last_name="Owner",
+            country_code="1",
+            phone_number="2025550208",
+            user_type="restaurant",
+        )
+        self.restaurant = Restaurant.objects.create(
+            owner=self.restaurant_user,
+            name="Lazy Slot Restaurant",
+            description="Restaurant for lazy time slot testing",
+            country="España",
+            state="Madrid",
+            city="Madrid",
+            postal="28015",
+            street="Calle de Gaztambide, 11",
+            latitude=0,
+            longitude=0,
+            timezone="Europe/Madrid",
+            cuisine=Cuisine.objects.create(name="Lazy Slot Cuisine"),
+        )
+        self.booking_system = BookingSystem.objects.create(
+            restaurant=self.restaurant, meal_type="dinner", lazy_time_slots=True
+        )
+        self.date = date.today() + timedelta(days=7)
+        self.general_time_slot = GeneralTimeSlot.objects.create(
+            booking_system=self.booking_system,
+            weekday=self.date.weekday(),
+            start_time=datetime.strptime("20:00:00", "%H:%M:%S").time(),
+            end_time=datetime.strptime("21:00:00", "%H:%M:%S").time(),
+            interval_minutes=30,
+            max_people=6,
+            max_tables=2,
+        )
+
+    def authenticate_user(self, user):
+        """Helper method to authenticate a user."""
+        response = self.client.post("/api/token/", {
+            "username": user.username,
+            "password": "Password123"
+        })
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def available_times(self, people=2):
+        response = self.client.get("/api/available-tables/", {
+            "restaurant_id": self.restaurant.id, "date": str(self.date), "people": people,
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data["available_times"]
+
+    def book(self, time="20:30:00", people=2):
+        return self.client.post("/api/user/bookings/create/", {
+            "booking_system": self.booking_system.id,
+            "date": str(self.date),
+            "time": time,
+            "first_name": "Guest",
+            "people": people,
+        })
+
+    def test_rules_do_not_store_time_slots(self):
+        """A lazy booking system stores no TimeSlots for its rules."""
+        self.assertFalse(TimeSlot.objects.filter(booking_system=self.booking_system).exists())
+
+    def test_available_tables_lists_virtual_slots(self):
+        """Availability is computed from the rules, with a null time slot id."""
+        available = self.available_times()
+        self.assertEqual([slot["time"] for slot in available], ["20:00:00", "20:30:00", "21:00:00"])
+        self.assertTrue(all(slot["time_slot_id"] is None for slot in available))
+        self.assertEqual(available[0]["available_people_capacity"], 6)
+
+    def test_first_booking_materializes_the_time_slot(self):
+        """Booking by date and time stores the slot once and counts every booking on it."""
+        self.assertEqual(self.book().status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.book().status_code, status.HTTP_201_CREATED)
+
+        time_slot = TimeSlot.objects.get(booking_system=self.booking_system)
+        self.assertEqual((time_slot.date, str(time_slot.time)), (self.date, "20:30:00"))
+        self.assertEqual((time_slot.booked_people, time_slot.booked_tables), (4, 2))
+        self.assertEqual(time_slot.general_timeslot, self.general_time_slot)
+
+        available = self.available_times()
+        self.assertEqual([slot["time"] for slot in available], ["20:00:00", "21:00:00"])
+        response = self.book()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_booking_a_time_outside_the_rules_is_rejected(self):
+        """Only times generated by a rule can be booked."""
+        response = self.book(time="20:15:00")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("time_slot", response.data)
+        self.assertFalse(TimeSlot.objects.filter(booking_system=self.booking_system).exists())
+
+    def test_no_virtual_slots_outside_the_horizon(self):
+        """Only bookable dates are advertised: none in the past or past the horizon."""
+        for single_date in (self.date - timedelta(days=14), self.date + timedelta(days=28)):
+            response = self.client.get("/api/available-tables/", {
+                "restaurant_id": self.restaurant.id, "date": str(single_date), "people": 2,
+            })
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data["available_times"], [], single_date)
+
+    def test_owner_listing_merges_virtual_slots(self):
+        """The owner TimeSlot listing for a date shows stored and virtual slots."""
+        self.book()
+        self.authenticate_user(self.restaurant_user)
+        response = self.client.get("/api/time-slots/", {"date": str(self.date)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([slot["time"] for slot in response.data], ["20:00:00", "20:30:00", "21:00:00"])
+        self.assertEqual([slot["id"] is None for slot in response.data], [True, False, True])
+        self.assertEqual(response.data[1]["current_booked_people"], 2)
+
+    def test_availability_calendar_counts_virtual_slots(self):
+        """The calendar summarizes lazy booking systems from their computed slots."""
+        response = self.client.get("/api/available-tables/calendar/", {
+            "restaurant_id": self.restaurant.id,
+            "start_date": str(self.date),
+            "end_date": str(self.date + timedelta(days=1)),
+            "people": 2,
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        day, next_day = response.data["days"]
+        self.assertTrue(day["available"])
+        self.assertEqual(day["meal_types"][0]["available_slots"], 3)
+        self.assertEqual(day["meal_types"][0]["available_table_capacity"], 6)
+        self.assertFalse(next_day["available"])
+
+    def test_switching_to_eager_materializes_the_horizon(self):
+        """Turning lazy_time_slots off stores the rule's slots over the horizon."""
+        self.booking_system.lazy_time_slots = False
+        self.booking_system.save()
+        self.assertEqual(
+            TimeSlot.objects.filter(booking_system=self.booking_system, date=self.date).count(), 3
+        )
+
+
+###############################################################################
+#                                RetentionTests
+###############################################################################
+from api.models.booking.archived_booking import ArchivedBooking
+from django.conf import settings
+from api.models.booking.retention import apply_retention
+
+
+class RetentionTests(APITestCase):
+    """
+    Tests for archiving old bookings and deleting past unbooked time slots.
+    """
+
+    def setUp(self):
+        self.restaurant_user = CustomUser.objects.create_user(
+            username="retentionowner",
+            password="Password123",
+            email="retentionowner@example.com",
+            first_name="Retention",
+            last_name="Owner",
+            country_code="1",
+            phone_number="2025550209",
+            user_type="restaurant",
+        )
+        self.restaurant = Restaurant.objects.create(
+            owner=self.restaurant_user,
+            name="Retention Restaurant",
+            description="Restaurant for retention testing",
+            country="España",
+            state="Madrid",
+            city="Madrid",
+            postal="28015",
+            street="Calle de Gaztambide, 11",
+            latitude=0,
+            longitude=0,
+            timezone="Europe/Madrid",
+            cuisine=Cuisine.objects.create(name="Retention Cuisine"),
+        )
+        self.booking_system = BookingSystem.objects.create(restaurant=self.restaurant, meal_type="dinner")
+        today = date.today()
+
+        def slot(days):
+            return TimeSlot.objects.create(
+                booking_system=self.booking_system, date=today + timedelta(days=days), time="20:00:00",
+                max_people=10, max_tables=3,
+            )
+
+        self.expired = slot(-200)
+        Booking.objects.create(time_slot=self.expired, first_name="Old", people=2)
+        Booking.objects.create(time_slot=self.expired, first_name="Canceled", people=3, status="canceled")
+        self.recent = slot(-10)
+        Booking.objects.create(time_slot=self.recent, first_name="Recent", people=2)
+        self.past_unbooked = slot(-1)
+        self.future = slot(1)
+
+    def authenticate_user(self, user):
+        """Helper method to authenticate a user."""
+        response = self.client.post("/api/token/", {
+            "username": user.username,
+            "password": "Password123"
+        })
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def test_retention_archives_old_bookings_and_deletes_unbooked_slots(self):
+        """Old slots are archived with their bookings; past unbooked slots are deleted."""
+        counts = apply_retention(retention_days=180, batch_size=1)
+        self.assertEqual(counts, {"archived_bookings": 2, "archived_time_slots": 1, "deleted_time_slots": 1})
+        self.assertEqual(
+            set(TimeSlot.objects.values_list("id", flat=True)), {self.recent.id, self.future.id}
+        )
+        self.assertEqual(Booking.objects.get().first_name, "Recent")
+
+        archived = ArchivedBooking.objects.get(first_name="Old")
+        self.assertEqual(archived.restaurant, self.restaurant)
+        self.assertEqual((archived.meal_type, archived.date, str(archived.time)), ("dinner", self.expired.date, "20:00:00"))
+        self.assertEqual(ArchivedBooking.objects.get(first_name="Canceled").status, "canceled")
+
+    def test_retention_is_safe_to_rerun(self):
+        """A second run finds nothing left to archive or delete."""
+        apply_retention(retention_days=180)
+        counts = apply_retention(retention_days=180)
+        self.assertEqual(counts, {"archived_bookings": 0, "archived_time_slots": 0, "deleted_time_slots": 0})
+        self.assertEqual(ArchivedBooking.objects.count(), 2)
+
+    def test_retention_is_scheduled(self):
+        """The periodic scheduler runs the retention task."""
+        tasks = {entry["task"] for entry in settings.CELERY_BEAT_SCHEDULE.values()}
+        self.assertIn("api.tasks.apply_booking_retention", tasks)
+
+    def test_retention_command_dry_run_changes_nothing(self):
+        """The dry run reports what would happen without touching the data."""
+        out = StringIO()
+        call_command("apply_booking_retention", "--retention-days", "180", "--dry-run", stdout=out)
+        self.assertIn(
+            "Would archive 2 bookings from 1 time slots and would delete 1 past unbooked time slots.",
+            out.getvalue(),
+        )
+        self.assertEqual(TimeSlot.objects.count(), 4)
+        self.assertFalse(ArchivedBooking.objects.exists())
+
+    def test_owner_can_list_archived_bookings(self):
+        """Owners read their archived bookings; other accounts see none."""
+        apply_retention(retention_days=180)
+        self.authenticate_user(self.restaurant_user)
+        response = self.client.get("/api/bookings/archive/", {"status": "confirmed"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([booking["first_name"] for booking in response.data["results"]], ["Old"])
+
+        response = self.client.get("/api/bookings/archive/", {"start_date": str(date.today())})
+        self.assertEqual(response.data["count"], 0)
+        response = self.client.get("/api/bookings/archive/", {"start_date": "yesterday"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        other = CustomUser.objects.create_user(
+            username="retentionother", password="Password123", email="retentionother@example.com",
+            first_name="Other", last_name="Owner", country_code="1", phone_number="2025550210",
+            user_type="restaurant",
+        )
+        self.authenticate_user(other)
+        self.assertEqual(self.client.get("/api/bookings/archive/").data["count"], 0)
+
+
+###############################################################################
+#                                BufferedReactionCounterTests
+###############################################################################
+from itertools import count
+from unittest import mock
+from django.core.cache import caches
+from api.counters import adjust_counts, apply_deltas, counter_key, flush_counters
+
+# Numbers the reaction fixtures, so every call creates distinct users and names
+reaction_fixture_numbers = count(1)
+
+
+def create_reaction_fixture():
+    """
+    Helper to create a normal user plus a restaurant with one dish to react to.
+    """
+    suffix = next(reaction_fixture_numbers)
+    normal_user = CustomUser.objects.create_user(
+        username=f"reactionuser{suffix}",
+        password="Password123",
+        email=f"reactionuser{suffix}@example.com",
+        first_name="Reaction",
+        last_name="User",
+        country_code="1",
+        phone_number=f"202555{4000 + suffix:04d}",
+        user_type="normal",
+    )
+    owner = CustomUser.objects.create_user(
+        username=f"reactionowner{suffix}",
+        password="Password123",
+        email=f"reactionowner{suffix}@example.com",
+        first_name="Reaction",
+        last_name="Owner",
+        country_code="1",
+        phone_number=f"202555{6000 + suffix:04d}",
+        user_type="restaurant",
+    )
+    restaurant = Restaurant.objects.create(
+        owner=owner,
+        name=f"Reaction Restaurant {suffix}",
+        description="Restaurant for reaction testing",
+        country="España",
+        state="Madrid",
+        city="Madrid",
+        postal="28015",
+        street="Calle de Gaztambide, 11",
+        latitude=0,
+        longitude=0,
+        timezone="Europe/Madrid",
+        cuisine=Cuisine.objects.create(name=f"Reaction Cuisine {suffix}"),
+    )
+    dish = Dish.objects.create(
+        name=f"Reaction Dish {suffix}",
+        description="Dish for reaction testing",
+        restaurant=restaurant,
+        course=Course.objects.create(name=f"Reaction Course {suffix}"),
+    )
+    return normal_user, restaurant, dish
+
+
+@override_settings(REACTION_COUNTER_BACKEND="buffered")
+class BufferedReactionCounterTests(APITestCase):
+    """
+    Tests for the write-behind reaction counters flushed from the cache.
+    """
+
+    def setUp(self):
+        caches["default"].clear()
+        self.normal_user, self.restaurant, self.dish = create_reaction_fixture()
+        response = self.client.post("/api/token/", {
+            "username": self.normal_user.username,
+            "password": "Password123"
+        })
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def test_reactions_reach_the_database_on_flush(self):
+        """Buffered deltas leave the rows untouched until they are flushed."""
+        response = self.client.post("/api/likes-dislikes/dishes/create/", {"dish": self.dish.id, "type": "like"})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.client.post("/api/likes-dislikes/restaurants/create/", {"restaurant": self.restaurant.id, "type": "dislike"})
+        self.client.post("/api/favorites/restaurants/create/", {"restaurant": self.restaurant.id})
+
+        self.dish.refresh_from_db()
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.dish.like_count, 0)
+        self.assertEqual(self.restaurant.dislike_count, 0)
+
+        self.assertEqual(flush_counters(), 2)
+        self.dish.refresh_from_db()
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.dish.like_count, 1)
+        self.assertEqual((self.restaurant.dislike_count, self.restaurant.favorites_count), (1, 1))
+
+        # Nothing is applied twice
+        self.assertEqual(flush_counters(), 0)
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.favorites_count, 1)
+
+    def test_changes_between_flushes_are_netted(self):
+        """Liking, switching to dislike and removing it nets out to no change."""
+        response = self.client.post("/api/likes-dislikes/dishes/create/", {"dish": self.dish.id, "type": "like"})
+        reaction_id = response.data["id"]
+        self.client.patch(f"/api/likes-dislikes/dishes/{reaction_id}/update/", {"type": "dislike"})
+        flush_counters()
+        self.dish.refresh_from_db()
+        self.assertEqual((self.dish.like_count, self.dish.dislike_count), (0, 1))
+
+        self.client.delete(f"/api/likes-dislikes/dishes/{reaction_id}/delete/")
+        flush_counters()
+        self.dish.refresh_from_db()
+        self.assertEqual((self.dish.like_count, self.dish.dislike_count), (0, 0))
+
+    def test_deltas_are_applied_with_one_update_per_model(self):
+        """A batch of entities is written with a single UPDATE."""
+        _, other_restaurant, _ = create_reaction_fixture()
+        with CaptureQueriesContext(connection) as queries:
+            apply_deltas("restaurant", {
+                self.restaurant.id: {"like_count": 3, "favorites_count": 1},
+                other_restaurant.id: {"dislike_count": 2},
+            })
+        self.assertEqual(len([q for q in queries.captured_queries if q["sql"].startswith("UPDATE")]), 1)
+        self.restaurant.refresh_from_db()
+        other_restaurant.refresh_from_db()
+        self.assertEqual((self.restaurant.like_count, self.restaurant.favorites_count), (3, 1))
+        self.assertEqual((other_restaurant.like_count, other_restaurant.dislike_count), (0, 2))
+
+    def test_flush_waits_for_a_marker_being_written(self):
+        """A flush between a writer's sequence number and its marker leaves it for the next flush."""
+        cache = caches["default"]
+
+        class FlushBeforeMarker:
+            def __getattr__(self, name):
+                return getattr(cache, name)
+
+            def set(self, key, *args, **kwargs):
+                if ":dirty:" in key:
+                    flush_counters()
+                return cache.set(key, *args, **kwargs)
+
+        with mock.patch("api.counters.get_cache", return_value=FlushBeforeMarker()):
+            adjust_counts(self.dish, like_count=1)
+        self.assertEqual(Dish.objects.get(pk=self.dish.pk).like_count, 0)
+
+        self.assertEqual(flush_counters(), 1)
+        self.assertEqual(Dish.objects.get(pk=self.dish.pk).like_count, 1)
+
+    def test_flush_deletes_drained_keys(self):
+        """Only the keys of pending deltas stay in the cache."""
+        adjust_counts(self.dish, like_count=1)
+        adjust_counts(self.dish, like_count=-1)
+        flush_counters()
+        for sign in "+-":
+            self.assertIsNone(caches["default"].get(counter_key("dish", self.dish.pk, "", "like_count", sign)))
+        self.assertEqual(Dish.objects.get(pk=self.dish.pk).like_count, 0)
+
+    def test_counter_key_evicted_before_its_increment(self):
+        """A counter evicted between its add and its increment is created again."""
+        cache = caches["default"]
+
+        class EvictBeforeIncr:
+            def __getattr__(self, name):
+                return getattr(cache, name)
+
+            def incr(self, key, delta=1):
+                if key.endswith(":like_count:+") and cache.get(key) == 0:
+                    cache.delete(key)
+                return cache.incr(key, delta)
+
+        with mock.patch("api.counters.get_cache", return_value=EvictBeforeIncr()):
+            adjust_counts(self.dish, like_count=1)
+        flush_counters()
+        self.assertEqual(Dish.objects.get(pk=self.dish.pk).like_count, 1)
+
+    def test_writes_after_the_cache_is_cleared_are_flushed(self):
+        """An evicted sequence restarts after the last flushed number."""
+        cache = caches["default"]
+        adjust_counts(self.dish, like_count=1)
+        adjust_counts(self.restaurant, like_count=1)
+        flush_counters()
+        cache.delete("reaction-counter:seq")
+        adjust_counts(self.dish, like_count=1)
+        self.assertEqual(flush_counters(), 1)
+        self.assertEqual(Dish.objects.get(pk=self.dish.pk).like_count, 2)
+
+        # Everything evicted between a write and the flush: that delta is lost,
+        # but the next ones reach the database again
+        adjust_counts(self.dish, like_count=1)
+        cache.clear()
+        adjust_counts(self.dish, like_count=1)
+        self.assertEqual(flush_counters(), 1)
+        self.assertEqual(Dish.objects.get(pk=self.dish.pk).like_count, 3)
+
+    @override_settings(REACTION_COUNTER_MARKER_GRACE_SECONDS=0)
+    def test_flush_skips_a_marker_missing_past_the_grace_period(self):
+        """A sequence number whose writer never set its marker does not block later ones."""
+        cache = caches["default"]
+        cache.add("reaction-counter:seq", 0, timeout=None)
+        cache.incr("reaction-counter:seq")
+        adjust_counts(self.dish, like_count=1)
+
+        self.assertEqual(flush_counters(), 1)
+        self.assertEqual(Dish.objects.get(pk=self.dish.pk).like_count, 1)
+        self.assertEqual(cache.get("reaction-counter:flushed"), 2)
+
+
+###############################################################################
+#                                WeeklyLikeCountTests
+###############################################################################
+from django.utils import timezone
+from api.counters import count_reactions, rebuild_reaction_days, refresh_window_like_counts
+from api.tasks import update_dish_weekly_counts, update_restaurant_weekly_counts
+
+
+class WeeklyLikeCountTests(APITestCase):
+    """
+    Tests for the set-based weekly like count recomputation.
+    """
+
+    def setUp(self):
+        self.normal_user, self.restaurant, self.dish = create_reaction_fixture()
+        self.other_user, self.other_restaurant, self.other_dish = create_reaction_fixture()
+        old = timezone.now() - timedelta(days=8)
+
+        LikeDislike.objects.create(user=self.normal_user, restaurant=self.restaurant, type="like")
+        LikeDislike.objects.create(user=self.other_user, restaurant=self.restaurant, type="dislike")
+        stale = LikeDislike.objects.create(user=self.other_user, restaurant=self.other_restaurant, type="like")
+        LikeDislike.objects.filter(pk=stale.pk).update(created_at=old)
+        DishLikeDislike.objects.create(user=self.normal_user, dish=self.dish, type="like")
+        DishLikeDislike.objects.create(user=self.other_user, dish=self.dish, type="like")
+        Restaurant.objects.filter(pk=self.other_restaurant.pk).update(weekly_like_count=5)
+        # Reactions created through the ORM are counted into the buckets by the backfill
+        rebuild_reaction_days("restaurant")
+        rebuild_reaction_days("dish")
+
+    def test_weekly_counts_are_recomputed_in_bulk(self):
+        """Only likes of the last 7 days count, and stale counts are reset."""
+        update_restaurant_weekly_counts()
+        update_dish_weekly_counts()
+        self.restaurant.refresh_from_db()
+        self.other_restaurant.refresh_from_db()
+        self.dish.refresh_from_db()
+        self.other_dish.refresh_from_db()
+        self.assertEqual(self.restaurant.weekly_like_count, 1)
+        self.assertEqual(self.other_restaurant.weekly_like_count, 0)
+        self.assertEqual(self.other_restaurant.monthly_like_count, 1)
+        self.assertEqual(self.dish.daily_like_count, 2)
+        self.assertEqual(self.dish.weekly_like_count, 2)
+        self.assertEqual(self.other_dish.weekly_like_count, 0)
+
+    @override_settings(WINDOW_COUNT_CHUNK_SIZE=1)
+    def test_weekly_counts_only_write_changed_rows(self):
+        """Each chunk is one UPDATE, and rows already up to date are not written."""
+        self.assertEqual(refresh_window_like_counts("restaurant"), 2)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(refresh_window_like_counts("restaurant"), 0)
+        max_pk = Restaurant.objects.order_by("-pk").values_list("pk", flat=True).first()
+        # One aggregate query plus one UPDATE per primary key
+        self.assertEqual(len(queries), 1 + max_pk)
+
+    def test_windows_cover_exactly_their_number_of_days(self):
+        """A like made N - 1 days ago counts in an N-day window, one made N days ago does not."""
+        DishLikeDislike.objects.all().delete()
+        users = [self.normal_user, self.other_user, create_reaction_fixture()[0], create_reaction_fixture()[0]]
+        for user, days_ago in zip(users, (1, 6, 7, 29)):
+            reaction = DishLikeDislike.objects.create(user=user, dish=self.dish, type="like")
+            DishLikeDislike.objects.filter(pk=reaction.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        DishLikeDislike.objects.create(user=self.normal_user, dish=self.other_dish, type="like")
+        rebuild_reaction_days("dish")
+        refresh_window_like_counts("dish")
+
+        expected = {"daily_like_count": 0, "weekly_like_count": 2, "monthly_like_count": 4}
+        self.dish.refresh_from_db()
+        self.assertEqual({field: getattr(self.dish, field) for field in expected}, expected)
+        self.assertEqual({field: count_reactions("dish", [self.dish.pk])[self.dish.pk][field] for field in expected}, expected)
+        self.other_dish.refresh_from_db()
+        self.assertEqual(self.other_dish.daily_like_count, 1)
+
+
+###############################################################################
+#                                ReactionDayBucketTests
+###############################################################################
+from api.counters import window_count
+from api.models.dish import DishReactionDay
+from api.models.restaurant import RestaurantReactionDay
+
+
+class ReactionDayBucketTests(APITestCase):
+    """
+    Tests for the daily reaction buckets behind the windowed like counts.
+    """
+
+    def setUp(self):
+        caches["default"].clear()
+        self.normal_user, self.restaurant, self.dish = create_reaction_fixture()
+        response = self.client.post("/api/token/", {
+            "username": self.normal_user.username,
+            "password": "Password123"
+        })
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def dish_bucket(self):
+        bucket = DishReactionDay.objects.get(dish=self.dish, day=timezone.localdate())
+        return bucket.like_count, bucket.dislike_count, bucket.favorites_count
+
+    def test_buckets_follow_reactions(self):
+        """Creating, changing and deleting reactions moves today's bucket along."""
+        response = self.client.post("/api/likes-dislikes/dishes/create/", {"dish": self.dish.id, "type": "like"})
+        reaction_id = response.data["id"]
+        self.assertEqual(self.dish_bucket(), (1, 0, 0))
+
+        self.client.patch(f"/api/likes-dislikes/dishes/{reaction_id}/update/", {"type": "dislike"})
+        self.client.post("/api/favorites/dishes/create/", {"dish": self.dish.id})
+        self.assertEqual(self.dish_bucket(), (0, 1, 1))
+
+        self.client.delete(f"/api/likes-dislikes/dishes/{reaction_id}/delete/")
+        self.assertEqual(self.dish_bucket(), (0, 0, 1))
+        self.assertEqual(DishReactionDay.objects.count(), 1)
+
+        self.client.post("/api/likes-dislikes/restaurants/create/", {"restaurant": self.restaurant.id, "type": "like"})
+        bucket = RestaurantReactionDay.objects.get(restaurant=self.restaurant)
+        self.assertEqual((bucket.day, bucket.like_count), (timezone.localdate(), 1))
+
+    @override_settings(REACTION_COUNTER_BACKEND="buffered")
+    def test_buffered_buckets_are_flushed(self):
+        """The buffered backend writes the buckets along with the counters."""
+        self.client.post("/api/likes-dislikes/dishes/create/", {"dish": self.dish.id, "type": "like"})
+        self.assertFalse(DishReactionDay.objects.exists())
+        flush_counters()
+        self.assertEqual(self.dish_bucket(), (1, 0, 0))
+        self.dish.refresh_from_db()
+        self.assertEqual(self.dish.like_count, 1)
+
+    def test_windows_are_sums_of_buckets(self):
+        """Any window is answered by summing its buckets."""
+        today = timezone.localdate()
+        DishReactionDay.objects.bulk_create([
+            DishReactionDay(dish=self.dish, day=today, like_count=1),
+            DishReactionDay(dish=self.dish, day=today - timedelta(days=10), like_count=2),
+            DishReactionDay(dish=self.dish, day=today - timedelta(days=40), like_count=4),
+        ])
+        dish = Dish.objects.annotate(
+            fortnight=window_count("dish", 14), quarter=window_count("dish", 90)
+        ).get(pk=self.dish.pk)
+        self.assertEqual((dish.fortnight, dish.quarter), (3, 7))
+
+        refresh_window_like_counts("dish")
+        self.dish.refresh_from_db()
+        self.assertEqual(
+            (self.dish.daily_like_count, self.dish.weekly_like_count, self.dish.monthly_like_count),
+            (1, 1, 3),
+        )
+        response = self.client.get("/api/dishes/", {"ordering": "-monthly_like_count"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_user_deletion_and_rebuild(self):
+        """Deleting a user takes their reactions out, and a rebuild recounts the same buckets."""
+        other_user, _, _ = create_reaction_fixture()
+        self.client.post("/api/likes-dislikes/dishes/create/", {"dish": self.dish.id, "type": "like"})
+        DishLikeDislike.objects.create(user=other_user, dish=self.dish, type="like")
+        rebuild_reaction_days("dish")
+        self.assertEqual(self.dish_bucket(), (2, 0, 0))
+
+        self.normal_user.delete()
+        self.assertEqual(self.dish_bucket(), (1, 0, 0))
+
+        DishReactionDay.objects.update(like_count=9)
+        call_command("rebuild_reaction_days", model="dish", stdout=StringIO())
+        self.assertEqual(self.dish_bucket(), (1, 0, 0))
+        self.dish.refresh_from_db()
+        self.assertEqual(self.dish.daily_like_count, 1)
+
+
+###############################################################################
+#                                TrendingScoreTests
+###############################################################################
+from api.counters import rebuild_trending_scores, renormalize_trending_scores
+
+
+@override_settings(TRENDING_HALF_LIFE_DAYS=3, TRENDING_DISLIKE_WEIGHT=1.0)
+class TrendingScoreTests(APITestCase):
+    """
+    Tests for the exponentially decayed trending scores.
+    """
+
+    def setUp(self):
+        caches["default"].clear()
+        self.normal_user, self.restaurant, self.dish = create_reaction_fixture()
+        self.other_user, self.other_restaurant, self.other_dish = create_reaction_fixture()
+        self.today = timezone.localdate().toordinal()
+        response = self.client.post("/api/token/", {
+            "username": self.normal_user.username,
+            "password": "Password123"
+        })
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def test_reactions_update_the_score(self):
+        """A like adds 1 as of today and a dislike takes it away again."""
+        self.client.post("/api/likes-dislikes/dishes/create/", {"dish": self.dish.id, "type": "like"})
+        self.dish.refresh_from_db()
+        self.assertAlmostEqual(self.dish.trending_score, 1.0)
+        self.assertEqual(self.dish.trending_day, self.today)
+
+        self.client.post("/api/likes-dislikes/restaurants/create/", {"restaurant": self.restaurant.id, "type": "like"})
+        reaction = LikeDislike.objects.get(restaurant=self.restaurant)
+        self.client.patch(f"/api/likes-dislikes/restaurants/{reaction.id}/update/", {"type": "dislike"})
+        self.restaurant.refresh_from_db()
+        self.assertAlmostEqual(self.restaurant.trending_score, -1.0)
+
+    def test_writes_decay_the_stored_score_first(self):
+        """A score stored three days (one half-life) ago is halved before a like is added."""
+        Dish.objects.filter(pk=self.dish.pk).update(trending_score=4.0, trending_day=self.today - 3)
+        self.client.post("/api/likes-dislikes/dishes/create/", {"dish": self.dish.id, "type": "like"})
+        self.dish.refresh_from_db()
+        self.assertAlmostEqual(self.dish.trending_score, 3.0)
+
+    @override_settings(REACTION_COUNTER_BACKEND="buffered")
+    def test_buffered_reactions_update_the_score_on_flush(self):
+        """The buffered backend applies the score change when it flushes."""
+        self.client.post("/api/likes-dislikes/dishes/create/", {"dish": self.dish.id, "type": "like"})
+        flush_counters()
+        self.dish.refresh_from_db()
+        self.assertAlmostEqual(self.dish.trending_score, 1.0)
+
+    def test_renormalization(self):
+        """Scores not written today are decayed once, and negligible ones become 0."""
+        Dish.objects.filter(pk=self.dish.pk).update(trending_score=4.0, trending_day=self.today - 3)
+        Dish.objects.filter(pk=self.other_dish.pk).update(trending_score=1e-9, trending_day=self.today - 1)
+        self.assertEqual(renormalize_trending_scores("dish"), 2)
+        self.assertEqual(renormalize_trending_scores("dish"), 0)
+        self.dish.refresh_from_db()
+        self.other_dish.refresh_from_db()
+        self.assertAlmostEqual(self.dish.trending_score, 2.0)
+        self.assertEqual(self.dish.trending_day, self.today)
+        self.assertEqual(self.other_dish.trending_score, 0)
+
+    def test_recent_likes_trend_higher(self):
+        """One like today outranks two likes six days ago, on the list endpoint too."""
+        today = timezone.localdate()
+        DishReactionDay.objects.bulk_create([
+            DishReactionDay(dish=self.dish, day=today, like_count=1),
+            DishReactionDay(dish=self.other_dish, day=today - timedelta(days=6), like_count=2),
+        ])
+        rebuild_trending_scores("dish")
+        self.other_dish.refresh_from_db()
+        self.assertAlmostEqual(self.other_dish.trending_score, 0.5)
+
+        response = self.client.get("/api/dishes/", {"ordering": "-trending_score"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [dish["id"] for dish in response.data["results"]]
+        self.assertLess(ids.index(self.dish.id), ids.index(self.other_dish.id))
+
+
+###############################################################################
+#                                WilsonScoreTests
+###############################################################################
+from api.counters import wilson_lower_bound
+
+
+class WilsonScoreTests(APITestCase):
+    """
+    Tests for the stored Wilson score used to rank by quality.
+    """
+
+    def setUp(self):
+        self.normal_user, self.restaurant, self.dish = create_reaction_fixture()
+        self.other_user, self.other_restaurant, self.other_dish = create_reaction_fixture()
+        response = self.client.post("/api/token/", {
+            "username": self.normal_user.username,
+            "password": "Password123"
+        })
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def test_lower_bound(self):
+        """Many likes with a few dislikes beat a handful of likes."""
+        self.assertEqual(wilson_lower_bound(0, 0), 0)
+        self.assertLess(wilson_lower_bound(3, 0), wilson_lower_bound(300, 20))
+        self.assertAlmostEqual(wilson_lower_bound(1, 0), 0.2065, places=4)
+
+    def test_reactions_keep_the_score_in_sync(self):
+        """Every like/dislike change rewrites the stored score."""
+        response = self.client.post("/api/likes-dislikes/dishes/create/", {"dish": self.dish.id, "type": "like"})
+        self.dish.refresh_from_db()
+        self.assertAlmostEqual(self.dish.wilson_score, wilson_lower_bound(1, 0))
+
+        self.client.patch(f"/api/likes-dislikes/dishes/{response.data['id']}/update/", {"type": "dislike"})
+        self.dish.refresh_from_db()
+        self.assertAlmostEqual(self.dish.wilson_score, 0)
+
+        self.client.post("/api/likes-dislikes/restaurants/create/", {"restaurant": self.restaurant.id, "type": "like"})
+        self.normal_user.delete()
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.wilson_score, 0)
+
+    def test_backfill_and_ordering(self):
+        """The backfill command scores existing counts and the list orders by it."""
+        Dish.objects.filter(pk=self.dish.pk).update(like_count=3)
+        Dish.objects.filter(pk=self.other_dish.pk).update(like_count=300, dislike_count=20)
+        call_command("backfill_wilson_scores", model="dish", stdout=StringIO())
+        self.other_dish.refresh_from_db()
+        self.assertAlmostEqual(self.other_dish.wilson_score, wilson_lower_bound(300, 20))
+
+        response = self.client.get("/api/dishes/", {"ordering": "-wilson_score"})
+        ids = [dish["id"] for dish in response.data["results"]]
+        self.assertLess(ids.index(self.other_dish.id), ids.index(self.dish.id))
+
+
+###############################################################################
+#                                SetReactionTests
+###############################################################################
+from django.db.models import F
+from api.reactions import lock_user_reactions
+
+
+class SetReactionTests(APITestCase):
+    """
+    Tests for the idempotent set-my-reaction endpoints.
+    """
+
+    def setUp(self):
+        self.normal_user, self.restaurant, self.dish = create_reaction_fixture()
+        response = self.client.post("/api/token/", {
+            "username": self.normal_user.username,
+            "password": "Password123"
+        })
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.url = f"/api/likes-dislikes/dishes/{self.dish.id}/set/"
+
+    def test_set_change_and_clear(self):
+        """One endpoint creates, switches and removes the reaction."""
+        response = self.client.put(self.url, {"type": "like"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], "created")
+        self.assertEqual((response.data["like_count"], response.data["dislike_count"]), (1, 0))
+
+        response = self.client.put(self.url, {"type": "dislike"}, format="json")
+        self.assertEqual(response.data["status"], "updated")
+        self.assertEqual(DishLikeDislike.objects.get(user=self.normal_user, dish=self.dish).type, "dislike")
+
+        response = self.client.put(self.url, {"type": None}, format="json")
+        self.assertEqual(response.data["status"], "deleted")
+        self.assertFalse(DishLikeDislike.objects.filter(user=self.normal_user).exists())
+        self.dish.refresh_from_db()
+        self.assertEqual((self.dish.like_count, self.dish.dislike_count), (0, 0))
+
+    def test_double_tap_is_idempotent(self):
+        """Repeating the same request changes nothing the second time."""
+        self.client.put(self.url, {"type": "like"}, format="json")
+        response = self.client.put(self.url, {"type": "like"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], "unchanged")
+        self.dish.refresh_from_db()
+        self.assertEqual(self.dish.like_count, 1)
+        self.assertEqual(DishLikeDislike.objects.filter(dish=self.dish).count(), 1)
+
+    def test_restaurant_reaction_and_errors(self):
+        """Restaurants work the same way; unknown targets and types are rejected."""
+        url = f"/api/likes-dislikes/restaurants/{self.restaurant.id}/set/"
+        response = self.client.put(url, {"type": "dislike"}, format="json")
+        self.assertEqual(response.data["status"], "created")
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.dislike_count, 1)
+
+        response = self.client.put("/api/likes-dislikes/restaurants/999999/set/", {"type": "like"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.put(self.url, {"type": "love"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_counts_are_read_under_the_lock(self):
+        """The counts returned are the stored ones, including writes committed while waiting for the lock."""
+        def concurrent_likes(user):
+            lock_user_reactions(user)
+            Dish.objects.filter(pk=self.dish.pk).update(like_count=F("like_count") + 3)
+
+        with mock.patch("api.reactions.lock_user_reactions", side_effect=concurrent_likes):
+            response = self.client.put(self.url, {"type": "like"}, format="json")
+        self.assertEqual(response.data["like_count"], 4)
+        self.assertEqual(Dish.objects.get(pk=self.dish.pk).like_count, 4)
+
+    def test_reaction_endpoints_take_the_user_lock(self):
+        """Creating, updating and deleting a reaction serialize with set_reactions."""
+        with mock.patch("api.views.dish.like_dislike_views.lock_user_reactions", wraps=lock_user_reactions) as lock:
+            response = self.client.post("/api/likes-dislikes/dishes/create/", {"dish": self.dish.id, "type": "like"})
+            reaction_id = response.data["id"]
+            self.client.patch(f"/api/likes-dislikes/dishes/{reaction_id}/update/", {"type": "dislike"})
+            self.client.delete(f"/api/likes-dislikes/dishes/{reaction_id}/delete/")
+        self.assertEqual(lock.call_args_list, [mock.call(self.normal_user)] * 3)
+        self.dish.refresh_from_db()
+        self.assertEqual((self.dish.like_count, self.dish.dislike_count), (0, 0))
+
+
+###############################################################################
+#                                BatchReactionTests
+###############################################################################
+class BatchReactionTests(APITestCase):
+    """
+    Tests for rating several dishes in one request.
+    """
+
+    def setUp(self):
+        self.normal_user, self.restaurant, self.dish = create_reaction_fixture()
+        self.dishes = [self.dish] + [
+            Dish.objects.create(
+                name=f"Batch Dish {number}", description="Dish for batch testing",
+                restaurant=self.restaurant, course=self.dish.course,
+            )
+            for number in range(2)
+        ]
+        DishLikeDislike.objects.create(user=self.normal_user, dish=self.dishes[2], type="dislike")
+        Dish.objects.filter(pk=self.dishes[2].pk).update(dislike_count=1)
+        response = self.client.post("/api/token/", {
+            "username": self.normal_user.username,
+            "password": "Password123"
+        })
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def test_batch_reports_every_item(self):
+        """Reactions are written in bulk with one counter UPDATE and a result per item."""
+        payload = {"reactions": [
+            {"dish": self.dishes[0].id, "type": "like"},
+            {"dish": self.dishes[1].id, "type": "dislike"},
+            {"dish": self.dishes[2].id, "type": "like"},
+            {"dish": 999999, "type": "like"},
+        ]}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/api/likes-dislikes/dishes/batch/", payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["created", "created", "updated", "not_found"],
+        )
+        dish_updates = [
+            q for q in queries.captured_queries
+            if q["sql"].startswith("UPDATE") and "api_dish\"" in q["sql"].split("SET")[0]
+        ]
+        self.assertEqual(len(dish_updates), 1)
+
+        counts = dict(Dish.objects.filter(restaurant=self.restaurant).values_list("pk", "like_count"))
+        self.assertEqual([counts[dish.pk] for dish in self.dishes], [1, 0, 1])
+        self.dishes[2].refresh_from_db()
+        self.assertEqual(self.dishes[2].dislike_count, 0)
+        self.assertEqual(DishLikeDislike.objects.filter(user=self.normal_user).count(), 3)
+
+    def test_batch_validation(self):
+        """Empty batches, duplicate dishes and unknown types are rejected."""
+        url = "/api/likes-dislikes/dishes/batch/"
+        self.assertEqual(self.client.post(url, {"reactions": []}, format="json").status_code, 400)
+        duplicate = {"reactions": [{"dish": self.dish.id, "type": "like"}, {"dish": self.dish.id, "type": None}]}
+        self.assertEqual(self.client.post(url, duplicate, format="json").status_code, 400)
+        invalid = {"reactions": [{"dish": self.dish.id, "type": "love"}]}
+        self.assertEqual(self.client.post(url, invalid, format="json").status_code, 400)
+        self.assertFalse(DishLikeDislike.objects.filter(dish=self.dish).exists())
+
+
+###############################################################################
+#                                ShardedCounterTests
+###############################################################################
+import unittest
+from unittest import mock
+from django.db.models import F
+from api.counters import fold_counter_shards
+from api.reactions import set_reactions
+from api.models.dish import DishCounterShard
+from api.tasks import flush_reaction_counters
+
+
+@override_settings(REACTION_COUNTER_BACKEND="sharded", REACTION_COUNTER_SHARDS=4)
+class ShardedCounterTests(APITestCase):
+    """
+    Tests for the sharded reaction counter backend.
+    """
+
+    def setUp(self):
+        self.normal_user, self.restaurant, self.dish = create_reaction_fixture()
+        self.other_user, _, _ = create_reaction_fixture()
+
+    def react(self, user, shard):
+        with mock.patch("api.counters.random.randrange", return_value=shard):
+            set_reactions(user, "dish", {self.dish.pk: "like"})
+
+    def test_reactions_spread_over_shards(self):
+        """Writes go to the picked shard rows and leave the dish row alone."""
+        self.react(self.normal_user, 0)
+        self.react(self.other_user, 3)
+        self.dish.refresh_from_db()
+        self.assertEqual(self.dish.like_count, 0)
+        self.assertEqual(
+            sorted(DishCounterShard.objects.filter(dish=self.dish).values_list("shard", "like_count")),
+            [(0, 1), (3, 1)],
+        )
+
+    def test_fold_moves_shards_into_counters(self):
+        """Folding sums the shards into the counters and buckets and empties them."""
+        self.react(self.normal_user, 1)
+        self.react(self.other_user, 1)
+        self.assertEqual(flush_reaction_counters(), 1)
+        self.dish.refresh_from_db()
+        self.assertEqual(self.dish.like_count, 2)
+        self.assertAlmostEqual(self.dish.trending_score, 2.0)
+        self.assertEqual(DishReactionDay.objects.get(dish=self.dish).like_count, 2)
+        self.assertFalse(DishCounterShard.objects.exists())
+        self.assertEqual(fold_counter_shards(), 0)
+
+    def test_fold_keeps_deltas_added_meanwhile(self):
+        """Only the folded values are subtracted from a shard."""
+        self.react(self.normal_user, 2)
+        shard = DishCounterShard.objects.get()
+        DishCounterShard.objects.filter(pk=shard.pk).update(like_count=5)
+        with mock.patch("api.counters.apply_keyed_deltas") as apply_keyed_deltas:
+            def add_concurrent_like(*args):
+                DishCounterShard.objects.filter(pk=shard.pk).update(like_count=F("like_count") + 1)
+            apply_keyed_deltas.side_effect = add_concurrent_like
+            fold_counter_shards()
+        shard.refresh_from_db()
+        self.assertEqual(shard.like_count, 1)
+
+    @unittest.skipUnless(connection.features.has_select_for_update_skip_locked, "needs SELECT ... SKIP LOCKED")
+    def test_fold_locks_its_batch(self):
+        """A fold skips the shard rows another fold has locked."""
+        self.react(self.normal_user, 0)
+        with CaptureQueriesContext(connection) as queries:
+            fold_counter_shards()
+        self.assertTrue(any("SKIP LOCKED" in query["sql"] for query in queries.captured_queries))
+
+
+###############################################################################
+#                                ReconcileCounterTests
+###############################################################################
+from api.counters import reconcile_counters
+
+
+class ReconcileCounterTests(APITestCase):
+    """
+    Tests for the chunked reaction counter reconciliation.
+    """
+
+    def setUp(self):
+        caches["default"].clear()
+        self.normal_user, self.restaurant, self.dish = create_reaction_fixture()
+        self.other_user, self.other_restaurant, self.other_dish = create_reaction_fixture()
+        # Reactions written without their counter updates leave the counts drifted
+        DishLikeDislike.objects.create(user=self.normal_user, dish=self.dish, type="like")
+        DishLikeDislike.objects.create(user=self.other_user, dish=self.dish, type="dislike")
+        DishFavorite.objects.create(user=self.normal_user, dish=self.other_dish)
+        Dish.objects.filter(pk=self.other_dish.pk).update(like_count=4)
+
+    def test_dry_run_reports_without_repairing(self):
+        out = StringIO()
+        call_command("reconcile_reaction_counts", "--model", "dish", "--dry-run", stdout=out)
+        self.assertIn("2 drifted", out.getvalue())
+        self.assertIn("like_count: 2", out.getvalue())
+        self.dish.refresh_from_db()
+        self.assertEqual(self.dish.like_count, 0)
+
+    def test_repair(self):
+        call_command("reconcile_reaction_counts", stdout=StringIO())
+        self.dish.refresh_from_db()
+        self.other_dish.refresh_from_db()
+        self.assertEqual(
+            (self.dish.like_count, self.dish.dislike_count, self.dish.weekly_like_count), (1, 1, 1)
+        )
+        self.assertAlmostEqual(self.dish.wilson_score, wilson_lower_bound(1, 1))
+        self.assertEqual((self.other_dish.like_count, self.other_dish.favorites_count), (0, 1))
+        self.assertEqual(reconcile_counters("dish")["drifted"], 0)
+
+    @override_settings(REACTION_COUNTER_BACKEND="sharded")
+    def test_repair_needs_the_direct_backend(self):
+        """Pending shard deltas of recounted reactions would be applied twice."""
+        with self.assertRaises(CommandError):
+            call_command("reconcile_reaction_counts", stdout=StringIO())
+        with self.assertRaises(ValueError):
+            reconcile_counters("dish")
+        self.assertEqual(reconcile_counters("dish", dry_run=True)["drifted"], 2)
+        self.dish.refresh_from_db()
+        self.assertEqual(self.dish.like_count, 0)
+
+    def test_repair_rebuilds_the_buckets(self):
+        """The window refresh reads the repaired buckets and keeps the repaired windows."""
+        call_command("reconcile_reaction_counts", stdout=StringIO())
+        self.assertEqual(
+            DishReactionDay.objects.filter(dish=self.dish).values_list("like_count", "dislike_count").get(), (1, 1)
+        )
+        refresh_window_like_counts("dish")
+        self.dish.refresh_from_db()
+        self.assertEqual((self.dish.daily_like_count, self.dish.weekly_like_count), (1, 1))
+
+    def test_chunks_and_resume(self):
+        """Each chunk takes a fixed number of queries, and an interrupted run resumes."""
+        first, second = sorted([self.dish.pk, self.other_dish.pk])
+
+        def interrupt(drift):
+            raise RuntimeError("interrupted")
+
+        with self.assertRaises(RuntimeError):
+            reconcile_counters("dish", batch_size=1, start_after=first - 1, report=interrupt)
+        # The first chunk was committed before the interruption
+        self.assertEqual(Dish.objects.get(pk=first).like_count, 1 if first == self.dish.pk else 0)
+
+        with CaptureQueriesContext(connection) as queries:
+            totals = reconcile_counters("dish", batch_size=1, resume=True)
+        self.assertEqual((totals["checked"], totals["last_id"]), (Dish.objects.filter(pk__gt=first).count(), second))
+        # Per chunk: ids, stored counts, reactions, favorites, the buckets' delete and insert
+        # and the update; plus the last empty page
+        statements = [q for q in queries.captured_queries if not q["sql"].startswith(("SAVEPOINT", "RELEASE"))]
+        self.assertLessEqual(len(statements), 7 * totals["checked"] + 1)
+        self.assertEqual(reconcile_counters("dish")["drifted"], 0)
+
+###############################################################################
+#                                UserDeletionTests
+###############################################################################
+from api.counters import adjust_many_counts
+from api.tasks import delete_pending_users, delete_user
+
+
+class UserDeletionTests(APITestCase):
+    """
+    Tests for the bulk and deferred user deletion cascade.
+    """
+
+    def setUp(self):
+        caches["default"].clear()
+        self.normal_user, self.restaurant, self.dish = create_reaction_fixture()
+        _, _, self.other_dish = create_reaction_fixture()
+        set_reactions(self.normal_user, "dish", {self.dish.pk: "like", self.other_dish.pk: "dislike"})
+        set_reactions(self.normal_user, "restaurant", {self.restaurant.pk: "like"})
+        DishFavorite.objects.create(user=self.normal_user, dish=self.dish)
+        adjust_many_counts("dish", {(self.dish.pk, timezone.localdate()): {"favorites_count": 1}})
+
+    def test_bulk_cascade(self):
+        """The counters of all reacted dishes are decremented with a single UPDATE."""
+        with CaptureQueriesContext(connection) as queries:
+            self.normal_user.delete()
+        dish_updates = [q for q in queries.captured_queries if q["sql"].startswith('UPDATE "api_dish"')]
+        self.assertEqual(len(dish_updates), 1)
+
+        for dish in (self.dish, self.other_dish):
+            dish.refresh_from_db()
+            self.assertEqual((dish.like_count, dish.dislike_count, dish.favorites_count), (0, 0, 0))
+            self.assertEqual(dish.wilson_score, 0)
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.like_count, 0)
+        self.assertFalse(
+            DishReactionDay.objects.exclude(like_count=0, dislike_count=0, favorites_count=0).exists()
+        )
+
+    @override_settings(USER_DELETION_ASYNC_THRESHOLD=2)
+    def test_large_account_is_deleted_in_background(self):
+        self.client.force_authenticate(user=self.normal_user)
+        with mock.patch("api.views.user.user_views.delete_user") as task:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.delete(f"/api/users/{self.normal_user.id}/delete/")
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        task.delay.assert_called_once_with(self.normal_user.pk)
+
+        self.normal_user.refresh_from_db()
+        self.assertTrue(self.normal_user.deletion_pending)
+        self.assertFalse(self.normal_user.is_active)
+
+        delete_user(self.normal_user.pk)
+        self.assertFalse(CustomUser.objects.filter(pk=self.normal_user.pk).exists())
+        self.dish.refresh_from_db()
+        self.assertEqual((self.dish.like_count, self.dish.favorites_count), (0, 0))
+
+    @override_settings(USER_DELETION_ASYNC_THRESHOLD=2)
+    def test_pending_deletion_is_queued_again(self):
+        """An account whose task could not be queued is deleted by the sweep."""
+        self.client.force_authenticate(user=self.normal_user)
+        with mock.patch("api.views.user.user_views.delete_user") as task:
+            task.delay.side_effect = ConnectionError("broker unavailable")
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.delete(f"/api/users/{self.normal_user.id}/delete/")
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertTrue(CustomUser.objects.get(pk=self.normal_user.pk).deletion_pending)
+
+        with mock.patch("api.tasks.delete_user") as task:
+            self.assertEqual(delete_pending_users(), 1)
+        task.delay.assert_called_once_with(self.normal_user.pk)
+
+        delete_user(self.normal_user.pk)
+        self.assertFalse(CustomUser.objects.filter(pk=self.normal_user.pk).exists())
+        self.dish.refresh_from_db()
+        self.assertEqual((self.dish.like_count, self.dish.favorites_count), (0, 0))
+        self.assertEqual(delete_pending_users(), 0)
+
+    def test_small_account_is_deleted_immediately(self):
+        self.client.force_authenticate(user=self.normal_user)
+        response = self.client.delete(f"/api/users/{self.normal_user.id}/delete/")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(CustomUser.objects.filter(pk=self.normal_user.pk).exists())
+
+###############################################################################
+#                                ReactionStateListTests
+###############################################################################
+class ReactionStateListTests(APITestCase):
+    """
+    Tests for loading the user's reactions of a whole list page at once.
+    """
+
+    REACTION_TABLES = ('"api_favorite"', '"api_likedislike"', '"api_dishfavorite"', '"api_dishlikedislike"')
+
+    def setUp(self):
+        self.normal_user, self.restaurant, self.dish = create_reaction_fixture()
+        _, self.other_restaurant, self.other_dish = create_reaction_fixture()
+        _, _, self.unrated_dish = create_reaction_fixture()
+        self.client.force_authenticate(user=self.normal_user)
+        self.client.post("/api/favorites/dishes/create/", {"dish": self.dish.id})
+        self.client.post("/api/likes-dislikes/dishes/create/", {"dish": self.other_dish.id, "type": "dislike"})
+        self.client.post("/api/favorites/restaurants/create/", {"restaurant": self.restaurant.id})
+        self.client.post(
+            "/api/likes-dislikes/restaurants/create/", {"restaurant": self.other_restaurant.id, "type": "like"}
+        )
+
+    def reaction_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        reaction_queries = [
+            q for q in queries.captured_queries
+            if any(f"FROM {table}" in q["sql"] for table in self.REACTION_TABLES)
+        ]
+        return {row["id"]: row for row in response.data["results"]}, len(reaction_queries)
+
+    def test_dish_list(self):
+        rows, queries = self.reaction_queries("/api/dishes/")
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(queries, 2)
+        favorite = DishFavorite.objects.get(user=self.normal_user, dish=self.dish)
+        reaction = DishLikeDislike.objects.get(user=self.normal_user, dish=self.other_dish)
+        self.assertEqual(rows[self.dish.id]["favorite_details"], {"is_favorite": True, "favorite_id": favorite.id})
+        self.assertEqual(
+            rows[self.other_dish.id]["like_dislike_details"],
+            {"is_like": False, "is_dislike": True, "like_dislike_id": reaction.id},
+        )
+        self.assertEqual(
+            rows[self.unrated_dish.id]["like_dislike_details"],
+            {"is_like": False, "is_dislike": False, "like_dislike_id": None},
+        )
+
+    def test_restaurant_list(self):
+        rows, queries = self.reaction_queries("/api/restaurants/")
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(queries, 2)
+        favorite = Favorite.objects.get(user=self.normal_user, restaurant=self.restaurant)
+        reaction = LikeDislike.objects.get(user=self.normal_user, restaurant=self.other_restaurant)
+        self.assertEqual(rows[self.restaurant.id]["favorite_details"], {"is_favorite": True, "favorite_id": favorite.id})
+        self.assertEqual(rows[self.other_restaurant.id]["favorite_details"], {"is_favorite": False, "favorite_id": None})
+        self.assertEqual(
+            rows[self.other_restaurant.id]["like_dislike_details"],
+            {"is_like": True, "is_dislike": False, "like_dislike_id": reaction.id},
+        )
+
+    def test_detail_view(self):
+        response = self.client.get(f"/api/dishes/{self.dish.id}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["favorite_details"]["is_favorite"])
+
+###############################################################################
+#                                QueryBudgetTests
+###############################################################################
+from uuid import uuid4
+from rest_framework.mixins import ListModelMixin
+from api.models.booking.booking import BookingTypes
+from api.models.restaurant import RestaurantPhoto
+from api.urls import urlpatterns as api_urlpatterns
+from api.views.booking import (
+    BookingTypesListCreateView,
+    ListArchivedBookingView,
+    ListCreateBookingSystemView,
+    ListCreateBookingView,
+    ListCreateGeneralTimeSlotView,
+    ListCreateTimeSlotView,
+)
+from api.views.dish import (
+    GetRestaurantDishView,
+    ListCreateCategoryView,
+    ListCreateCourseView,
+    ListDishFavoriteView,
+    ListDishLikeDislikeView,
+    ListDishView,
+    SpecificListDishLikeDislikeView,
+)
+from api.views.restaurant import (
+    ListCreateCuisineView,
+    ListCreateRestaurantPhotoView,
+    ListFavoriteView,
+    ListLikeDislikeView,
+    ListRestaurantView,
+    SpecificListLikeDislikeView,
+)
+
+
+class QueryBudgetTests(APITestCase):
+    """
+    Tests keeping every list endpoint within the query_budget of its view,
+    whatever the number of listed rows.
+    """
+
+    def setUp(self):
+        self.normal_user, self.restaurant, self.dish = create_reaction_fixture()
+        self.owner = self.restaurant.owner
+        self.booking_system = BookingSystem.objects.create(restaurant=self.restaurant, meal_type="general")
+        self.time_slot = TimeSlot.objects.create(
+            booking_system=self.booking_system, date="2025-01-01", time="12:00", max_people=100, max_tables=50
+        )
+        self.rows = 0
+
+    def add_fixture(self):
+        self.rows += 1
+        return create_reaction_fixture()
+
+    def assertQueryBudget(self, view, url, add_row, user=None):
+        """
+        Fail when listing `url` takes more queries than the view's
+        query_budget, or when it takes more queries after more rows were
+        added with add_row().
+        """
+        self.client.force_authenticate(user=user or self.normal_user)
+        counts = []
+        for rows in (1, 3):
+            for _ in range(rows):
+                add_row()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+            counts.append(len([
+                q for q in queries.captured_queries if not q["sql"].startswith(("SAVEPOINT", "RELEASE"))
+            ]))
+        self.assertEqual(counts[0], counts[1], f"{view.__name__} queries grow with the number of rows")
+        self.assertLessEqual(counts[1], view.query_budget, f"{view.__name__} exceeds its query budget")
+
+    def test_every_list_endpoint_declares_a_budget(self):
+        for pattern in api_urlpatterns:
+            view = getattr(pattern.callback, "view_class", None)
+            if view and issubclass(view, ListModelMixin):
+                self.assertIsInstance(getattr(view, "query_budget", None), int, view.__name__)
+
+    def test_restaurants(self):
+        def add_row():
+            _, restaurant, _ = self.add_fixture()
+            RestaurantPhoto.objects.create(restaurant=restaurant, photo="restaurant_photos/photo.jpg")
+
+        self.assertQueryBudget(ListRestaurantView, "/api/restaurants/", add_row)
+
+    def test_restaurant_photos(self):
+        def add_row():
+            RestaurantPhoto.objects.create(restaurant=self.restaurant, photo="restaurant_photos/photo.jpg")
+
+        self.assertQueryBudget(
+            ListCreateRestaurantPhotoView, f"/api/restaurants/{self.restaurant.id}/photos/", add_row
+        )
+
+    def test_cuisines_courses_and_categories(self):
+        for view, url, model in (
+            (ListCreateCuisineView, "/api/cuisines/", Cuisine),
+            (ListCreateCourseView, "/api/courses/", Course),
+            (ListCreateCategoryView, "/api/categories/", Category),
+        ):
+            self.assertQueryBudget(view, url, lambda: model.objects.create(name=f"Budget {uuid4().hex[:8]}"))
+
+    def test_restaurant_favorites_and_likes(self):
+        def add_favorite():
+            _, restaurant, _ = self.add_fixture()
+            RestaurantPhoto.objects.create(restaurant=restaurant, photo="restaurant_photos/photo.jpg")
+            Favorite.objects.create(user=self.normal_user, restaurant=restaurant)
+
+        def add_like():
+            _, restaurant, _ = self.add_fixture()
+            LikeDislike.objects.create(user=self.normal_user, restaurant=restaurant, type="like")
+
+        def add_restaurant_like():
+            user, _, _ = self.add_fixture()
+            LikeDislike.objects.create(user=user, restaurant=self.restaurant, type="like")
+
+        self.assertQueryBudget(ListFavoriteView, "/api/favorites/restaurants/", add_favorite)
+        self.assertQueryBudget(ListLikeDislikeView, "/api/likes-dislikes/restaurants/", add_like)
+        self.assertQueryBudget(
+            SpecificListLikeDislikeView, f"/api/restaurants/{self.restaurant.id}/likes-dislikes/", add_restaurant_like
+        )
+
+    def test_dishes(self):
+        category = Category.objects.create(name="Budget category")
+
+        def add_dish():
+            _, _, dish = self.add_fixture()
+            dish.categories.add(category)
+            return dish
+
+        def add_restaurant_dish():
+            Dish.objects.filter(pk=add_dish().pk).update(restaurant=self.restaurant)
+
+        self.assertQueryBudget(ListDishView, "/api/dishes/", add_dish)
+        self.assertQueryBudget(
+            GetRestaurantDishView, f"/api/restaurants/{self.restaurant.id}/dishes/", add_restaurant_dish
+        )
+
+    def test_dish_favorites_and_likes(self):
+        def add_favorite():
+            _, _, dish = self.add_fixture()
+            DishFavorite.objects.create(user=self.normal_user, dish=dish)
+
+        def add_like():
+            _, _, dish = self.add_fixture()
+            DishLikeDislike.objects.create(user=self.normal_user, dish=dish, type="dislike")
+
+        def add_dish_like():
+            user, _, _ = self.add_fixture()
+            DishLikeDislike.objects.create(user=user, dish=self.dish, type="like")
+
+        self.assertQueryBudget(ListDishFavoriteView, "/api/favorites/dishes/", add_favorite)
+        self.assertQueryBudget(ListDishLikeDislikeView, "/api/likes-dislikes/dishes/", add_like)
+        self.assertQueryBudget(
+            SpecificListDishLikeDislikeView, f"/api/dishes/{self.dish.id}/likes-dislikes/", add_dish_like
+        )
+
+    def test_booking_systems_and_rules(self):
+        meal_types = iter(["breakfast", "lunch", "dinner", "brunch"])
+        weekdays = iter(range(7))
+
+        def add_booking_system():
+            BookingSystem.objects.create(restaurant=self.restaurant, meal_type=next(meal_types))
+
+        noon = datetime.strptime("12:00", "%H:%M").time()
+
+        def add_rule():
+            GeneralTimeSlot.objects.create(
+                booking_system=self.booking_system, weekday=next(weekdays),
+                start_time=noon, end_time=noon, interval_minutes=60, max_people=10, max_tables=5,
+            )
+
+        def add_booking_type():
+            BookingTypes.objects.create(name=f"Budget {uuid4().hex[:8]}", booking_system=self.booking_system)
+
+        self.assertQueryBudget(ListCreateBookingSystemView, "/api/booking-systems/", add_booking_system, self.owner)
+        self.assertQueryBudget(ListCreateGeneralTimeSlotView, "/api/general-time-slots/", add_rule, self.owner)
+        self.assertQueryBudget(
+            BookingTypesListCreateView, f"/api/booking-system/{self.booking_system.id}/booking-types/",
+            add_booking_type, self.owner,
+        )
+
+    def test_time_slots_and_bookings(self):
+        hours = iter(range(13, 20))
+
+        def add_time_slot():
+            TimeSlot.objects.create(
+                booking_system=self.booking_system, date="2025-01-01", time=f"{next(hours)}:00",
+                max_people=10, max_tables=5,
+            )
+
+        def add_booking():
+            Booking.objects.create(time_slot=self.time_slot, first_name="Guest", people=2)
+
+        def add_archived_booking():
+            ArchivedBooking.objects.create(
+                booking_id=self.rows, restaurant=self.restaurant, meal_type="general", date="2024-01-01",
+                time="12:00", booking_code=uuid4(), first_name="Guest", people=2, status="confirmed",
+                created_at=timezone.now(), updated_at=timezone.now(),
+            )
+            self.rows += 1
+
+        self.assertQueryBudget(ListCreateTimeSlotView, "/api/time-slots/?date=2025-01-01", add_time_slot, self.owner)
+        self.assertQueryBudget(ListCreateBookingView, "/api/bookings/?date=2025-01-01", add_booking, self.owner)
+        self.assertQueryBudget(ListArchivedBookingView, "/api/bookings/archive/", add_archived_booking, self.owner)
+
+###############################################################################
+#                                SparseFieldsetTests
+###############################################################################
+class SparseFieldsetTests(APITestCase):
+    """
+    Tests for ?fields= and ?expand= on the dish and restaurant endpoints.
+    """
+
+    def setUp(self):
+        self.normal_user, self.restaurant, self.dish = create_reaction_fixture()
+        self.course = Course.objects.create(name="Sparse course")
+        self.category = Category.objects.create(name="Sparse category")
+        Dish.objects.filter(pk=self.dish.pk).update(course=self.course)
+        self.dish.categories.add(self.category)
+        self.photo = RestaurantPhoto.objects.create(restaurant=self.restaurant, photo="restaurant_photos/photo.jpg")
+        self.client.force_authenticate(user=self.normal_user)
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data, queries.captured_queries
+
+    def test_lean_dish_list(self):
+        data, queries = self.get("/api/dishes/?fields=id,name,price,like_count,image")
+        self.assertEqual(set(data["results"][0]), {"id", "name", "price", "like_count", "image"})
+        # The count and the page: no prefetches, joins or reaction state lookups
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('"description"', queries[-1]["sql"])
+        self.assertNotIn("JOIN", queries[-1]["sql"])
+
+    def test_collapsed_and_expanded_relations(self):
+        data, _ = self.get("/api/dishes/?fields=id,course,categories,currency")
+        row = data["results"][0]
+        self.assertEqual((row["course"], row["categories"]), (self.course.id, [self.category.id]))
+        self.assertEqual(row["currency"], self.restaurant.currency)
+
+        data, _ = self.get("/api/dishes/?fields=id&expand=course")
+        self.assertEqual(data["results"][0], {"id": self.dish.id, "course": {"id": self.course.id, "name": "Sparse course"}})
+
+    def test_restaurant_detail_and_list(self):
+        data, _ = self.get(f"/api/restaurants/{self.restaurant.id}/?fields=id,name,favorite_details&expand=photos")
+        self.assertEqual(set(data), {"id", "name", "favorite_details", "photos"})
+        self.assertEqual(data["photos"][0]["id"], self.photo.id)
+
+        data, queries = self.get("/api/restaurants/?fields=id,cuisine,photos")
+        self.assertEqual(data["results"][0], {
+            "id": self.restaurant.id, "cuisine": self.restaurant.cuisine_id, "photos": [self.photo.id],
+        })
+        # The count, the page and the photos
+        self.assertEqual(len(queries), 3)
+
+    def test_full_payload_by_default(self):
+        data, _ = self.get(f"/api/dishes/{self.dish.id}/")
+        self.assertEqual(data["course"], {"id": self.course.id, "name": "Sparse course"})
+        self.assertIn("like_dislike_details", data)
+
+###############################################################################
+#                                CompactEmbedTests
+###############################################################################
+class CompactEmbedTests(APITestCase):
+    """
+    Tests for ?embed=compact on the favorite and like/dislike history lists.
+    """
+
+    RESTAURANT_SUMMARY = {"id", "name", "logo", "city", "favorites_count", "like_count", "dislike_count"}
+    DISH_SUMMARY = {
+        "id", "name", "image", "restaurant", "restaurant_name", "city",
+        "favorites_count", "like_count", "dislike_count",
+    }
+
+    def setUp(self):
+        self.normal_user, _, _ = create_reaction_fixture()
+        for _ in range(3):
+            _, restaurant, dish = create_reaction_fixture()
+            RestaurantPhoto.objects.create(restaurant=restaurant, photo="restaurant_photos/photo.jpg")
+            Favorite.objects.create(user=self.normal_user, restaurant=restaurant)
+            LikeDislike.objects.create(user=self.normal_user, restaurant=restaurant, type="like")
+            DishFavorite.objects.create(user=self.normal_user, dish=dish)
+            DishLikeDislike.objects.create(user=self.normal_user, dish=dish, type="dislike")
+        self.client.force_authenticate(user=self.normal_user)
+
+    def test_compact_history_lists(self):
+        for url, details, summary in (
+            ("/api/favorites/restaurants/", "restaurant_details", self.RESTAURANT_SUMMARY),
+            ("/api/likes-dislikes/restaurants/", "restaurant_details", self.RESTAURANT_SUMMARY),
+            ("/api/favorites/dishes/", "dish_details", self.DISH_SUMMARY),
+            ("/api/likes-dislikes/dishes/", "dish_details", self.DISH_SUMMARY),
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(f"{url}?embed=compact")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.data["results"]), 3)
+            for row in response.data["results"]:
+                self.assertEqual(set(row[details]), summary, url)
+            # The count and one joined page, whatever the history length
+            self.assertEqual(len(queries), 2, url)
+
+    def test_dish_summary_reads_the_restaurant(self):
+        response = self.client.get("/api/favorites/dishes/?embed=compact")
+        row = response.data["results"][0]["dish_details"]
+        dish = Dish.objects.select_related("restaurant").get(pk=row["id"])
+        self.assertEqual((row["restaurant_name"], row["city"]), (dish.restaurant.name, dish.restaurant.city))
+
+    def test_full_details_by_default(self):
+        response = self.client.get("/api/favorites/restaurants/")
+        self.assertIn("photos", response.data["results"][0]["restaurant_details"])
+        self.assertIn("favorite_details", response.data["results"][0]["restaurant_details"])
+
+###############################################################################
+#                                CursorPaginationTests
+###############################################################################
+class CursorPaginationTests(APITestCase):
+    """
+    Tests for the keyset (cursor) pagination of the dish and restaurant lists.
+    """
+
+    def setUp(self):
+        self.normal_user, _, _ = create_reaction_fixture()
+        for _ in range(5):
+            create_reaction_fixture()
+        # Ties on the default ordering, broken by the id
+        for index, restaurant in enumerate(Restaurant.objects.order_by("id")):
+            Restaurant.objects.filter(pk=restaurant.pk).update(weekly_like_count=index // 2)
+        for index, dish in enumerate(Dish.objects.order_by("id")):
+            Dish.objects.filter(pk=dish.pk).update(weekly_like_count=index // 2)
+        self.client.force_authenticate(user=self.normal_user)
+
+    def walk(self, url, **headers):
+        """
+        Follow the next links from `url` and return the ids served and the
+        number of queries of each page.
+        """
+        ids, query_counts = [], []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, headers=headers)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(set(response.data), {"next", "results"})
+            self.assertFalse(any("COUNT(" in query["sql"] for query in queries.captured_queries))
+            ids += [row["id"] for row in response.data["results"]]
+            query_counts.append(len(queries))
+            url = response.data["next"]
+        return ids, query_counts
+
+    def test_pages_follow_the_ordering_without_gaps_or_repeats(self):
+        for url, model, ordering in (
+            ("/api/restaurants/?pagination=cursor&page_size=2", Restaurant, ("-weekly_like_count", "-id")),
+            ("/api/dishes/?pagination=cursor&page_size=2", Dish, ("-weekly_like_count", "-id")),
+            ("/api/dishes/?pagination=cursor&page_size=2&ordering=created_at", Dish, ("created_at", "id")),
+        ):
+            ids, query_counts = self.walk(url)
+            self.assertEqual(ids, list(model.objects.order_by(*ordering).values_list("id", flat=True)), url)
+            # The last page costs what the first one does
+            self.assertEqual(len(set(query_counts)), 1, url)
+
+    def test_rows_moving_between_pages_are_not_repeated(self):
+        response = self.client.get("/api/dishes/?pagination=cursor&page_size=2&fields=id")
+        served = [row["id"] for row in response.data["results"]]
+        # A served dish climbing to the top is not served again
+        Dish.objects.filter(pk=served[-1]).update(weekly_like_count=100)
+        ids, _ = self.walk(response.data["next"])
+        self.assertEqual(len(served + ids), Dish.objects.count())
+        self.assertFalse(set(served) & set(ids))
+
+    def test_next_page_is_bounded_on_the_leading_field(self):
+        response = self.client.get("/api/dishes/?pagination=cursor&page_size=2&fields=id")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(response.data["next"])
+        # weekly_like_count <= x ANDed onto the tie-break OR, so the index can seek to it
+        sql = queries.captured_queries[-1]["sql"]
+        self.assertRegex(sql, r'"weekly_like_count" <= \d+ AND \(')
+
+    def test_mobile_clients_get_cursors_by_default(self):
+        response = self.client.get("/api/restaurants/", headers={"X-Client-Platform": "iOS"})
+        self.assertEqual(set(response.data), {"next", "results"})
+
+        response = self.client.get("/api/restaurants/?pagination=page", headers={"X-Client-Platform": "ios"})
+        self.assertIn("count", response.data)
+        response = self.client.get("/api/restaurants/")
+        self.assertIn("count", response.data)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/dishes/?pagination=cursor&cursor=not-a-cursor")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        # A cursor of another ordering is rejected too
+        response = self.client.get("/api/dishes/?pagination=cursor&page_size=2")
+        cursor = response.data["next"].split("cursor=")[-1].split("&")[0]
+        response = self.client.get(f"/api/dishes/?pagination=cursor&ordering=name&cursor={cursor}")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -25,6 +25,7 @@ from api.views.restaurant import (
     CreateLikeDislikeView,
     UpdateLikeDislikeView,
     DeleteLikeDislikeView,
+    SetLikeDislikeView,
     ListCreateRestaurantPhotoView,
     RetrieveUpdateDestroyRestaurantPhotoView,
 )
@@ -44,6 +45,8 @@ from api.views.dish import (
     CreateDishLikeDislikeView,
     UpdateDishLikeDislikeView,
     DeleteDishLikeDislikeView,
+    SetDishLikeDislikeView,
+    BatchDishLikeDislikeView,
     ListCreateCourseView,
     DeleteCourseView,
     ListCreateCategoryView,
@@ -77,6 +80,7 @@ urlpatterns = [
     path("likes-dislikes/restaurants/create/", CreateLikeDislikeView.as_view(), name="create-like-dislike"),
     path("likes-dislikes/restaurants/<int:pk>/update/", UpdateLikeDislikeView.as_view(), name="update-like-dislike"),
     path("likes-dislikes/restaurants/<int:pk>/delete/", DeleteLikeDislikeView.as_view(), name="delete-like-dislike"),
+    path("likes-dislikes/restaurants/<int:restaurant_id>/set/", SetLikeDislikeView.as_view(), name="set-like-dislike"),
     
     # ---------------- COURSE ENDPOINTS ----------------
     path("courses/", ListCreateCourseView.as_view(), name="list-create-course"),
@@ -103,6 +107,8 @@ urlpatterns = [
     path("likes-dislikes/dishes/create/", CreateDishLikeDislikeView.as_view(), name="create-dish-like-dislike"),
     path("likes-dislikes/dishes/<int:pk>/update/", UpdateDishLikeDislikeView.as_view(), name="update-dish-like-dislike"),
     path("likes-dislikes/dishes/<int:pk>/delete/", DeleteDishLikeDislikeView.as_view(), name="delete-dish-like-dislike"),
+    path("likes-dislikes/dishes/<int:dish_id>/set/", SetDishLikeDislikeView.as_view(), name="set-dish-like-dislike"),
+    path("likes-dislikes/dishes/batch/", BatchDishLikeDislikeView.as_view(), name="batch-dish-like-dislike"),
 ]
 
 
@@ -136,6 +142,8 @@ from api.views.booking import (
     ListCreateBookingView,
     RetrieveUpdateDestroyBookingView,
     AvailableTablesView,
+    AvailabilityCalendarView,
+    ListArchivedBookingView,
     RetrieveUpdateBookingByCodeView,
     BookingTypesDeleteView,
     BookingTypesListCreateView,
@@ -162,6 +170,7 @@ urlpatterns += [
     # ---------------- BOOKING ENDPOINTS ----------------
     path("bookings/", ListCreateBookingView.as_view(), name="list-create-booking"),
     path("bookings/<int:pk>/", RetrieveUpdateDestroyBookingView.as_view(), name="retrieve-update-destroy-booking"),
+    path("bookings/archive/", ListArchivedBookingView.as_view(), name="list-archived-booking"),
     
     # User endpoints (with validation for create)
     path("user/bookings/create/", UserCreateBookingView.as_view(), name="user-create-booking"),
@@ -169,6 +178,7 @@ urlpatterns += [
     
     # ---------------- AVAILABILITY & RETRIEVAL ENDPOINTS ----------------
     path("available-tables/", AvailableTablesView.as_view(), name="available-tables"),
+    path("available-tables/calendar/", AvailabilityCalendarView.as_view(), name="available-tables-calendar"),
     path("retrieve-booking/", RetrieveUpdateBookingByCodeView.as_view(), name="retrieve-update-booking"),
     
     # ---------------- BOOKING TYPE ENDPOINTS ----------------
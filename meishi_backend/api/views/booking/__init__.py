@@ -3,5 +3,5 @@
 from .booking_system_views import ListCreateBookingSystemView, RetrieveUpdateDestroyBookingSystemView, PauseBookingSystemView, ResumeBookingSystemView
 from .general_time_slot_views import ListCreateGeneralTimeSlotView, RetrieveUpdateDestroyGeneralTimeSlotView
 from .time_slot_views import ListCreateTimeSlotView, RetrieveUpdateDestroyTimeSlotView, CustomCreateTimeSlotView
-from .booking_views import ListCreateBookingView, RetrieveUpdateDestroyBookingView, AvailableTablesView, RetrieveUpdateBookingByCodeView, UserCreateBookingView, UserRetrieveUpdateBookingView
+from .booking_views import ListCreateBookingView, RetrieveUpdateDestroyBookingView, AvailableTablesView, AvailabilityCalendarView, ListArchivedBookingView, RetrieveUpdateBookingByCodeView, UserCreateBookingView, UserRetrieveUpdateBookingView
 from .booking_type_views import BookingTypesListCreateView, BookingTypesDeleteView
\ No newline at end of file
@@ -12,6 +12,7 @@ from api.serializers.booking.booking_system_serializer import BookingSystemSeria
 
 class ListCreateBookingSystemView(generics.ListCreateAPIView):
     serializer_class = BookingSystemSerializer
+    query_budget = 1
     permission_classes = [IsAuthenticated, IsRestaurantAccount]
 
     def get_queryset(self):
@@ -12,6 +12,7 @@ class BookingTypesListCreateView(generics.ListCreateAPIView):
     Handles listing and creating booking types for a specific booking system.
     """
     serializer_class = BookingTypeSerializer
+    query_budget = 2
 
     def get_permissions(self):
         if self.request.method == 'POST':
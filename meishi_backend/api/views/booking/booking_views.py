@@ -6,12 +6,21 @@ from rest_framework.response import Response
 from rest_framework import status, generics
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.forms import ValidationError
+from api.serializers.booking.archived_booking_serializer import ArchivedBookingSerializer
 from api.serializers.booking.booking_serializer import BookingSerializer, UserBookingSerializer
+from api.models.booking.archived_booking import ArchivedBooking
 from api.models.booking.booking import Booking
 from api.models.booking.time_slot import TimeSlot
-from api.models.booking.booking_system import BookingSystem
+from api.models.booking.availability import (
+    annotate_lazy_booking_systems,
+    get_available_time_slots,
+    get_availability_calendar,
+)
+from api.models.booking.schedule import materialize_time_slot
 from api.models.restaurant import Restaurant
+from api.pagination import DefaultPagination
 from django.db import transaction
+from rest_framework.exceptions import ValidationError as RequestValidationError
 
 class AvailableTablesView(APIView):
     """
@@ -58,64 +67,97 @@ class AvailableTablesView(APIView):
 
         # Find the restaurant
         try:
-            restaurant = Restaurant.objects.get(id=restaurant_id)
+            restaurant = annotate_lazy_booking_systems(Restaurant.objects.all()).get(id=restaurant_id)
         except Restaurant.DoesNotExist:
             return Response(
                 {"detail": "Restaurant does not exist."},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        # For each BookingSystem of the restaurant, 
-        # fetch all TimeSlot objects for the requested date,
-        # and check if they can accommodate the number of people, 
-        # are open, and not paused.
-        booking_systems = BookingSystem.objects.filter(restaurant=restaurant)
-
-        available_slots = []
-
-        for system in booking_systems:
-            if system.is_paused:
-                continue
-
-            time_slots = TimeSlot.objects.filter(
-                booking_system=system,
-                date=query_date_obj
-            ).order_by('time')
-
-            for ts in time_slots:
-                if not ts.is_open:
-                    continue
-
-                if not (ts.min <= people <= ts.max):
-                    continue
-
-                # Check already-booked people (excluding canceled)
-                total_booked_people = sum(b.people for b in ts.bookings.exclude(status='canceled'))
-                if total_booked_people + people > ts.max_people:
-                    continue
-
-                # Check table capacity
-                if ts.bookings.exclude(status='canceled').count() >= ts.max_tables:
-                    continue
-
-                # If we pass all checks, this slot is available
-                available_slots.append({
-                    "booking_system_id": system.id,
-                    "meal_type": system.meal_type,
-                    "time_slot_id": ts.id,
-                    "time": str(ts.time),
-                    "date": str(ts.date),
-                    "available_people_capacity": ts.max_people - total_booked_people,
-                    "available_table_capacity": ts.max_tables - ts.bookings.exclude(status='canceled').count(),
-                })
+        # Open slots of active booking systems that still fit the party,
+        # with their occupancy aggregated in SQL.
+        available_slots = get_available_time_slots(restaurant, query_date_obj, people)
 
         return Response({"available_times": available_slots}, status=status.HTTP_200_OK)
 
+class AvailabilityCalendarView(APIView):
+    """
+    Returns, for every day of a date range and each meal type, whether
+    there is any bookable time slot and how much capacity is left.
+    
+    Query params:
+      - restaurant_id
+      - start_date (YYYY-MM-DD)
+      - end_date (YYYY-MM-DD)
+      - people (int)
+    """
+
+    permission_classes = [AllowAny]
+    max_days = 62
+
+    def get(self, request):
+        restaurant_id = request.query_params.get('restaurant_id')
+        start_date = request.query_params.get('start_date')
+        end_date = request.query_params.get('end_date')
+        people = request.query_params.get('people')
+
+        # Basic validations
+        if not restaurant_id or not start_date or not end_date or not people:
+            return Response(
+                {"detail": "Missing one of the required query parameters: restaurant_id, start_date, end_date, people."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Check if dates are valid
+        try:
+            start_date_obj = datetime.strptime(start_date, "%Y-%m-%d").date()
+            end_date_obj = datetime.strptime(end_date, "%Y-%m-%d").date()
+        except ValueError:
+            return Response(
+                {"detail": "Invalid date format. Please use YYYY-MM-DD."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if start_date_obj > end_date_obj:
+            return Response(
+                {"detail": "start_date must be on or before end_date."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if (end_date_obj - start_date_obj).days >= self.max_days:
+            return Response(
+                {"detail": f"The date range cannot exceed {self.max_days} days."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Check if integer for people
+        try:
+            people = int(people)
+        except ValueError:
+            return Response(
+                {"detail": "'people' must be an integer."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Find the restaurant
+        try:
+            restaurant = annotate_lazy_booking_systems(Restaurant.objects.all()).get(id=restaurant_id)
+        except Restaurant.DoesNotExist:
+            return Response(
+                {"detail": "Restaurant does not exist."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        days = get_availability_calendar(restaurant, start_date_obj, end_date_obj, people)
+
+        return Response({"days": days}, status=status.HTTP_200_OK)
+
 class ListCreateBookingView(generics.ListCreateAPIView):
     """
     List all bookings (for restaurant-owner usage) or create a new booking.
     """
     serializer_class = BookingSerializer
+    query_budget = 1
 
     def get_permissions(self):
         if self.request.method == 'GET':
@@ -125,7 +167,7 @@ class ListCreateBookingView(generics.ListCreateAPIView):
     def get_queryset(self):
         queryset = Booking.objects.filter(
             time_slot__booking_system__restaurant__owner=self.request.user
-        )
+        ).select_related('time_slot')
         
         date_filter = self.request.query_params.get('date')
         if not date_filter:
@@ -155,11 +197,13 @@ class ListCreateBookingView(generics.ListCreateAPIView):
         
     def perform_create(self, serializer):
         with transaction.atomic():
-            time_slot_id = self.request.data.get('time_slot')
-            if not time_slot_id:
+            time_slot = serializer.validated_data.get('time_slot')
+            if not time_slot:
                 raise ValidationError({"detail": "time_slot field is required."})
 
-            time_slot = TimeSlot.objects.filter(id=time_slot_id).select_for_update().first()
+            # Virtual time slots of lazy booking systems are stored on their first booking
+            time_slot = materialize_time_slot(time_slot)
+            time_slot = TimeSlot.objects.filter(id=time_slot.id).select_for_update().first()
             if not time_slot:
                 raise ValidationError({"detail": "Invalid time slot ID."})
 
@@ -169,6 +213,45 @@ class ListCreateBookingView(generics.ListCreateAPIView):
             instance.clean()  # Call clean() to apply all validations
             instance.save()
 
+class ListArchivedBookingView(generics.ListAPIView):
+    """
+    List the archived (past) bookings of the restaurant owner's restaurants.
+    
+    Query params (all optional):
+      - restaurant_id
+      - start_date (YYYY-MM-DD)
+      - end_date (YYYY-MM-DD)
+      - status
+    """
+    serializer_class = ArchivedBookingSerializer
+    query_budget = 2
+    permission_classes = [IsAuthenticated]
+    pagination_class = DefaultPagination
+
+    def get_queryset(self):
+        queryset = ArchivedBooking.objects.filter(restaurant__owner=self.request.user)
+
+        restaurant_id = self.request.query_params.get('restaurant_id')
+        if restaurant_id:
+            try:
+                queryset = queryset.filter(restaurant_id=int(restaurant_id))
+            except ValueError:
+                raise RequestValidationError({"detail": "Invalid restaurant ID. Expected an integer."})
+
+        for param, lookup in (('start_date', 'date__gte'), ('end_date', 'date__lte')):
+            value = self.request.query_params.get(param)
+            if value:
+                try:
+                    queryset = queryset.filter(**{lookup: datetime.strptime(value, "%Y-%m-%d").date()})
+                except ValueError:
+                    raise RequestValidationError({"detail": "Invalid date format. Expected YYYY-MM-DD."})
+
+        status_filter = self.request.query_params.get('status')
+        if status_filter:
+            queryset = queryset.filter(status=status_filter)
+
+        return queryset.order_by('-date', '-time', '-booking_id')
+
 class UserCreateBookingView(generics.CreateAPIView):
     """
     Create a new booking.
@@ -177,19 +260,12 @@ class UserCreateBookingView(generics.CreateAPIView):
     permission_classes = [AllowAny]
 
     def perform_create(self, serializer):
+        # Capacity is reserved by the serializer with a guarded UPDATE on the
+        # time slot, so no row lock is held while the request is validated.
         with transaction.atomic():
-            time_slot_id = self.request.data.get('time_slot')
-            if not time_slot_id:
-                raise ValidationError({"detail": "time_slot field is required."})
-
-            time_slot = TimeSlot.objects.filter(id=time_slot_id).select_for_update().first()
-            if not time_slot:
-                raise ValidationError({"detail": "Invalid time slot ID."})
-
             user = self.request.user if self.request.user.is_authenticated else None
-            instance = serializer.save(time_slot=time_slot, user=user)
+            instance = serializer.save(user=user)
             instance.clean()  # Call clean() to apply all validations
-            instance.save()
 
 class RetrieveUpdateDestroyBookingView(generics.RetrieveUpdateDestroyAPIView):
     """
@@ -239,6 +315,9 @@ class UserRetrieveUpdateBookingView(generics.RetrieveUpdateAPIView):
     def get_queryset(self):
         return Booking.objects.filter(user=self.request.user)
 
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'guard_capacity': True}
+
     def update(self, request, *args, **kwargs):
         with transaction.atomic():
             booking = self.get_object()
@@ -309,7 +388,9 @@ class RetrieveUpdateBookingByCodeView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        serializer = BookingSerializer(booking, data=request.data, partial=True)
+        serializer = BookingSerializer(
+            booking, data=request.data, partial=True, context={'guard_capacity': True}
+        )
         if serializer.is_valid():
             updated_booking = serializer.save()
             updated_booking.clean()  # Call clean() to apply all validations
@@ -10,6 +10,7 @@ from api.models.booking.booking_system import BookingSystem
 
 class ListCreateGeneralTimeSlotView(generics.ListCreateAPIView):
     serializer_class = GeneralTimeSlotSerializer
+    query_budget = 1
     permission_classes = [IsAuthenticated, IsRestaurantAccount]
 
     def get_queryset(self):
@@ -7,11 +7,13 @@ from rest_framework.permissions import IsAuthenticated
 from django.core.exceptions import ValidationError
 from api.models.booking.time_slot import TimeSlot
 from api.models.booking.booking_system import BookingSystem
+from api.models.booking.schedule import get_virtual_time_slots
 from api.serializers.booking.time_slot_serializer import TimeSlotSerializer
 from api.permissions import IsRestaurantAccount
 
 class ListCreateTimeSlotView(generics.ListCreateAPIView):
     serializer_class = TimeSlotSerializer
+    query_budget = 2
     permission_classes = [IsAuthenticated, IsRestaurantAccount]
     
     def get_queryset(self):
@@ -49,6 +51,43 @@ class ListCreateTimeSlotView(generics.ListCreateAPIView):
 
         return queryset.order_by('time')
 
+    def get_lazy_booking_systems(self):
+        """
+        Lazy booking systems matching the listing's restaurant and booking system filters.
+        """
+        booking_systems = BookingSystem.objects.filter(
+            restaurant__owner=self.request.user,
+            lazy_time_slots=True,
+        )
+        restaurant_id = self.request.query_params.get('restaurant_id')
+        if restaurant_id:
+            booking_systems = booking_systems.filter(restaurant_id=int(restaurant_id))
+        booking_system_param = self.request.query_params.get('booking_system')
+        if booking_system_param:
+            booking_systems = booking_systems.filter(id=int(booking_system_param))
+        return list(booking_systems)
+
+    def list(self, request, *args, **kwargs):
+        """
+        For a single date, the virtual time slots of lazy booking systems are
+        computed from their GeneralTimeSlots and listed with a null id.
+        """
+        # Validates the query parameters
+        queryset = self.get_queryset()
+        date_param = request.query_params.get('date')
+        lazy_booking_systems = self.get_lazy_booking_systems() if date_param else []
+        if not lazy_booking_systems:
+            return super().list(request, *args, **kwargs)
+
+        date_obj = datetime.strptime(date_param, '%Y-%m-%d').date()
+        timeslots = [
+            *queryset.exclude(booking_system__in=lazy_booking_systems),
+            *get_virtual_time_slots(lazy_booking_systems, date_obj, date_obj),
+        ]
+        timeslots.sort(key=lambda ts: ts.time)
+        serializer = self.get_serializer(timeslots, many=True)
+        return Response(serializer.data)
+
     def perform_create(self, serializer):
         booking_system_id = self.request.data.get('booking_system')
         if not booking_system_id:
@@ -10,7 +10,9 @@ from .like_dislike_views import (
     DeleteDishLikeDislikeView, 
     ListDishLikeDislikeView, 
     UpdateDishLikeDislikeView, 
-    SpecificListDishLikeDislikeView
+    SpecificListDishLikeDislikeView,
+    SetDishLikeDislikeView,
+    BatchDishLikeDislikeView,
 )
 from .category_views import (
     ListCreateCategoryView, 
@@ -9,6 +9,7 @@ from api.permissions import IsSuperUser
 class ListCreateCategoryView(generics.ListCreateAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    query_budget = 1
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get_permissions(self):
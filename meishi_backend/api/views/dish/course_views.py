@@ -9,6 +9,7 @@ from api.permissions import IsSuperUser
 class ListCreateCourseView(generics.ListCreateAPIView):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
+    query_budget = 1
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get_permissions(self):
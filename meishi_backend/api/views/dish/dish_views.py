@@ -7,13 +7,14 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.exceptions import PermissionDenied
 from api.models.dish import Dish
 from api.serializers.dish import DishSerializer
-from api.pagination import DefaultPagination
+from api.pagination import ListingPagination
 from api.permissions import IsRestaurantAccount
 
 class ListDishView(generics.ListAPIView):
     serializer_class = DishSerializer
+    query_budget = 5
     permission_classes = [AllowAny]
-    pagination_class = DefaultPagination
+    pagination_class = ListingPagination
     filter_backends = [SearchFilter, DjangoFilterBackend, OrderingFilter]
     search_fields = [
         'name',
@@ -28,21 +29,26 @@ class ListDishView(generics.ListAPIView):
         "restaurant__country",  
         "restaurant__city",    
         "restaurant__state",]
-    ordering_fields = ["name", "created_at", "like_count", "dislike_count", "favorites_count"]
+    ordering_fields = [
+        "name", "created_at", "like_count", "dislike_count", "favorites_count",
+        "daily_like_count", "weekly_like_count", "monthly_like_count", "trending_score",
+        "wilson_score",
+    ]
     ordering = ["-weekly_like_count"]  # Default ordering
 
     def get_queryset(self):
         user = self.request.user
         # If the user is a restaurant, show only their dishes
         if user.user_type == 'restaurant':
-            return Dish.objects.filter(restaurant__owner=user).prefetch_related("categories", "restaurant", "course")
+            return DishSerializer.shape_queryset(Dish.objects.filter(restaurant__owner=user), self.request)
         # Otherwise, show all dishes
-        return Dish.objects.all().prefetch_related("categories", "restaurant", "course")
+        return DishSerializer.shape_queryset(Dish.objects.all(), self.request)
 
 class GetRestaurantDishView(generics.ListAPIView):
     serializer_class = DishSerializer
+    query_budget = 5
     permission_classes = [AllowAny]
-    pagination_class = DefaultPagination
+    pagination_class = ListingPagination
     filter_backends = [DjangoFilterBackend, OrderingFilter]
 
     # Example filter and ordering fields (reuse or adjust as needed)
@@ -58,7 +64,7 @@ class GetRestaurantDishView(generics.ListAPIView):
         if user.user_type == 'restaurant' and not user.restaurants.filter(pk=restaurant_id).exists():
             raise PermissionDenied({"detail": "You are not allowed to view dishes for this restaurant or restaurant does not exist."})
 
-        return Dish.objects.filter(restaurant_id=restaurant_id).prefetch_related("categories", "restaurant", "course")
+        return DishSerializer.shape_queryset(Dish.objects.filter(restaurant_id=restaurant_id), self.request)
 
 class GetDishView(generics.RetrieveAPIView):
     serializer_class = DishSerializer
@@ -68,8 +74,8 @@ class GetDishView(generics.RetrieveAPIView):
         user = self.request.user
         # If user is a restaurant, they can only retrieve their own dishes
         if user.user_type == 'restaurant':
-            return Dish.objects.filter(restaurant__owner=user)
-        return Dish.objects.all()
+            return DishSerializer.shape_queryset(Dish.objects.filter(restaurant__owner=user), self.request)
+        return DishSerializer.shape_queryset(Dish.objects.all(), self.request)
 
 class CreateDishView(generics.CreateAPIView):
     serializer_class = DishSerializer
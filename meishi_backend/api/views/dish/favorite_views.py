@@ -2,21 +2,27 @@ from django.shortcuts import get_object_or_404
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
+from api.counters import adjust_counts, reaction_day
 from api.models.dish import DishFavorite
 from api.serializers.dish import DishFavoriteSerializer
 from api.pagination import DefaultPagination
+from api.serializers.dynamic_fields import is_compact
 from api.permissions import IsNormalUser
 from api.models import CustomUser
 from rest_framework.exceptions import PermissionDenied
 
 class ListDishFavoriteView(generics.ListAPIView):
     serializer_class = DishFavoriteSerializer
+    query_budget = 5
     permission_classes = [IsAuthenticated, IsNormalUser]
     pagination_class = DefaultPagination
     ordering = ["-created_at"]
 
     def get_queryset(self):
-        return DishFavorite.objects.filter(user=self.request.user).select_related('dish', 'user')
+        queryset = DishFavorite.objects.filter(user=self.request.user)
+        if is_compact(self.request):
+            return queryset.select_related('dish__restaurant')
+        return queryset.select_related('dish__restaurant', 'dish__course').prefetch_related('dish__categories')
 
 class CreateDishFavoriteView(generics.CreateAPIView):
     serializer_class = DishFavoriteSerializer
@@ -25,8 +31,8 @@ class CreateDishFavoriteView(generics.CreateAPIView):
     def perform_create(self, serializer):
         # Since `IsNormalUser` ensures only normal users reach here, no need to check user type
         dish = serializer.validated_data['dish']
-        serializer.save(user=self.request.user)
-        dish.increment_favorites_count()
+        instance = serializer.save(user=self.request.user)
+        adjust_counts(dish, reaction_day(instance), favorites_count=1)
 
 class DeleteDishFavoriteView(generics.DestroyAPIView):
     serializer_class = DishFavoriteSerializer
@@ -39,4 +45,4 @@ class DeleteDishFavoriteView(generics.DestroyAPIView):
     def perform_destroy(self, instance):
         dish = instance.dish
         super().perform_destroy(instance)
-        dish.decrement_favorites_count()
\ No newline at end of file
+        adjust_counts(dish, reaction_day(instance), favorites_count=-1)
\ No newline at end of file
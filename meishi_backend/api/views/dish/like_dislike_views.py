@@ -1,17 +1,28 @@
 # api/views/dish/like_dislike_views.py
 
+from django.db import transaction
 from django.shortcuts import get_object_or_404
-from rest_framework import generics
+from rest_framework import generics, status
+from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from api.models.dish import DishLikeDislike, Dish
-from api.serializers.dish import DishLikeDislikeSerializer, SpecificDishLikeDislikeSerializer
+from api.serializers.dish import (
+    DishLikeDislikeSerializer,
+    DishReactionBatchSerializer,
+    SetDishLikeDislikeSerializer,
+    SpecificDishLikeDislikeSerializer,
+)
 from api.pagination import DefaultPagination
+from api.serializers.dynamic_fields import is_compact
 from api.permissions import IsNormalUser
 from api.models.user import CustomUser
 from rest_framework.exceptions import PermissionDenied
+from api.counters import adjust_counts, reaction_day, reaction_deltas
+from api.reactions import NOT_FOUND, lock_user_reactions, set_reactions
 
 class SpecificListDishLikeDislikeView(generics.ListAPIView):
     serializer_class = SpecificDishLikeDislikeSerializer
+    query_budget = 2
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -21,63 +32,64 @@ class SpecificListDishLikeDislikeView(generics.ListAPIView):
 
 class ListDishLikeDislikeView(generics.ListAPIView):
     serializer_class = DishLikeDislikeSerializer
+    query_budget = 5
     permission_classes = [IsAuthenticated, IsNormalUser]
     pagination_class = DefaultPagination
     ordering = ["-created_at"]
 
     def get_queryset(self):
-        return DishLikeDislike.objects.filter(user=self.request.user).select_related('dish', 'user')
+        queryset = DishLikeDislike.objects.filter(user=self.request.user)
+        if is_compact(self.request):
+            return queryset.select_related('dish__restaurant')
+        return queryset.select_related('dish__restaurant', 'dish__course').prefetch_related('dish__categories')
 
 class CreateDishLikeDislikeView(generics.CreateAPIView):
     serializer_class = DishLikeDislikeSerializer
     permission_classes = [IsAuthenticated, IsNormalUser] 
 
+    def create(self, request, *args, **kwargs):
+        # Validated and written under the user's lock, like set_reactions
+        with transaction.atomic():
+            lock_user_reactions(request.user)
+            return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         user = self.request.user
         dish = serializer.validated_data['dish']
         instance = serializer.save(user=user)
-        
-        if instance.type == 'like':
-            dish.increment_like_count()
-        elif instance.type == 'dislike':
-            dish.increment_dislike_count()
+        adjust_counts(dish, reaction_day(instance), **reaction_deltas(new_type=instance.type))
                 
 class UpdateDishLikeDislikeView(generics.RetrieveUpdateAPIView):
     serializer_class = DishLikeDislikeSerializer
     permission_classes = [IsAuthenticated, IsNormalUser] 
 
+    def update(self, request, *args, **kwargs):
+        # Read, validated and saved under the user's lock, like set_reactions
+        with transaction.atomic():
+            lock_user_reactions(request.user)
+            return super().update(request, *args, **kwargs)
+
     def get_queryset(self):
         return DishLikeDislike.objects.filter(user=self.request.user)
     
     def perform_update(self, serializer):
         # Capture the old type before saving
-        old_instance = self.get_object()
-        old_type = old_instance.type
+        old_type = serializer.instance.type
 
         instance = serializer.save()  # new data
-        new_type = instance.type
-        dish = instance.dish
-        
-        # If type didn't change, do nothing
-        if old_type == new_type:
-            return
-
-        # Decrement old type counters
-        if old_type == 'like':
-            dish.decrement_like_count()
-        elif old_type == 'dislike':
-            dish.decrement_dislike_count()
-
-        # Increment new type counters
-        if new_type == 'like':
-            dish.increment_like_count()
-        elif new_type == 'dislike':
-            dish.increment_dislike_count()
+        # Move the reaction between counters (nothing to do if the type didn't change)
+        adjust_counts(instance.dish, reaction_day(instance), **reaction_deltas(old_type, instance.type))
 
 class DeleteDishLikeDislikeView(generics.DestroyAPIView):
     serializer_class = DishLikeDislikeSerializer
     permission_classes = [IsAuthenticated, IsNormalUser] 
 
+    def destroy(self, request, *args, **kwargs):
+        # Read and deleted under the user's lock, like set_reactions
+        with transaction.atomic():
+            lock_user_reactions(request.user)
+            return super().destroy(request, *args, **kwargs)
+
     def get_queryset(self):
         # User can delete only their own like/dislike
         return DishLikeDislike.objects.filter(user=self.request.user)
@@ -85,11 +97,38 @@ class DeleteDishLikeDislikeView(generics.DestroyAPIView):
     def perform_destroy(self, instance):
         dish = instance.dish
         
-        if instance.type == 'like':
-            dish.decrement_like_count()
-        elif instance.type == 'dislike':
-            dish.decrement_dislike_count()
-        
+        adjust_counts(dish, reaction_day(instance), **reaction_deltas(old_type=instance.type))
         super().perform_destroy(instance)
 
+class SetDishLikeDislikeView(generics.GenericAPIView):
+    """
+    Set the user's reaction to a dish to like, dislike or none (null) in one
+    idempotent request, whatever the current reaction is.
+    """
+    serializer_class = SetDishLikeDislikeSerializer
+    permission_classes = [IsAuthenticated, IsNormalUser]
+
+    def put(self, request, dish_id):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = set_reactions(request.user, 'dish', {dish_id: serializer.validated_data['type']})[0]
+        if result['status'] == NOT_FOUND:
+            return Response({"detail": "Dish not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(result)
+
+class BatchDishLikeDislikeView(generics.GenericAPIView):
+    """
+    Set the user's reactions to several dishes at once (e.g. rating a meal).
+    The dishes are looked up with one query and the reactions and counters
+    written in bulk; the response reports the outcome of every item.
+    """
+    serializer_class = DishReactionBatchSerializer
+    permission_classes = [IsAuthenticated, IsNormalUser]
 
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = set_reactions(request.user, 'dish', {
+            reaction['dish']: reaction['type'] for reaction in serializer.validated_data['reactions']
+        })
+        return Response({"results": results})
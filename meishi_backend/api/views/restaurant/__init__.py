@@ -22,6 +22,7 @@ from .like_dislike_views import (
     DeleteLikeDislikeView, 
     ListLikeDislikeView, 
     UpdateLikeDislikeView, 
+    SetLikeDislikeView,
 )
 from .restaurant_photo_views import (
     ListCreateRestaurantPhotoView, 
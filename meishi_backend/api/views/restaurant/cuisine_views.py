@@ -9,6 +9,7 @@ from rest_framework.permissions import IsAuthenticatedOrReadOnly
 class ListCreateCuisineView(generics.ListCreateAPIView):
     queryset = Cuisine.objects.all()
     serializer_class = CuisineSerializer
+    query_budget = 1
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get_permissions(self):
@@ -6,18 +6,24 @@ from rest_framework.permissions import IsAuthenticated
 from api.models.restaurant import Favorite
 from api.serializers.restaurant import FavoriteSerializer
 from api.pagination import DefaultPagination
+from api.serializers.dynamic_fields import is_compact
 from api.permissions import IsNormalUser
 from api.models import CustomUser
 from rest_framework.exceptions import PermissionDenied
+from api.counters import adjust_counts, reaction_day
 
 class ListFavoriteView(generics.ListAPIView):
     serializer_class = FavoriteSerializer
+    query_budget = 5
     permission_classes = [IsAuthenticated, IsNormalUser]
     pagination_class = DefaultPagination  
     ordering = ["-created_at"]
 
     def get_queryset(self):
-        return Favorite.objects.filter(user=self.request.user).select_related('restaurant', 'user')
+        queryset = Favorite.objects.filter(user=self.request.user)
+        if is_compact(self.request):
+            return queryset.select_related('restaurant')
+        return queryset.select_related('restaurant__cuisine').prefetch_related('restaurant__photos')
     
 class CreateFavoriteView(generics.CreateAPIView):
     serializer_class = FavoriteSerializer
@@ -26,8 +32,8 @@ class CreateFavoriteView(generics.CreateAPIView):
     def perform_create(self, serializer):
         # Since `IsNormalUser` ensures only normal users reach here, no need to check user type
         restaurant = serializer.validated_data['restaurant']
-        serializer.save(user=self.request.user)
-        restaurant.increment_favorites_count()
+        instance = serializer.save(user=self.request.user)
+        adjust_counts(restaurant, reaction_day(instance), favorites_count=1)
 
 class DeleteFavoriteView(generics.DestroyAPIView):
     serializer_class = FavoriteSerializer
@@ -39,4 +45,4 @@ class DeleteFavoriteView(generics.DestroyAPIView):
     def perform_destroy(self, instance):
         restaurant = instance.restaurant  # Access the associated restaurant
         super().perform_destroy(instance)  # Perform the deletion
-        restaurant.decrement_favorites_count()  # Update the favorites count after deletion
\ No newline at end of file
+        adjust_counts(restaurant, reaction_day(instance), favorites_count=-1)  # Update the favorites count after deletion
\ No newline at end of file
@@ -1,18 +1,28 @@
 # api/models/views/restaurant/like_dislike_views.py
 
+from django.db import transaction
 from django.shortcuts import get_object_or_404
-from rest_framework import generics
+from rest_framework import generics, status
+from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from api.models.restaurant import LikeDislike
-from api.serializers.restaurant import LikeDislikeSerializer, SpecificLikeDislikeSerializer
+from api.serializers.restaurant import (
+    LikeDislikeSerializer,
+    SetLikeDislikeSerializer,
+    SpecificLikeDislikeSerializer,
+)
 from api.pagination import DefaultPagination
+from api.serializers.dynamic_fields import is_compact
 from api.permissions import IsNormalUser
 from api.models import CustomUser
 from api.models.restaurant import Restaurant
 from rest_framework.exceptions import PermissionDenied
+from api.counters import adjust_counts, reaction_day, reaction_deltas
+from api.reactions import NOT_FOUND, lock_user_reactions, set_reactions
 
 class SpecificListLikeDislikeView(generics.ListAPIView):
     serializer_class = SpecificLikeDislikeSerializer
+    query_budget = 2
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -22,66 +32,67 @@ class SpecificListLikeDislikeView(generics.ListAPIView):
     
 class ListLikeDislikeView(generics.ListAPIView):
     serializer_class = LikeDislikeSerializer
+    query_budget = 5
     permission_classes = [IsAuthenticated, IsNormalUser]
     pagination_class = DefaultPagination
     ordering = ["-created_at"]  # Default ordering by most recent
 
     def get_queryset(self):
         user = self.request.user
-        return LikeDislike.objects.filter(user=self.request.user).select_related('restaurant', 'user')
+        queryset = LikeDislike.objects.filter(user=self.request.user)
+        if is_compact(self.request):
+            return queryset.select_related('restaurant')
+        return queryset.select_related('restaurant__cuisine').prefetch_related('restaurant__photos')
 
 class CreateLikeDislikeView(generics.CreateAPIView):
     serializer_class = LikeDislikeSerializer
     permission_classes = [IsAuthenticated, IsNormalUser]
 
+    def create(self, request, *args, **kwargs):
+        # Validated and written under the user's lock, like set_reactions
+        with transaction.atomic():
+            lock_user_reactions(request.user)
+            return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         user = self.request.user
         # Permission ensures only normal users can create
         restaurant = serializer.validated_data['restaurant']
         instance = serializer.save(user=user)
-        
-        if instance.type == 'like':
-            restaurant.increment_like_count()
-        elif instance.type == 'dislike':
-            restaurant.increment_dislike_count()
+        adjust_counts(restaurant, reaction_day(instance), **reaction_deltas(new_type=instance.type))
 
 class UpdateLikeDislikeView(generics.RetrieveUpdateAPIView):
     serializer_class = LikeDislikeSerializer
     permission_classes = [IsAuthenticated, IsNormalUser]
 
+    def update(self, request, *args, **kwargs):
+        # Read, validated and saved under the user's lock, like set_reactions
+        with transaction.atomic():
+            lock_user_reactions(request.user)
+            return super().update(request, *args, **kwargs)
+
     def get_queryset(self):
         # Restricted to likes/dislikes of the authenticated user
         return LikeDislike.objects.filter(user=self.request.user)
     
     def perform_update(self, serializer):
         # Capture the old type before saving
-        old_instance = self.get_object()
-        old_type = old_instance.type
+        old_type = serializer.instance.type
 
         instance = serializer.save()  # new data
-        new_type = instance.type
-        restaurant = instance.restaurant
-        
-        # If type didn't change, do nothing
-        if old_type == new_type:
-            return
-
-        # Decrement old type counters
-        if old_type == 'like':
-            restaurant.decrement_like_count()
-        elif old_type == 'dislike':
-            restaurant.decrement_dislike_count()
-
-        # Increment new type counters
-        if new_type == 'like':
-            restaurant.increment_like_count()
-        elif new_type == 'dislike':
-            restaurant.increment_dislike_count()  
+        # Move the reaction between counters (nothing to do if the type didn't change)
+        adjust_counts(instance.restaurant, reaction_day(instance), **reaction_deltas(old_type, instance.type))
 
 class DeleteLikeDislikeView(generics.DestroyAPIView):
     serializer_class = LikeDislikeSerializer
     permission_classes = [IsAuthenticated, IsNormalUser]
 
+    def destroy(self, request, *args, **kwargs):
+        # Read and deleted under the user's lock, like set_reactions
+        with transaction.atomic():
+            lock_user_reactions(request.user)
+            return super().destroy(request, *args, **kwargs)
+
     def get_queryset(self):
         # Restricted to likes/dislikes of the authenticated user
         return LikeDislike.objects.filter(user=self.request.user)
@@ -89,10 +100,21 @@ class DeleteLikeDislikeView(generics.DestroyAPIView):
     def perform_destroy(self, instance):
         restaurant = instance.restaurant  # Access the associated restaurant
         
-        if instance.type == 'like':
-            restaurant.decrement_like_count()
-        elif instance.type == 'dislike':
-            restaurant.decrement_dislike_count()
-        
+        adjust_counts(restaurant, reaction_day(instance), **reaction_deltas(old_type=instance.type))
         super().perform_destroy(instance)  # Perform the deletion
-        
+
+class SetLikeDislikeView(generics.GenericAPIView):
+    """
+    Set the user's reaction to a restaurant to like, dislike or none (null)
+    in one idempotent request, whatever the current reaction is.
+    """
+    serializer_class = SetLikeDislikeSerializer
+    permission_classes = [IsAuthenticated, IsNormalUser]
+
+    def put(self, request, restaurant_id):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = set_reactions(request.user, 'restaurant', {restaurant_id: serializer.validated_data['type']})[0]
+        if result['status'] == NOT_FOUND:
+            return Response({"detail": "Restaurant not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(result)
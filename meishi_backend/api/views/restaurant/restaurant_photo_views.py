@@ -13,6 +13,7 @@ class ListCreateRestaurantPhotoView(generics.ListCreateAPIView):
     POST: Create a new photo for a restaurant (if < 20 photos exist).
     """
     serializer_class = RestaurantPhotoSerializer
+    query_budget = 1
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
@@ -7,12 +7,14 @@ from api.serializers.restaurant import RestaurantSerializer
 from api.permissions import IsRestaurantAccount
 from rest_framework.filters import OrderingFilter, SearchFilter
 from django_filters.rest_framework import DjangoFilterBackend
-from api.pagination import DefaultPagination
+from api.pagination import ListingPagination
 
 class ListRestaurantView(generics.ListAPIView):
     serializer_class = RestaurantSerializer
+    # Queries of a listed page, whatever its size (see QueryBudgetTests)
+    query_budget = 5
     permission_classes = [AllowAny]
-    pagination_class = DefaultPagination  
+    pagination_class = ListingPagination  
     filter_backends = [SearchFilter, DjangoFilterBackend, OrderingFilter]
     search_fields = [
         'name',
@@ -24,13 +26,17 @@ class ListRestaurantView(generics.ListAPIView):
         'cuisine__name', 
     ]
     filterset_fields = ["name", "country", "state", "city", "cuisine"]
-    ordering_fields = ["name", "created_at", "like_count", "dislike_count", "favorites_count"]
+    ordering_fields = [
+        "name", "created_at", "like_count", "dislike_count", "favorites_count",
+        "daily_like_count", "weekly_like_count", "monthly_like_count", "trending_score",
+        "wilson_score",
+    ]
     ordering = ["-weekly_like_count"]  # Default ordering
 
     def get_queryset(self):
         if self.request.user.user_type == 'restaurant':
-            return Restaurant.objects.filter(owner=self.request.user).select_related('cuisine', 'owner')
-        return Restaurant.objects.all().select_related('cuisine', 'owner')
+            return RestaurantSerializer.shape_queryset(Restaurant.objects.filter(owner=self.request.user), self.request)
+        return RestaurantSerializer.shape_queryset(Restaurant.objects.all(), self.request)
 
 class GetRestaurantView(generics.RetrieveAPIView):
     serializer_class = RestaurantSerializer
@@ -38,8 +44,8 @@ class GetRestaurantView(generics.RetrieveAPIView):
 
     def get_queryset(self):
         if self.request.user.user_type == 'restaurant':
-            return Restaurant.objects.filter(owner=self.request.user)
-        return Restaurant.objects.all()
+            return RestaurantSerializer.shape_queryset(Restaurant.objects.filter(owner=self.request.user), self.request)
+        return RestaurantSerializer.shape_queryset(Restaurant.objects.all(), self.request)
 
 class CreateRestaurantView(generics.CreateAPIView):
     serializer_class = RestaurantSerializer
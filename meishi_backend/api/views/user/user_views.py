@@ -1,11 +1,15 @@
+from django.conf import settings
+from django.db import transaction
 from django.forms import ValidationError
 from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied 
+from api.counters import count_user_reactions
 from api.models.user.user import CustomUser
 from api.permissions import IsNormalUser
+from api.tasks import delete_user
 from api.serializers.user import (
     UserRegistrationSerializer,
     UserPublicSerializer,
@@ -20,7 +24,7 @@ class ListUsersView(generics.ListAPIView):
     Example usage:
         GET /api/users/?search=john
     """
-    queryset = CustomUser.objects.all()
+    queryset = CustomUser.objects.filter(deletion_pending=False)
     serializer_class = UserPublicSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = DefaultPagination
@@ -64,6 +68,12 @@ class UpdateUserView(generics.RetrieveUpdateAPIView):
 class DeleteUserView(generics.DestroyAPIView):
     """
     Delete an existing user (self only).
+
+    Accounts with more than USER_DELETION_ASYNC_THRESHOLD reactions and
+    favorites are deactivated and marked deletion_pending, and the delete_user
+    task removes them in the background; the response is then 202 Accepted.
+    The delete_pending_users task queues the deletion again for accounts
+    left pending.
     """
     queryset = CustomUser.objects.all()
     serializer_class = UserRegistrationSerializer
@@ -72,6 +82,18 @@ class DeleteUserView(generics.DestroyAPIView):
     def get_object(self):
         return self.request.user
 
+    def destroy(self, request, *args, **kwargs):
+        user = self.get_object()
+        threshold = getattr(settings, 'USER_DELETION_ASYNC_THRESHOLD', 500)
+        if count_user_reactions(user) <= threshold:
+            return super().destroy(request, *args, **kwargs)
+
+        with transaction.atomic():
+            CustomUser.objects.filter(pk=user.pk).update(deletion_pending=True, is_active=False)
+            # Queued once the flag is committed; if queuing fails, delete_pending_users retries
+            transaction.on_commit(lambda: delete_user.delay(user.pk), robust=True)
+        return Response({"detail": "Account deletion is pending."}, status=status.HTTP_202_ACCEPTED)
+
 # --------------------- USER PROFILE --------------------- #
 
 class UserProfileView(generics.RetrieveAPIView):
@@ -79,6 +101,6 @@ class UserProfileView(generics.RetrieveAPIView):
     Retrieve another user's profile by their ID (pk).
     Returns minimal fields in the response.
     """
-    queryset = CustomUser.objects.all()
+    queryset = CustomUser.objects.filter(deletion_pending=False)
     serializer_class = UserPublicSerializer
     permission_classes = [IsAuthenticated]
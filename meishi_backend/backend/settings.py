@@ -14,6 +14,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 from datetime import timedelta
+from celery.schedules import crontab
 from dotenv import load_dotenv
 import os
 
@@ -183,6 +184,69 @@ CELERY_BROKER_URL = 'redis://localhost:6379/0'  # Redis URL
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 
+# Number of days ahead for which TimeSlots are generated from GeneralTimeSlots
+TIME_SLOT_HORIZON_DAYS = 30
+# Booking systems handled by each task of the daily TimeSlot generation job
+TIME_SLOT_GENERATION_CHUNK_SIZE = 500
+# Bookings older than this many days are moved to the archive by the retention job
+BOOKING_RETENTION_DAYS = 180
+# TimeSlots handled per chunk (and transaction) by the retention job
+RETENTION_BATCH_SIZE = 1000
+# The retention job runs daily at this hour, off peak
+BOOKING_RETENTION_HOUR = 3
+
+# Reaction counters (likes, dislikes, favorites): 'direct' applies each change
+# with one UPDATE, 'buffered' collects deltas in the REACTION_COUNTER_CACHE cache
+# and writes them in batches every REACTION_COUNTER_FLUSH_SECONDS. The buffered
+# backend needs a cache shared by all processes (e.g. Redis) in production.
+# 'sharded' spreads deltas over REACTION_COUNTER_SHARDS rows per entity and day,
+# folded into the counters on the same schedule.
+REACTION_COUNTER_BACKEND = 'direct'
+REACTION_COUNTER_CACHE = 'default'
+REACTION_COUNTER_SHARDS = 8
+REACTION_COUNTER_FLUSH_SECONDS = 10
+REACTION_COUNTER_FLUSH_BATCH_SIZE = 1000
+# A flush waits this long for the dirty marker of a sequence number taken by
+# a writer before skipping it
+REACTION_COUNTER_MARKER_GRACE_SECONDS = 60
+# Rows per primary key range of the daily/weekly/monthly like count UPDATEs
+# (and of the daily reaction bucket rebuild)
+WINDOW_COUNT_CHUNK_SIZE = 5000
+# Trending scores: a reaction counts half after this many days, a dislike
+# weighs this many likes, and scores are decayed to the current day every
+# TRENDING_RENORMALIZE_SECONDS
+TRENDING_HALF_LIFE_DAYS = 3
+TRENDING_DISLIKE_WEIGHT = 1.0
+TRENDING_RENORMALIZE_SECONDS = 3600
+# Accounts with more reactions and favorites than this are deleted by a
+# background task after the request has returned
+USER_DELETION_ASYNC_THRESHOLD = 500
+# Interval in seconds at which the deletion of accounts left pending is queued again
+USER_DELETION_SWEEP_SECONDS = 3600
+# Clients sending one of these X-Client-Platform headers (the mobile apps'
+# infinite scroll) get cursor pagination on the dish and restaurant lists
+# unless they ask for ?pagination=page
+CURSOR_PAGINATION_PLATFORMS = ('ios', 'android')
+
+CELERY_BEAT_SCHEDULE = {
+    'apply-booking-retention': {
+        'task': 'api.tasks.apply_booking_retention',
+        'schedule': crontab(hour=BOOKING_RETENTION_HOUR, minute=0),
+    },
+    'flush-reaction-counters': {
+        'task': 'api.tasks.flush_reaction_counters',
+        'schedule': REACTION_COUNTER_FLUSH_SECONDS,
+    },
+    'renormalize-trending-scores': {
+        'task': 'api.tasks.renormalize_trending',
+        'schedule': TRENDING_RENORMALIZE_SECONDS,
+    },
+    'delete-pending-users': {
+        'task': 'api.tasks.delete_pending_users',
+        'schedule': USER_DELETION_SWEEP_SECONDS,
+    },
+}
+
 # Optional: Enable Django logging for Celery
 CELERYD_LOG_FILE = 'celery.log'
 CELERYD_LOG_LEVEL = 'INFO'